@@ -0,0 +1,313 @@
+import glob
+import json
+import os
+import sys
+import threading
+import time
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+from .database import get_connection, get_read_connection
+from .artifacts import atomic_write_text, publish
+
+
+# Parquet snapshots of daily_entries joined with its dimensions, one file per month.
+# DuckDB (imported on first use) answers long-range aggregate queries from them.
+ANALYTICS_DIR = os.getenv('ANALYTICS_DIR', 'analytics')
+ENGINE = os.getenv('ANALYTICS_ENGINE', 'duckdb')                    # 'duckdb' or 'postgres'
+REFRESH_SECONDS = float(os.getenv('ANALYTICS_REFRESH_SECONDS', '300'))  # 0 disables the background refresh
+
+SNAPSHOT_LOCK_ID = 47310002  # pg_try_advisory_lock key: one exporter at a time across workers
+# Rows are stamped with their transaction's start time, so re-scan a little before
+# the last watermark to catch transactions that committed after it was taken
+WATERMARK_OVERLAP = timedelta(minutes=5)
+
+_ENTRIES_DIR = os.path.join(ANALYTICS_DIR, "entries")
+_TMP_DIR = os.path.join(ANALYTICS_DIR, "tmp")
+_STATE_PATH = os.path.join(ANALYTICS_DIR, "state.json")
+_PARQUET_GLOB = os.path.join(_ENTRIES_DIR, "*.parquet")
+
+_COLUMNS = [
+    ("id", "INTEGER"), ("date", "DATE"), ("zone", "VARCHAR"), ("clerk", "VARCHAR"),
+    ("vehicle", "VARCHAR"), ("route", "VARCHAR"), ("fld_wgt", "DOUBLE"), ("fact_wgt", "DOUBLE"),
+    ("scorch_kg", "DOUBLE"), ("quality_pct", "DOUBLE"), ("created_at", "TIMESTAMP"),
+]
+
+_JOINED_ENTRIES = """
+    SELECT e.id, e.date, z.name AS zone, c.name AS clerk, v.reg_number AS vehicle, r.name AS route,
+           e.fld_wgt, e.fact_wgt, e.scorch_kg, e.quality_pct, e.created_at
+    FROM daily_entries e
+    LEFT JOIN zones z ON e.zone_id = z.id
+    LEFT JOIN clerks c ON e.clerk_id = c.id
+    LEFT JOIN vehicles v ON e.vehicle_id = v.id
+    LEFT JOIN routes r ON e.route_id = r.id
+"""
+
+_refresh_lock = threading.Lock()
+_refresher = {"thread": None}
+
+
+def load_state():
+    """Snapshot manifest: watermark, refresh time and row count per month, or None"""
+    try:
+        with open(_STATE_PATH, encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def _month_start(value):
+    return value.replace(day=1)
+
+
+def _next_month(value):
+    return (value.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+
+def _sql_literal(text):
+    return "'" + text.replace("'", "''") + "'"
+
+
+def _export_month(pg_cursor, duck, month, duckdb):
+    """Write one month to entries/YYYY-MM.parquet; returns its row count"""
+    key = month.strftime("%Y-%m")
+    final_path = os.path.join(_ENTRIES_DIR, f"{key}.parquet")
+    csv_path = os.path.join(_TMP_DIR, f"{key}.csv")
+    parquet_path = os.path.join(_TMP_DIR, f"{key}.parquet")
+
+    # Postgres streams the joined rows as CSV; DuckDB converts them to Parquet
+    copy_sql = pg_cursor.mogrify(
+        f"COPY ({_JOINED_ENTRIES} WHERE e.date >= %s AND e.date < %s ORDER BY e.date, e.id) "
+        f"TO STDOUT WITH (FORMAT csv, HEADER)",
+        (month, _next_month(month))
+    ).decode("utf-8")
+    with open(csv_path, "w", encoding="utf-8", newline="") as f:
+        pg_cursor.copy_expert(copy_sql, f)
+
+    try:
+        columns = "{" + ", ".join(f"'{name}': '{kind}'" for name, kind in _COLUMNS) + "}"
+        source = f"read_csv({_sql_literal(csv_path)}, header=true, columns={columns})"
+        rows = duck.execute(f"SELECT COUNT(*) FROM {source}").fetchone()[0]
+        if not rows:
+            if os.path.exists(final_path):
+                os.remove(final_path)
+            return 0
+        duck.execute(f"COPY (SELECT * FROM {source}) TO {_sql_literal(parquet_path)} (FORMAT parquet, COMPRESSION zstd)")
+        publish(parquet_path, final_path)
+        return rows
+    except duckdb.Error:
+        if os.path.exists(parquet_path):
+            os.remove(parquet_path)
+        raise
+    finally:
+        os.remove(csv_path)
+
+
+def refresh_snapshot(full=False):
+    """
+    Re-export the months touched since the last refresh (every month when
+    `full` or on first run). Returns the new manifest, or None when another
+    worker is already refreshing.
+    """
+    import duckdb
+
+    if not _refresh_lock.acquire(blocking=False):
+        return None
+    try:
+        lock_conn = get_connection()
+        lock_conn.autocommit = True
+        try:
+            lock_cursor = lock_conn.cursor()
+            lock_cursor.execute("SELECT pg_try_advisory_lock(%s)", (SNAPSHOT_LOCK_ID,))
+            if not lock_cursor.fetchone()[0]:
+                return None
+            try:
+                return _refresh(full, duckdb)
+            finally:
+                lock_cursor.execute("SELECT pg_advisory_unlock(%s)", (SNAPSHOT_LOCK_ID,))
+        finally:
+            lock_conn.close()
+    finally:
+        _refresh_lock.release()
+
+
+def _refresh(full, duckdb):
+    started = time.perf_counter()
+    os.makedirs(_ENTRIES_DIR, exist_ok=True)
+    os.makedirs(_TMP_DIR, exist_ok=True)
+    state = None if full else load_state()
+
+    conn = get_read_connection()
+    # One snapshot for the month list, the watermark and every export
+    conn.set_session(isolation_level="REPEATABLE READ", readonly=True)
+    cursor = conn.cursor()
+    duck = duckdb.connect()
+    try:
+        # updated_at is a local TIMESTAMP, so the watermark is too
+        cursor.execute("SELECT LOCALTIMESTAMP")
+        watermark = cursor.fetchone()[0]
+        if state:
+            since = datetime.fromisoformat(state["watermark"]) - WATERMARK_OVERLAP
+            cursor.execute(
+                "SELECT DISTINCT date_trunc('month', date)::date FROM daily_entries WHERE updated_at > %s",
+                (since,)
+            )
+        else:
+            cursor.execute("SELECT DISTINCT date_trunc('month', date)::date FROM daily_entries")
+        months = sorted(_month_start(row[0]) for row in cursor.fetchall())
+
+        counts = dict(state["months"]) if state else {}
+        if not state:
+            # Full export: drop partitions for months that no longer have rows
+            keep = {m.strftime("%Y-%m") for m in months}
+            for filename in os.listdir(_ENTRIES_DIR):
+                if filename.endswith(".parquet") and filename[:-len(".parquet")] not in keep:
+                    os.remove(os.path.join(_ENTRIES_DIR, filename))
+
+        for month in months:
+            key = month.strftime("%Y-%m")
+            rows = _export_month(cursor, duck, month, duckdb)
+            if rows:
+                counts[key] = rows
+            else:
+                counts.pop(key, None)
+        conn.commit()
+    finally:
+        duck.close()
+        cursor.close()
+        conn.close()
+
+    new_state = {
+        "watermark": watermark.isoformat(),
+        "refreshed_at": datetime.now().isoformat(timespec="seconds"),
+        "months": dict(sorted(counts.items())),
+        "rows": sum(counts.values()),
+        "exported_months": len(months),
+    }
+    atomic_write_text(_STATE_PATH, json.dumps(new_state, indent=2))
+    print(f"✅ Analytics snapshot refreshed: {len(months)} month(s) exported, "
+          f"{new_state['rows']} rows in {time.perf_counter() - started:.2f}s")
+    return new_state
+
+
+def _refresh_forever():
+    while True:
+        try:
+            refresh_snapshot()
+        except Exception as e:
+            print(f"❌ Analytics snapshot refresh failed: {e}")
+        time.sleep(REFRESH_SECONDS)
+
+
+def start_refresher():
+    """Refresh snapshots every ANALYTICS_REFRESH_SECONDS in a background thread"""
+    if _refresher["thread"] is not None or REFRESH_SECONDS <= 0 or ENGINE != "duckdb":
+        return
+    thread = threading.Thread(target=_refresh_forever, name="analytics-snapshot", daemon=True)
+    _refresher["thread"] = thread
+    thread.start()
+
+
+def _ready_state():
+    """Snapshot state when DuckDB can answer from Parquet files, else None (use Postgres)"""
+    if ENGINE != "duckdb":
+        return None
+    state = load_state()
+    # A snapshot of an empty table has no files, and read_parquet fails on an unmatched glob
+    if not state or not state.get("rows") or not glob.glob(_PARQUET_GLOB):
+        return None
+    try:
+        import duckdb  # noqa: F401
+    except ImportError:
+        return None
+    return state
+
+
+def _plain(value):
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    return value
+
+
+def run_query(sql, params=()):
+    """
+    Run `sql` against a relation named `entries` (joined daily entries) using
+    %s placeholders. Answered by DuckDB from the Parquet snapshot when one
+    exists, otherwise by Postgres. Returns {"rows", "source", "as_of"}.
+    """
+    state = _ready_state()
+    if state:
+        import duckdb
+
+        duck = duckdb.connect()
+        try:
+            duck.execute(f"CREATE VIEW entries AS SELECT * FROM read_parquet({_sql_literal(_PARQUET_GLOB)})")
+            result = duck.execute(sql.replace("%s", "?"), list(params))
+            names = [d[0] for d in result.description]
+            rows = [dict(zip(names, map(_plain, row))) for row in result.fetchall()]
+        finally:
+            duck.close()
+        return {"rows": rows, "source": "duckdb", "as_of": state["watermark"]}
+
+    conn = get_read_connection()
+    cursor = conn.cursor()
+    try:
+        cursor.execute(f"WITH entries AS ({_JOINED_ENTRIES}) {sql}", params)
+        names = [d[0] for d in cursor.description]
+        rows = [dict(zip(names, map(_plain, row))) for row in cursor.fetchall()]
+    finally:
+        cursor.close()
+        conn.close()
+    return {"rows": rows, "source": "postgres", "as_of": None}
+
+
+def zone_year_over_year():
+    """Yearly totals per zone with the change against the zone's previous year"""
+    return run_query("""
+        SELECT zone, year, entries, fact_wgt, avg_quality,
+               ROUND(CAST((fact_wgt - prev_fact_wgt) / NULLIF(prev_fact_wgt, 0) * 100 AS NUMERIC), 2) AS change_pct
+        FROM (
+            SELECT zone, year, entries, fact_wgt, avg_quality,
+                   LAG(fact_wgt) OVER (PARTITION BY zone ORDER BY year) AS prev_fact_wgt
+            FROM (
+                SELECT COALESCE(zone, 'Unknown') AS zone,
+                       CAST(EXTRACT(YEAR FROM date) AS INTEGER) AS year,
+                       COUNT(*) AS entries,
+                       ROUND(CAST(SUM(fact_wgt) AS NUMERIC), 2) AS fact_wgt,
+                       ROUND(CAST(AVG(quality_pct) AS NUMERIC), 2) AS avg_quality
+                FROM entries
+                GROUP BY 1, 2
+            ) yearly
+        ) ranked
+        ORDER BY zone, year
+    """)
+
+
+def clerk_rankings(start_date=None, end_date=None, limit=50):
+    """Clerks ranked by factory weight handled, over all history or a date range"""
+    return run_query("""
+        SELECT RANK() OVER (ORDER BY SUM(fact_wgt) DESC) AS rank,
+               COALESCE(clerk, 'Unknown') AS clerk,
+               COUNT(*) AS entries,
+               COUNT(DISTINCT date) AS days,
+               ROUND(CAST(SUM(fact_wgt) AS NUMERIC), 2) AS fact_wgt,
+               ROUND(CAST((SUM(fact_wgt) - SUM(fld_wgt)) / NULLIF(SUM(fld_wgt), 0) * 100 AS NUMERIC), 2) AS var_pct,
+               ROUND(CAST(AVG(quality_pct) AS NUMERIC), 2) AS avg_quality
+        FROM entries
+        WHERE (CAST(%s AS DATE) IS NULL OR date >= CAST(%s AS DATE))
+          AND (CAST(%s AS DATE) IS NULL OR date <= CAST(%s AS DATE))
+        GROUP BY 2
+        ORDER BY rank, clerk
+        LIMIT %s
+    """, (start_date, start_date, end_date, end_date, limit))
+
+
+if __name__ == "__main__":
+    # python -m backend.analytics_store refresh [--full]
+    if not sys.argv[1:] or sys.argv[1] != "refresh":
+        print("Usage: python -m backend.analytics_store refresh [--full]")
+        sys.exit(1)
+    if refresh_snapshot(full="--full" in sys.argv[2:]) is None:
+        print("Another process is refreshing the analytics snapshot")
@@ -0,0 +1,60 @@
+import math
+
+
+# Running statistics are kept per route and per vehicle for these metrics
+SCOPES = ("route", "vehicle")
+METRICS = ("var_pct", "quality_pct", "scorch_kg")
+
+Z_THRESHOLD = 3.0   # Flag values more than this many standard deviations from the mean
+MIN_SAMPLES = 5     # Don't flag until a route/vehicle has enough history
+
+
+def entry_metrics(entry):
+    """Metric values for one entry; (%)VAR is only defined when a field weight was recorded"""
+    fld = float(entry.get('fld_wgt') or 0)
+    fact = float(entry.get('fact_wgt') or 0)
+    metrics = {
+        "quality_pct": float(entry.get('quality_pct') or 0),
+        "scorch_kg": float(entry.get('scorch_kg') or 0),
+    }
+    if fld:
+        metrics["var_pct"] = (fact - fld) / fld * 100
+    return metrics
+
+
+def welford_add(n, mean, m2, x):
+    """Fold one observation into (count, mean, sum of squared deviations)"""
+    n += 1
+    delta = x - mean
+    mean += delta / n
+    m2 += delta * (x - mean)
+    return n, mean, m2
+
+
+def welford_remove(n, mean, m2, x):
+    """Inverse of welford_add, used when an entry is edited"""
+    if n <= 1:
+        return 0, 0.0, 0.0
+    new_mean = (n * mean - x) / (n - 1)
+    m2 -= (x - new_mean) * (x - mean)
+    return n - 1, new_mean, max(m2, 0.0)
+
+
+def check_value(scope, metric, value, n, mean, m2):
+    """Return a flag dict if `value` is an outlier against the running stats, else None"""
+    if n < MIN_SAMPLES:
+        return None
+    std = math.sqrt(m2 / (n - 1))
+    if std == 0:
+        return None
+    z = (value - mean) / std
+    if abs(z) < Z_THRESHOLD:
+        return None
+    return {
+        "scope": scope,
+        "metric": metric,
+        "value": round(value, 2),
+        "mean": round(mean, 2),
+        "std": round(std, 2),
+        "z": round(z, 2),
+    }
@@ -0,0 +1,98 @@
+import hashlib
+import json
+import os
+import time
+import uuid
+from contextlib import contextmanager
+
+from .database import get_connection
+from .report_catalog import find_reusable_report
+
+
+LOCK_NAMESPACE = "report_render"
+REPLACE_RETRIES = 5  # Windows refuses to replace a file another process has open
+
+
+def temp_path_for(final_path):
+    """Hidden sibling path that keeps the extension (Excel checks it when opening)"""
+    directory, name = os.path.split(final_path)
+    base, ext = os.path.splitext(name)
+    return os.path.join(directory, f".{base}.{uuid.uuid4().hex[:8]}.tmp{ext}")
+
+
+def publish(temp_path, final_path):
+    """Atomically move a finished temp file into place"""
+    for attempt in range(REPLACE_RETRIES):
+        try:
+            os.replace(temp_path, final_path)
+            return final_path
+        except PermissionError:
+            if attempt == REPLACE_RETRIES - 1:
+                raise
+            time.sleep(0.2 * (attempt + 1))
+
+
+@contextmanager
+def atomic_output(final_path):
+    """
+    Yield a temp path to write to; on success it replaces final_path in one
+    rename, so readers see either the old file or the complete new one.
+    """
+    temp_path = temp_path_for(final_path)
+    try:
+        yield temp_path
+        publish(temp_path, final_path)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+
+def atomic_write_text(final_path, content):
+    with atomic_output(final_path) as temp_path:
+        with open(temp_path, "w", encoding="utf-8") as f:
+            f.write(content)
+    return final_path
+
+
+def source_fingerprint(*inputs):
+    """Stable hash of the data a report is rendered from"""
+    payload = json.dumps(inputs, default=str, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+@contextmanager
+def render_lock(key):
+    """
+    Cross-process lock for one report (e.g. 'daily:2025-01-01') using a
+    Postgres session advisory lock. Yields whether another render held it first.
+    """
+    conn = get_connection()
+    conn.autocommit = True
+    cursor = conn.cursor()
+    try:
+        cursor.execute("SELECT pg_try_advisory_lock(hashtext(%s), hashtext(%s))", (LOCK_NAMESPACE, key))
+        waited = not cursor.fetchone()[0]
+        if waited:
+            cursor.execute("SELECT pg_advisory_lock(hashtext(%s), hashtext(%s))", (LOCK_NAMESPACE, key))
+        try:
+            yield waited
+        finally:
+            cursor.execute("SELECT pg_advisory_unlock(hashtext(%s), hashtext(%s))", (LOCK_NAMESPACE, key))
+    finally:
+        cursor.close()
+        conn.close()
+
+
+def render_once(key, candidates, source_hash, render):
+    """
+    Run render() under the per-report lock, unless one of `candidates`
+    (filenames, in preference order) is already on disk and catalogued from
+    the same source data - by a concurrent request, or earlier by any worker
+    such as the scheduled pre-render. Then return that path instead.
+    """
+    with render_lock(key) as waited:
+        reused = find_reusable_report(candidates, source_hash)
+        if reused:
+            print(f"Reusing {reused} rendered {'by a concurrent request' if waited else 'earlier'} from the same data")
+            return reused
+        return render()
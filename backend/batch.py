@@ -0,0 +1,151 @@
+import multiprocessing
+import os
+import sys
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+
+from .database import get_entries_between, get_zone_daily_totals
+from .excel_handler import update_excel_report, build_date_sums, summary_windows
+from .html_report import save_html_report_to_file
+
+
+JOB_TTL = 3600      # seconds a finished job stays pollable
+MAX_JOBS = 100      # oldest finished jobs are dropped beyond this
+
+# job_id -> progress dict for regenerations started through the API
+_jobs = {}
+_jobs_lock = threading.Lock()
+
+
+def _render_day(report_date, entries, summary):
+    """Worker: render the Excel/PDF and HTML reports for one day"""
+    xl_file = update_excel_report(entries, report_date, summary=summary)
+    html_file = save_html_report_to_file(report_date, entries)
+    return {"date": report_date, "file": xl_file, "html": html_file}
+
+
+def regenerate_reports(start_date, end_date, workers=None, progress=None):
+    """
+    Re-render every report between start_date and end_date (inclusive).
+
+    The day entries and the zone totals behind the summary chart are loaded
+    once for the whole range; rendering is spread over a process pool.
+    `progress(done, total, result)` is called as each day finishes.
+    """
+    entries = get_entries_between(start_date, end_date)
+    by_date = {}
+    for e in entries:
+        by_date.setdefault(e.date, []).append(e)
+    report_dates = sorted(by_date)
+
+    date_sums = build_date_sums(get_zone_daily_totals(end_date))
+    windows = summary_windows(date_sums, report_dates)
+
+    results = []
+    total = len(report_dates)
+    if not total:
+        return results
+
+    workers = workers or min(total, os.cpu_count() or 1)
+    # Spawn, not fork: the API worker has live threads (listeners, schedulers) and
+    # open sockets that a forked child would inherit mid-use. Each child imports
+    # the app afresh and opens its own database connections.
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+        futures = {
+            pool.submit(_render_day, d, by_date[d], windows[d]): d
+            for d in report_dates
+        }
+        for future in as_completed(futures):
+            try:
+                result = future.result()
+            except Exception as e:
+                result = {"date": futures[future], "error": str(e)}
+            results.append(result)
+            if progress:
+                progress(len(results), total, result)
+
+    return sorted(results, key=lambda r: r["date"])
+
+
+def _prune_jobs():
+    # Caller holds _jobs_lock. Running jobs are always kept.
+    now = time.monotonic()
+    finished = sorted(
+        (job["_finished"], job_id) for job_id, job in _jobs.items() if job["status"] != "running"
+    )
+    for finished_at, job_id in finished:
+        if now - finished_at > JOB_TTL or len(_jobs) > MAX_JOBS:
+            del _jobs[job_id]
+
+
+def start_regeneration_job(start_date, end_date, workers=None):
+    """Run regenerate_reports in a background thread and return a job id to poll"""
+    job_id = uuid.uuid4().hex[:12]
+    job = {
+        "id": job_id,
+        "start_date": start_date,
+        "end_date": end_date,
+        "status": "running",
+        "done": 0,
+        "total": None,
+        "results": [],
+        "started_at": datetime.now().isoformat(timespec="seconds"),
+        "finished_at": None,
+    }
+    with _jobs_lock:
+        _prune_jobs()
+        _jobs[job_id] = job
+
+    def on_progress(done, total, result):
+        with _jobs_lock:
+            job["done"] = done
+            job["total"] = total
+            job["results"].append(result)
+
+    def run():
+        error = None
+        try:
+            results = regenerate_reports(start_date, end_date, workers, on_progress)
+            status = "failed" if any("error" in r for r in results) else "completed"
+        except Exception as e:
+            print(f"❌ Report regeneration {job_id} failed: {e}")
+            error = str(e)
+            status = "failed"
+        with _jobs_lock:
+            if error:
+                job["error"] = error
+            job["status"] = status
+            job["total"] = job["total"] or 0
+            job["finished_at"] = datetime.now().isoformat(timespec="seconds")
+            job["_finished"] = time.monotonic()
+
+    threading.Thread(target=run, daemon=True).start()
+    return job
+
+
+def get_job(job_id):
+    with _jobs_lock:
+        _prune_jobs()
+        job = _jobs.get(job_id)
+        if not job:
+            return None
+        return {**{k: v for k, v in job.items() if not k.startswith("_")}, "results": list(job["results"])}
+
+
+if __name__ == "__main__":
+    # python -m backend.batch 2025-01-01 2025-01-31 [workers]
+    if len(sys.argv) < 3:
+        print("Usage: python -m backend.batch START_DATE END_DATE [WORKERS]")
+        sys.exit(1)
+
+    def print_progress(done, total, result):
+        status = f"❌ {result['error']}" if "error" in result else f"✅ {result['file']}"
+        print(f"[{done}/{total}] {result['date']} {status}")
+
+    workers = int(sys.argv[3]) if len(sys.argv) > 3 else None
+    results = regenerate_reports(sys.argv[1], sys.argv[2], workers, print_progress)
+    print(f"Regenerated {sum('error' not in r for r in results)}/{len(results)} reports")
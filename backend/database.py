@@ -1,6 +1,11 @@
 import psycopg2
-from psycopg2.extras import RealDictCursor
+from psycopg2.extras import RealDictCursor, Json, execute_values
 import os
+import time
+from .anomalies import SCOPES, METRICS, entry_metrics, welford_add, welford_remove, check_value
+from .query_cache import entries_cache, cache_key, entries_changed, notify_entries_changed
+from .live_feed import notify_entry_event
+from .rows import entry_cursor, fetch_entry_rows
 
 # Database configuration - use environment variables in production
 DB_CONFIG = {
@@ -11,79 +16,106 @@ DB_CONFIG = {
     'password': os.getenv('DB_PASSWORD', 'postgres')
 }
 
-def get_connection():
-    """Get database connection"""
-    return psycopg2.connect(**DB_CONFIG)
+# Optional streaming replica for heavy read-only queries, e.g. "host=replica dbname=greenfield_reports user=..."
+REPLICA_DSN = os.getenv('DB_REPLICA_DSN')
+REPLICA_MAX_LAG = float(os.getenv('DB_REPLICA_MAX_LAG', '5'))      # seconds behind before falling back
+REPLICA_CHECK_INTERVAL = 2.0                                        # seconds a lag measurement is trusted
+REPLICA_RETRY_INTERVAL = 30.0                                       # seconds to wait after a failed connect
 
-def init_db():
-    conn = get_connection()
+_replica = {"lag": None, "checked_at": 0.0, "down_until": 0.0, "last_write": 0.0,
+            "replica_reads": 0, "primary_reads": 0, "lag_fallbacks": 0, "errors": 0}
+
+# Every entry query selects these columns in rows.ENTRY_FIELDS order
+_ENTRY_SELECT = """
+            SELECT e.id, e.date, z.name, c.name, v.reg_number, r.name,
+                   e.time_out, e.time_in, e.tare_time,
+                   e.fld_wgt, e.fact_wgt, e.scorch_kg, e.quality_pct, e.flags, e.created_at, e.updated_at
+            FROM daily_entries e
+            LEFT JOIN zones z ON e.zone_id = z.id
+            LEFT JOIN clerks c ON e.clerk_id = c.id
+            LEFT JOIN vehicles v ON e.vehicle_id = v.id
+            LEFT JOIN routes r ON e.route_id = r.id
+"""
+
+def get_connection(**options):
+    """Get database connection; `options` (e.g. connect_timeout) override DB_CONFIG"""
+    return psycopg2.connect(**{**DB_CONFIG, **options})
+
+def _measure_lag(conn):
     cursor = conn.cursor()
-    
     try:
-        # 1. Create Lookup Tables
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS zones (
-                id SERIAL PRIMARY KEY,
-                name VARCHAR(255) UNIQUE NOT NULL
-            )
-        """)
-        
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS vehicles (
-                id SERIAL PRIMARY KEY,
-                reg_number VARCHAR(255) UNIQUE NOT NULL
-            )
-        """)
-        
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS clerks (
-                id SERIAL PRIMARY KEY,
-                name VARCHAR(255) UNIQUE NOT NULL
-            )
-        """)
-        
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS routes (
-                id SERIAL PRIMARY KEY,
-                name VARCHAR(255) UNIQUE NOT NULL,
-                zone_id INTEGER REFERENCES zones(id)
-            )
-        """)
-        
-        # 2. Create main entries table
+        # 0 when fully replayed (or when pointed at a primary), otherwise age of the last replayed commit
         cursor.execute("""
-            CREATE TABLE IF NOT EXISTS daily_entries (
-                id SERIAL PRIMARY KEY,
-                date DATE NOT NULL,
-                zone_id INTEGER REFERENCES zones(id),
-                clerk_id INTEGER REFERENCES clerks(id),
-                vehicle_id INTEGER REFERENCES vehicles(id),
-                route_id INTEGER REFERENCES routes(id),
-                time_out VARCHAR(50),
-                time_in VARCHAR(50),
-                tare_time VARCHAR(50),
-                fld_wgt DECIMAL(10, 2),
-                fact_wgt DECIMAL(10, 2),
-                scorch_kg DECIMAL(10, 2),
-                quality_pct DECIMAL(5, 2),
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
+            SELECT CASE
+                WHEN NOT pg_is_in_recovery() THEN 0
+                WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+                ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+            END
         """)
-        
-        # Create indexes for better performance
-        cursor.execute("CREATE INDEX IF NOT EXISTS idx_daily_entries_date ON daily_entries(date)")
-        cursor.execute("CREATE INDEX IF NOT EXISTS idx_daily_entries_zone ON daily_entries(zone_id)")
-        cursor.execute("CREATE INDEX IF NOT EXISTS idx_daily_entries_route ON daily_entries(route_id)")
-        
-        conn.commit()
-        print("✅ PostgreSQL database initialized successfully")
-    except Exception as e:
-        conn.rollback()
-        print(f"❌ Database initialization failed: {e}")
-        raise
+        return float(cursor.fetchone()[0])
     finally:
         cursor.close()
+        conn.rollback()
+
+def get_read_connection():
+    """
+    Connection for read-only queries that tolerate a few seconds of staleness.
+    Uses the replica when one is configured, reachable and within
+    DB_REPLICA_MAX_LAG; otherwise, and for REPLICA_MAX_LAG seconds after this
+    worker committed a write (so it reads its own writes), the primary.
+    """
+    now = time.monotonic()
+    lag_known_high = (now - _replica["checked_at"] <= REPLICA_CHECK_INTERVAL
+                      and (_replica["lag"] is None or _replica["lag"] > REPLICA_MAX_LAG))
+    if (not REPLICA_DSN or now < _replica["down_until"] or lag_known_high
+            or now - _replica["last_write"] < REPLICA_MAX_LAG):
+        _replica["primary_reads"] += 1
+        return get_connection()
+
+    try:
+        conn = psycopg2.connect(REPLICA_DSN)
+    except psycopg2.OperationalError as e:
+        print(f"❌ Read replica unavailable, using primary for {REPLICA_RETRY_INTERVAL:.0f}s: {e}")
+        _replica["errors"] += 1
+        _replica["down_until"] = now + REPLICA_RETRY_INTERVAL
+        _replica["primary_reads"] += 1
+        return get_connection()
+
+    try:
+        if now - _replica["checked_at"] > REPLICA_CHECK_INTERVAL:
+            _replica["lag"] = _measure_lag(conn)
+            _replica["checked_at"] = now
+    except psycopg2.Error as e:
+        print(f"❌ Replica lag check failed: {e}")
+        _replica["lag"] = None
+        _replica["errors"] += 1
+
+    if _replica["lag"] is None or _replica["lag"] > REPLICA_MAX_LAG:
         conn.close()
+        _replica["lag_fallbacks"] += 1
+        _replica["primary_reads"] += 1
+        return get_connection()
+
+    conn.set_session(readonly=True)
+    _replica["replica_reads"] += 1
+    return conn
+
+def _wrote():
+    # Called after each committed entry write; see get_read_connection
+    _replica["last_write"] = time.monotonic()
+
+def replica_stats():
+    return {
+        "configured": bool(REPLICA_DSN),
+        "max_lag": REPLICA_MAX_LAG,
+        "last_lag": _replica["lag"],
+        **{k: _replica[k] for k in ("replica_reads", "primary_reads", "lag_fallbacks", "errors")},
+    }
+
+def init_db():
+    """Bring the schema up to date (see migrations.py)"""
+    from .migrations import run_migrations
+    run_migrations()
 
 def get_or_create_id(cursor, table, col, val, extra_col=None, extra_val=None):
     """Get existing ID or create new entry and return ID"""
@@ -110,29 +142,212 @@ def get_or_create_id(cursor, table, col, val, extra_col=None, extra_val=None):
         )
     return cursor.fetchone()[0]
 
+# Column / SQL expression per scope and metric, mirroring anomalies.entry_metrics
+_SCOPE_COLUMNS = {'route': 'route_id', 'vehicle': 'vehicle_id'}
+_METRIC_SQL = {
+    'var_pct': ("(COALESCE(fact_wgt, 0) - fld_wgt) / fld_wgt * 100", "fld_wgt IS NOT NULL AND fld_wgt <> 0"),
+    'quality_pct': ("COALESCE(quality_pct, 0)", "TRUE"),
+    'scorch_kg': ("COALESCE(scorch_kg, 0)", "TRUE"),
+}
+
+def _rebuild_entry_stats(cursor):
+    """Recompute entry_stats from the full history (backfill / repair)"""
+    cursor.execute("DELETE FROM entry_stats")
+    for scope in SCOPES:
+        col = _SCOPE_COLUMNS[scope]
+        for metric in METRICS:
+            expr, cond = _METRIC_SQL[metric]
+            cursor.execute(f"""
+                INSERT INTO entry_stats (scope, scope_id, metric, n, mean, m2)
+                SELECT %s, {col}, %s, COUNT(*), AVG({expr}), COALESCE(VAR_POP({expr}) * COUNT(*), 0)
+                FROM daily_entries
+                WHERE {col} IS NOT NULL AND {cond}
+                GROUP BY {col}
+            """, (scope, metric))
+
+def rebuild_entry_stats():
+    conn = get_connection()
+    cursor = conn.cursor()
+    
+    try:
+        _rebuild_entry_stats(cursor)
+        conn.commit()
+    except Exception as e:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+        conn.close()
+
+# Dimension -> (lookup table, name column, daily_entries FK) for daily_rollups
+_ROLLUP_DIMENSIONS = {
+    'zone': ('zones', 'name', 'zone_id'),
+    'route': ('routes', 'name', 'route_id'),
+    'clerk': ('clerks', 'name', 'clerk_id'),
+}
+
+def _refresh_daily_rollups(cursor, date=None):
+    """Recompute daily_rollups for one date (or every date when None)"""
+    if date is None:
+        cursor.execute("DELETE FROM daily_rollups")
+    else:
+        # Serialize concurrent refreshes of the same day until this transaction ends
+        cursor.execute(
+            "SELECT pg_advisory_xact_lock(hashtext('daily_rollups'), %s::date - DATE '2000-01-01')",
+            (date,)
+        )
+        cursor.execute("DELETE FROM daily_rollups WHERE date=%s", (date,))
+    for dimension, (table, col, fk) in _ROLLUP_DIMENSIONS.items():
+        query = f"""
+            INSERT INTO daily_rollups (date, dimension, name, entries, fld_wgt, fact_wgt, scorch_kg, quality_sum)
+            SELECT e.date, %s, COALESCE(d.{col}, 'UNKNOWN'), COUNT(*),
+                   COALESCE(SUM(e.fld_wgt), 0), COALESCE(SUM(e.fact_wgt), 0),
+                   COALESCE(SUM(e.scorch_kg), 0), COALESCE(SUM(e.quality_pct), 0)
+            FROM daily_entries e
+            LEFT JOIN {table} d ON e.{fk} = d.id
+        """
+        params = [dimension]
+        if date is not None:
+            query += " WHERE e.date=%s"
+            params.append(date)
+        query += f" GROUP BY e.date, COALESCE(d.{col}, 'UNKNOWN')"
+        cursor.execute(query, params)
+
+def get_period_rollups(start_date, end_date):
+    """Pre-aggregated per-day zone/route/clerk totals for a date range"""
+    conn = get_read_connection()
+    cursor = conn.cursor(cursor_factory=RealDictCursor)
+    
+    try:
+        cursor.execute("""
+            SELECT date, dimension, name, entries, fld_wgt, fact_wgt, scorch_kg, quality_sum
+            FROM daily_rollups
+            WHERE date BETWEEN %s AND %s
+            ORDER BY date ASC, dimension, name
+        """, (start_date, end_date))
+        return [dict(row) for row in cursor.fetchall()]
+    finally:
+        cursor.close()
+        conn.close()
+
+def _entry_stats_values(route_id, vehicle_id, entry):
+    """((scope, scope_id, metric), value) pairs an entry contributes to the running stats"""
+    metrics = entry_metrics(entry)
+    return [((scope, scope_id, metric), value)
+            for scope, scope_id in (('route', route_id), ('vehicle', vehicle_id)) if scope_id is not None
+            for metric, value in metrics.items()]
+
+def _apply_entry_stats(cursor, changes):
+    """
+    Fold entries into (or out of) the running route/vehicle statistics.
+    `changes` is a list of (route_id, vehicle_id, entry, remove), applied in
+    order so later rows see earlier ones. Each added entry is first checked
+    against the stats so far; the outlier flags are returned per change.
+    """
+    values = [_entry_stats_values(route_id, vehicle_id, entry) for route_id, vehicle_id, entry, _ in changes]
+    keys = sorted({key for pairs in values for key, _ in pairs})
+    if not keys:
+        return [[] for _ in changes]
+
+    # Seed the rows first so FOR UPDATE always has something to lock: two first
+    # writers for a new route/vehicle would otherwise both start from zero.
+    # Every row the batch touches is seeded and locked in one sorted order, so
+    # concurrent uploads and edits queue behind each other instead of deadlocking.
+    execute_values(cursor, """
+        INSERT INTO entry_stats (scope, scope_id, metric, n, mean, m2)
+        VALUES %s
+        ON CONFLICT (scope, scope_id, metric) DO NOTHING
+    """, [(*key, 0, 0, 0) for key in keys])
+    cursor.execute("""
+        SELECT scope, scope_id, metric, n, mean, m2 FROM entry_stats
+        WHERE (scope, scope_id, metric) IN %s
+        ORDER BY scope, scope_id, metric
+        FOR UPDATE
+    """, (tuple(keys),))
+    stats = {tuple(row[:3]): tuple(row[3:]) for row in cursor.fetchall()}
+
+    all_flags = []
+    for (route_id, vehicle_id, entry, remove), pairs in zip(changes, values):
+        flags = []
+        for key, value in pairs:
+            n, mean, m2 = stats[key]
+            if remove:
+                stats[key] = welford_remove(n, mean, m2, value)
+            else:
+                flag = check_value(key[0], key[2], value, n, mean, m2)
+                if flag:
+                    flags.append(flag)
+                stats[key] = welford_add(n, mean, m2, value)
+        all_flags.append(flags)
+
+    execute_values(cursor, """
+        UPDATE entry_stats AS s SET n = v.n, mean = v.mean, m2 = v.m2
+        FROM (VALUES %s) AS v (scope, scope_id, metric, n, mean, m2)
+        WHERE s.scope = v.scope AND s.scope_id = v.scope_id AND s.metric = v.metric
+    """, [(*key, *stats[key]) for key in keys])
+    return all_flags
+
 def save_entry(data):
+    return save_entries([data])[0]
+
+def save_entries(rows, with_ids=False):
+    """
+    Insert entries in one transaction and return the outlier flags per row
+    (or (id, flags) pairs with `with_ids`). Rollups, cache invalidation and
+    NOTIFYs are done once per touched date.
+    """
     conn = get_connection()
     cursor = conn.cursor()
     
     try:
+        ids = {}
+        def dimension_id(table, col, val, extra_col=None, extra_val=None):
+            key = (table, (val or '').upper().strip())
+            if key not in ids:
+                ids[key] = get_or_create_id(cursor, table, col, val, extra_col, extra_val)
+            return ids[key]
+
         # 1. Get/Create IDs
-        z_id = get_or_create_id(cursor, 'zones', 'name', data.get('zone'))
-        c_id = get_or_create_id(cursor, 'clerks', 'name', data.get('clerk'))
-        v_id = get_or_create_id(cursor, 'vehicles', 'reg_number', data.get('vehicle'))
-        r_id = get_or_create_id(cursor, 'routes', 'name', data.get('route'), 'zone_id', z_id)
+        row_ids = []
+        for data in rows:
+            z_id = dimension_id('zones', 'name', data.get('zone'))
+            c_id = dimension_id('clerks', 'name', data.get('clerk'))
+            v_id = dimension_id('vehicles', 'reg_number', data.get('vehicle'))
+            r_id = dimension_id('routes', 'name', data.get('route'), 'zone_id', z_id)
+            row_ids.append((z_id, c_id, v_id, r_id))
 
-        # 2. Insert Entry
-        cursor.execute('''
-            INSERT INTO daily_entries 
-            (date, zone_id, clerk_id, vehicle_id, route_id, time_out, time_in, tare_time, 
-             fld_wgt, fact_wgt, scorch_kg, quality_pct)
-            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-        ''', (
+        # 2. Check against and update running stats (in order, so later rows see earlier ones)
+        all_flags = _apply_entry_stats(cursor, [(r_id, v_id, data, False)
+                                                for (_, _, v_id, r_id), data in zip(row_ids, rows)])
+        values = [(
             data['date'], z_id, c_id, v_id, r_id,
             data.get('time_out'), data.get('time_in'), data.get('tare_time'),
-            data['fld_wgt'], data['fact_wgt'], data['scorch_kg'], data['quality_pct']
-        ))
+            data['fld_wgt'], data['fact_wgt'], data['scorch_kg'], data['quality_pct'],
+            Json(flags)
+        ) for (z_id, c_id, v_id, r_id), data, flags in zip(row_ids, rows, all_flags)]
+
+        # 3. Insert Entries
+        inserted = execute_values(cursor, '''
+            INSERT INTO daily_entries 
+            (date, zone_id, clerk_id, vehicle_id, route_id, time_out, time_in, tare_time, 
+             fld_wgt, fact_wgt, scorch_kg, quality_pct, flags)
+            VALUES %s
+            RETURNING id
+        ''', values, fetch=True)
+
+        dates = sorted({cache_key(data['date']) for data in rows})
+        for date in dates:
+            _refresh_daily_rollups(cursor, date)
+            notify_entries_changed(cursor, date)
+        for entry in _fetch_entries(conn, [row[0] for row in inserted]):
+            notify_entry_event(cursor, "insert", entry)
         conn.commit()
+        _wrote()
+        for date in dates:
+            entries_changed(date)
+        if with_ids:
+            return list(zip([row[0] for row in inserted], all_flags))
+        return all_flags
     except Exception as e:
         conn.rollback()
         raise
@@ -141,50 +356,74 @@ def save_entry(data):
         conn.close()
 
 def get_entries_by_date(date):
+    """Entries for one date, served from the write-invalidated per-date cache"""
+    # EntryRows are immutable, so a shallow copy of the cached list is enough
+    return list(entries_cache.get_or_load(cache_key(date), lambda: _query_entries_by_date(date)))
+
+def _query_entries_by_date(date):
+    # Primary: read right after submit, and cached until the next write to the date
     conn = get_connection()
-    cursor = conn.cursor(cursor_factory=RealDictCursor)
+    cursor = entry_cursor(conn)
     
     try:
-        query = """
-            SELECT e.*, z.name as zone, c.name as clerk, v.reg_number as vehicle, r.name as route
-            FROM daily_entries e
-            LEFT JOIN zones z ON e.zone_id = z.id
-            LEFT JOIN clerks c ON e.clerk_id = c.id
-            LEFT JOIN vehicles v ON e.vehicle_id = v.id
-            LEFT JOIN routes r ON e.route_id = r.id
+        query = _ENTRY_SELECT + """
             WHERE e.date=%s 
             ORDER BY e.id ASC
         """
         cursor.execute(query, (date,))
-        rows = cursor.fetchall()
-        return [dict(row) for row in rows]
+        return fetch_entry_rows(cursor)
     finally:
         cursor.close()
         conn.close()
 
 def update_entry(entry_id, data):
+    """Replace an entry and return its outlier flags, or None if it does not exist"""
     conn = get_connection()
     cursor = conn.cursor()
     
     try:
+        # Lock the row first; a missing entry must not touch lookups or running stats
+        cursor.execute('''
+            SELECT route_id, vehicle_id, fld_wgt, fact_wgt, scorch_kg, quality_pct, date
+            FROM daily_entries WHERE id=%s FOR UPDATE
+        ''', (entry_id,))
+        old = cursor.fetchone()
+        if not old:
+            conn.rollback()
+            return None
+        old_entry = _fetch_entry(conn, entry_id)
+
         z_id = get_or_create_id(cursor, 'zones', 'name', data.get('zone'))
         c_id = get_or_create_id(cursor, 'clerks', 'name', data.get('clerk'))
         v_id = get_or_create_id(cursor, 'vehicles', 'reg_number', data.get('vehicle'))
         r_id = get_or_create_id(cursor, 'routes', 'name', data.get('route'), 'zone_id', z_id)
 
+        # Take the old values out of the running stats before checking the new ones
+        _, flags = _apply_entry_stats(cursor, [
+            (old[0], old[1], {'fld_wgt': old[2], 'fact_wgt': old[3], 'scorch_kg': old[4], 'quality_pct': old[5]}, True),
+            (r_id, v_id, data, False),
+        ])
+
         cursor.execute('''
             UPDATE daily_entries 
             SET zone_id=%s, clerk_id=%s, vehicle_id=%s, route_id=%s, 
                 time_out=%s, time_in=%s, tare_time=%s, 
-                fld_wgt=%s, fact_wgt=%s, scorch_kg=%s, quality_pct=%s
+                fld_wgt=%s, fact_wgt=%s, scorch_kg=%s, quality_pct=%s, flags=%s,
+                updated_at=CURRENT_TIMESTAMP
             WHERE id=%s
         ''', (
             z_id, c_id, v_id, r_id,
             data.get('time_out'), data.get('time_in'), data.get('tare_time'),
             data['fld_wgt'], data['fact_wgt'], data['scorch_kg'], data['quality_pct'],
-            entry_id
+            Json(flags), entry_id
         ))
+        _refresh_daily_rollups(cursor, old[6])
+        notify_entries_changed(cursor, old[6])
+        notify_entry_event(cursor, "update", _fetch_entry(conn, entry_id), old_entry)
         conn.commit()
+        _wrote()
+        entries_changed(old[6])
+        return flags
     except Exception as e:
         conn.rollback()
         raise
@@ -194,42 +433,112 @@ def update_entry(entry_id, data):
 
 def get_entry_by_id(entry_id):
     conn = get_connection()
-    cursor = conn.cursor(cursor_factory=RealDictCursor)
+    
+    try:
+        return _fetch_entry(conn, entry_id)
+    finally:
+        conn.close()
+
+def _fetch_entry(conn, entry_id):
+    rows = _fetch_entries(conn, [entry_id])
+    return rows[0] if rows else None
+
+def _fetch_entries(conn, entry_ids):
+    # Also used inside write transactions, where it sees the uncommitted rows
+    cursor = entry_cursor(conn)
+    
+    try:
+        query = _ENTRY_SELECT + """
+            WHERE e.id = ANY(%s)
+            ORDER BY e.id ASC
+        """
+        cursor.execute(query, (list(entry_ids),))
+        return fetch_entry_rows(cursor)
+    finally:
+        cursor.close()
+
+def get_all_entries():
+    conn = get_read_connection()
+    cursor = entry_cursor(conn)
+    
+    try:
+        query = _ENTRY_SELECT + """
+            ORDER BY e.date DESC
+        """
+        cursor.execute(query)
+        return fetch_entry_rows(cursor)
+    finally:
+        cursor.close()
+        conn.close()
+
+def get_entries_between(start_date, end_date):
+    conn = get_read_connection()
+    cursor = entry_cursor(conn)
+    
+    try:
+        query = _ENTRY_SELECT + """
+            WHERE e.date BETWEEN %s AND %s
+            ORDER BY e.date ASC, e.id ASC
+        """
+        cursor.execute(query, (start_date, end_date))
+        return fetch_entry_rows(cursor)
+    finally:
+        cursor.close()
+        conn.close()
+
+def get_zone_daily_totals(end_date=None):
+    """(date, zone, total fact_wgt) rows up to end_date, for the report summary table"""
+    # Primary: the daily report is built right after its entries are saved
+    conn = get_connection()
+    cursor = conn.cursor()
     
     try:
         query = """
-            SELECT e.*, z.name as zone, c.name as clerk, v.reg_number as vehicle, r.name as route
+            SELECT e.date, z.name, COALESCE(SUM(e.fact_wgt), 0)
             FROM daily_entries e
             LEFT JOIN zones z ON e.zone_id = z.id
-            LEFT JOIN clerks c ON e.clerk_id = c.id
-            LEFT JOIN vehicles v ON e.vehicle_id = v.id
-            LEFT JOIN routes r ON e.route_id = r.id
-            WHERE e.id=%s
         """
-        cursor.execute(query, (entry_id,))
-        row = cursor.fetchone()
-        return dict(row) if row else None
+        params = []
+        if end_date:
+            query += " WHERE e.date<=%s"
+            params.append(end_date)
+        query += " GROUP BY e.date, z.name ORDER BY e.date ASC"
+        cursor.execute(query, params)
+        return cursor.fetchall()
     finally:
         cursor.close()
         conn.close()
 
-def get_all_entries():
+def get_daily_totals(zone=None, route=None, start_date=None, end_date=None):
+    """Daily sums of factory weight, optionally narrowed to a zone or route"""
+    # Primary: forecasts cache this until the next write, so a lagging read would stick
     conn = get_connection()
-    cursor = conn.cursor(cursor_factory=RealDictCursor)
+    cursor = conn.cursor()
     
     try:
         query = """
-            SELECT e.*, z.name as zone, c.name as clerk, v.reg_number as vehicle, r.name as route
+            SELECT e.date, COALESCE(SUM(e.fact_wgt), 0)
             FROM daily_entries e
             LEFT JOIN zones z ON e.zone_id = z.id
-            LEFT JOIN clerks c ON e.clerk_id = c.id
-            LEFT JOIN vehicles v ON e.vehicle_id = v.id
             LEFT JOIN routes r ON e.route_id = r.id
-            ORDER BY e.date DESC
+            WHERE 1=1
         """
-        cursor.execute(query)
-        rows = cursor.fetchall()
-        return [dict(row) for row in rows]
+        params = []
+        if zone:
+            query += " AND z.name=%s"
+            params.append(zone.upper().strip())
+        if route:
+            query += " AND r.name=%s"
+            params.append(route.upper().strip())
+        if start_date:
+            query += " AND e.date>=%s"
+            params.append(start_date)
+        if end_date:
+            query += " AND e.date<=%s"
+            params.append(end_date)
+        query += " GROUP BY e.date ORDER BY e.date ASC"
+        cursor.execute(query, params)
+        return [(row[0], float(row[1])) for row in cursor.fetchall()]
     finally:
         cursor.close()
         conn.close()
@@ -1,19 +1,110 @@
 import openpyxl
 from openpyxl.utils import get_column_letter
+from openpyxl.chart import LineChart, Reference
+from openpyxl.styles import Font, PatternFill
 import os
-from datetime import datetime
+from bisect import bisect_right
+from datetime import date, datetime
 try:
     import win32com.client as win32
 except ImportError:
     win32 = None
 
-from .database import get_all_entries
+from .database import get_zone_daily_totals
+from .rows import EntryRow
+from .report_catalog import record_report
+from .artifacts import atomic_output, render_once, source_fingerprint
 
 
 TEMPLATE_PATH = "Report.xlsx.xlsm"
 OUTPUT_DIR = "PDF Records"
+SUMMARY_DAYS = 25  # Rows 30-54 of the summary table feeding the chart
+HEADER_FILL = PatternFill(start_color="16A34A", end_color="16A34A", fill_type="solid")
 
-def update_excel_report(entries, report_date):
+# Mapping for zones to row starting points (based on CSV analysis)
+# Zone 1 Norah: Row 6
+# Zone 2: Row 9
+# Zone 3 Dennis: Row 15
+# Zone 4 Westone: Row 21
+ZONE_ROWS = {
+    "ZONE 1 NORAH": 6,
+    "ZONE 2": 9,
+    "ZONE 3 DENNIS": 15,
+    "ZONE 4 WESTONE": 21
+}
+
+def match_zone(zone):
+    """Map a database zone name onto its template zone key"""
+    zone = (zone or "").upper().strip()
+    if not zone:
+        return None
+    for k in ZONE_ROWS:
+        # Handle template zone names with trailing spaces or different casing
+        clean_k = k.upper().strip()
+        if clean_k in zone or zone in clean_k:
+            return k
+    return None
+
+def build_date_sums(zone_totals):
+    """Fold (date, zone, total) rows into {date: {template zone: total}}"""
+    date_sums = {}
+    for d, zone, total in zone_totals:
+        if d not in date_sums:
+            date_sums[d] = {k: 0 for k in ZONE_ROWS}
+        match = match_zone(zone)
+        if match:
+            date_sums[d][match] += (total or 0)
+    return date_sums
+
+def summary_windows(date_sums, report_dates):
+    """
+    For each report date, the last SUMMARY_DAYS dates with data up to and including it.
+    All windows are cut from one sorted date list, so many dates cost a single pass.
+    """
+    sorted_dates = sorted(date_sums.keys())
+    windows = {}
+    for report_date in report_dates:
+        idx = bisect_right(sorted_dates, _to_date(report_date))
+        windows[report_date] = [(d, date_sums[d]) for d in sorted_dates[max(0, idx - SUMMARY_DAYS):idx]]
+    return windows
+
+def _to_date(value):
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return datetime.strptime(str(value)[:10], "%Y-%m-%d").date()
+
+def _template_mtime():
+    try:
+        return os.path.getmtime(TEMPLATE_PATH)
+    except OSError:
+        return None
+
+def update_excel_report(entries, report_date, summary=None):
+    """
+    Fill the template for one day and export it. `summary` is the list of
+    (date, zone totals) rows for the chart table; when omitted it is loaded
+    from the database.
+    """
+    # Update Summary Section (Rows 30+) from historical zone totals
+    # This ensures the chart stays up-to-date
+    if summary is None:
+        date_sums = build_date_sums(get_zone_daily_totals(report_date))
+        summary = summary_windows(date_sums, [report_date])[report_date]
+    
+    # One render per date at a time across workers; a waiter reuses the result
+    output_filename = f"Report_{report_date.replace('-', '')}.xlsm"
+    # The template's mtime is part of the source: a catalogued file from the same rows is reused
+    source_hash = source_fingerprint(entries, summary, _template_mtime())
+    return render_once(
+        f"daily:{report_date}",
+        [output_filename.replace(".xlsm", ".pdf"), output_filename],
+        source_hash,
+        lambda: _render_excel_report(entries, report_date, summary, output_filename, source_hash)
+    )
+
+def _render_excel_report(entries, report_date, summary, output_filename, source_hash):
     if not os.path.exists(OUTPUT_DIR):
         os.makedirs(OUTPUT_DIR)
         
@@ -24,22 +115,11 @@ def update_excel_report(entries, report_date):
     # Column F is index 6 (1-indexed)
     sheet.cell(row=4, column=6).value = report_date
     
-    # Mapping for zones to row starting points (based on CSV analysis)
-    # Zone 1 Norah: Row 6
-    # Zone 2: Row 9
-    # Zone 3 Dennis: Row 15
-    # Zone 4 Westone: Row 21
-    
-    zone_rows = {
-        "ZONE 1 NORAH": 6,
-        "ZONE 2": 9,
-        "ZONE 3 DENNIS": 15,
-        "ZONE 4 WESTONE": 21
-    }
+    zone_rows = ZONE_ROWS
     
     # Sort entries by zone to ensure they are grouped
     # And then sort by clerk or just maintain input order within zone
-    sorted_entries = sorted(entries, key=lambda x: x.get("zone", "").upper())
+    sorted_entries = sorted(entries, key=lambda x: (x.zone or "").upper())
     
     current_row_idx = {k: v for k, v in zone_rows.items()}
     zone_totals = {k: 0 for k in zone_rows}
@@ -51,30 +131,22 @@ def update_excel_report(entries, report_date):
                  sheet.cell(row=r, column=c).value = None
 
     for entry in sorted_entries:
-        zone = entry.get("zone", "").upper().strip()
-        match = None
-        for k in zone_rows:
-            # Handle template zone names with trailing spaces or different casing
-            clean_k = k.upper().strip()
-            if clean_k in zone or zone in clean_k:
-                match = k
-                break
-        
+        match = match_zone(entry.zone)
         if match:
             r = current_row_idx[match]
             # Headers: ZONE(D), CLERK(E), (F empty), VEHICLE(G), ROUTE(H), (I empty), (J empty), FLD WGT(K), FACT WGT(L), VAR(M), EXP.VAR(N), (%)VAR(O), Scorch(P), Quality(Q)
-            sheet.cell(row=r, column=5).value = entry.get("clerk")
-            sheet.cell(row=r, column=7).value = entry.get("vehicle")
-            sheet.cell(row=r, column=8).value = entry.get("route")
-            sheet.cell(row=r, column=9).value = entry.get("time_out")
-            sheet.cell(row=r, column=10).value = entry.get("time_in")
-            sheet.cell(row=r, column=11).value = entry.get("fld_wgt")
-            sheet.cell(row=r, column=12).value = entry.get("fact_wgt")
-            sheet.cell(row=r, column=16).value = entry.get("scorch_kg")
-            sheet.cell(row=r, column=17).value = entry.get("quality_pct")
+            sheet.cell(row=r, column=5).value = entry.clerk
+            sheet.cell(row=r, column=7).value = entry.vehicle
+            sheet.cell(row=r, column=8).value = entry.route
+            sheet.cell(row=r, column=9).value = entry.time_out
+            sheet.cell(row=r, column=10).value = entry.time_in
+            sheet.cell(row=r, column=11).value = entry.fld_wgt
+            sheet.cell(row=r, column=12).value = entry.fact_wgt
+            sheet.cell(row=r, column=16).value = entry.scorch_kg
+            sheet.cell(row=r, column=17).value = entry.quality_pct
             
             current_row_idx[match] += 1
-            zone_totals[match] += (entry.get("fact_wgt") or 0)
+            zone_totals[match] += (entry.fact_wgt or 0)
 
     # TEMPORARILY DISABLED Hiding to check if it's causing the blank issue
     # for z, (r_start, r_end) in zone_ranges.items():
@@ -83,48 +155,31 @@ def update_excel_report(entries, report_date):
     #     for r in range(r_start, current_row_idx.get(z, r_start)):
     #         sheet.row_dimensions[r].hidden = False
 
-    # Update Summary Section (Rows 30+) from ALL historical data
-    # This ensures the chart stays up-to-date
-    all_history = get_all_entries()
-    # Group by date then zone
-    date_sums = {}
-    for h in all_history:
-        d = h['date']
-        if d not in date_sums:
-            date_sums[d] = {k: 0 for k in zone_rows}
-        
-        h_zone = h['zone'].upper()
-        for k in zone_rows:
-            if k.upper() in h_zone or h_zone in k.upper():
-                date_sums[d][k] += (h['fact_wgt'] or 0)
-                break
-    
-    # Sort dates
-    sorted_dates = sorted(date_sums.keys())
-    # Take last 20 dates to fit in summary table
-    plot_dates = sorted_dates[-25:]
-    
     # Clear summary table area
     for r in range(30, 56):
         for c in range(3, 8):
             sheet.cell(row=r, column=c).value = None
             
-    for i, d in enumerate(plot_dates):
+    for i, (d, sums) in enumerate(summary):
         row = 30 + i
         sheet.cell(row=row, column=3).value = d
-        sheet.cell(row=row, column=4).value = date_sums[d]["ZONE 1 NORAH"]
-        sheet.cell(row=row, column=5).value = date_sums[d]["ZONE 2"]
-        sheet.cell(row=row, column=6).value = date_sums[d]["ZONE 3 DENNIS"]
-        sheet.cell(row=row, column=7).value = date_sums[d]["ZONE 4 WESTONE"]
+        sheet.cell(row=row, column=4).value = sums["ZONE 1 NORAH"]
+        sheet.cell(row=row, column=5).value = sums["ZONE 2"]
+        sheet.cell(row=row, column=6).value = sums["ZONE 3 DENNIS"]
+        sheet.cell(row=row, column=7).value = sums["ZONE 4 WESTONE"]
 
-    output_filename = f"Report_{report_date.replace('-', '')}.xlsm"
     output_path = os.path.abspath(os.path.join(OUTPUT_DIR, output_filename))
-    wb.save(output_path)
+    # Write to a temp file and rename so readers never see a half-written workbook
+    with atomic_output(output_path) as temp_path:
+        wb.save(temp_path)
+    record_report(output_path, source_hash)
     
     pdf_path = output_path.replace(".xlsm", ".pdf")
     if win32:
         try:
-            convert_to_pdf(output_path, pdf_path)
+            with atomic_output(pdf_path) as temp_pdf:
+                convert_to_pdf(output_path, temp_pdf)
+            record_report(pdf_path, source_hash)
             return pdf_path
         except Exception as e:
             print(f"PDF conversion failed: {e}")
@@ -132,7 +187,7 @@ def update_excel_report(entries, report_date):
     
     return output_path
 
-def convert_to_pdf(excel_path, pdf_path):
+def convert_to_pdf(excel_path, pdf_path, print_area="$A$1:$Q$50"):
     import time
     import win32com.client as win32
     import pythoncom
@@ -144,7 +199,8 @@ def convert_to_pdf(excel_path, pdf_path):
     abs_xl_path = os.path.abspath(excel_path)
     abs_pdf_path = os.path.abspath(pdf_path)
     
-    excel = win32.Dispatch("Excel.Application")
+    # DispatchEx starts a private Excel instance so parallel renders don't share one
+    excel = win32.DispatchEx("Excel.Application")
     excel.Visible = False
     excel.DisplayAlerts = False
     excel.EnableEvents = False # Disable macros/events
@@ -175,9 +231,13 @@ def convert_to_pdf(excel_path, pdf_path):
             sheet.PageSetup.Orientation = 2 # xlLandscape
             sheet.PageSetup.Zoom = False
             sheet.PageSetup.FitToPagesWide = 1
-            sheet.PageSetup.FitToPagesTall = 1
-            # EXPLICIT PRINT AREA to force capture
-            sheet.PageSetup.PrintArea = "$A$1:$Q$50" 
+            if print_area:
+                sheet.PageSetup.FitToPagesTall = 1
+                # EXPLICIT PRINT AREA to force capture
+                sheet.PageSetup.PrintArea = print_area
+            else:
+                # Long period reports flow onto as many pages as needed
+                sheet.PageSetup.FitToPagesTall = False
         except Exception as e:
             print(f"Warning: PageSetup adjustments failed: {e}")
         
@@ -194,11 +254,119 @@ def convert_to_pdf(excel_path, pdf_path):
         excel.Quit()
 
 
+def _write_table(sheet, row, title, columns, records):
+    """Write a titled table starting at `row`; returns the next free row"""
+    sheet.cell(row=row, column=1).value = title
+    sheet.cell(row=row, column=1).font = Font(bold=True, size=12)
+    row += 1
+    for c, (header, _) in enumerate(columns, start=1):
+        cell = sheet.cell(row=row, column=c)
+        cell.value = header
+        cell.font = Font(bold=True, color="FFFFFF")
+        cell.fill = HEADER_FILL
+    for record in records:
+        row += 1
+        for c, (_, key) in enumerate(columns, start=1):
+            sheet.cell(row=row, column=c).value = record.get(key)
+    return row + 2
+
+def write_period_report(summary):
+    """
+    Build a weekly/monthly workbook from a period summary (see period_reports):
+    KPI block, zone/route/clerk tables and a daily zone trend chart.
+    """
+    output_filename = f"Report_{summary['period'].capitalize()}_{summary['start'].replace('-', '')}.xlsx"
+    source_hash = source_fingerprint(summary)
+    return render_once(
+        f"{summary['period']}:{summary['start']}",
+        [output_filename.replace(".xlsx", ".pdf"), output_filename],
+        source_hash,
+        lambda: _render_period_report(summary, output_filename, source_hash)
+    )
+
+def _render_period_report(summary, output_filename, source_hash):
+    if not os.path.exists(OUTPUT_DIR):
+        os.makedirs(OUTPUT_DIR)
+    
+    wb = openpyxl.Workbook()
+    sheet = wb.active
+    sheet.title = "Report"
+    
+    sheet.cell(row=1, column=1).value = f"GL Collection Report - {summary['label']}"
+    sheet.cell(row=1, column=1).font = Font(bold=True, size=14)
+    sheet.cell(row=2, column=1).value = f"{summary['start']} to {summary['end']}"
+    
+    kpis = summary["kpis"]
+    kpi_rows = [
+        ("Total Factory Weight (KG)", kpis["fact_wgt"]),
+        ("Total Field Weight (KG)", kpis["fld_wgt"]),
+        ("(%)VAR", kpis["var_pct"]),
+        ("Avg Quality (%)", kpis["avg_quality"]),
+        ("Entries", kpis["entries"]),
+        ("Active Days", kpis["active_days"]),
+    ]
+    for i, (label, value) in enumerate(kpi_rows):
+        sheet.cell(row=4 + i, column=1).value = label
+        sheet.cell(row=4 + i, column=2).value = value
+    
+    columns = [
+        ("Name", "name"), ("Entries", "entries"), ("Fld Wgt", "fld_wgt"), ("Fact Wgt", "fact_wgt"),
+        ("(%)VAR", "var_pct"), ("Scorch", "scorch_kg"), ("Avg Quality", "avg_quality"),
+    ]
+    row = 4 + len(kpi_rows) + 1
+    row = _write_table(sheet, row, "Zones", columns, summary["zones"])
+    row = _write_table(sheet, row, "Routes", columns, summary["routes"])
+    row = _write_table(sheet, row, "Clerks", columns, summary["clerks"])
+    for c in range(1, len(columns) + 1):
+        sheet.column_dimensions[get_column_letter(c)].width = 16
+    
+    # Daily zone totals on their own sheet, charted on the report sheet
+    trend = wb.create_sheet("Trend")
+    zones = list(summary["trend"]["series"].keys())
+    trend.cell(row=1, column=1).value = "Date"
+    for c, zone in enumerate(zones, start=2):
+        trend.cell(row=1, column=c).value = zone
+    for r, d in enumerate(summary["trend"]["dates"], start=2):
+        trend.cell(row=r, column=1).value = d
+        for c, zone in enumerate(zones, start=2):
+            trend.cell(row=r, column=c).value = summary["trend"]["series"][zone][r - 2]
+    
+    if zones:
+        n_days = len(summary["trend"]["dates"])
+        chart = LineChart()
+        chart.title = "Daily Factory Weight by Zone"
+        chart.y_axis.title = "KG"
+        chart.height = 8
+        chart.width = 24
+        data = Reference(trend, min_col=2, max_col=len(zones) + 1, min_row=1, max_row=n_days + 1)
+        chart.add_data(data, titles_from_data=True)
+        chart.set_categories(Reference(trend, min_col=1, min_row=2, max_row=n_days + 1))
+        sheet.add_chart(chart, "I4")
+    
+    output_path = os.path.abspath(os.path.join(OUTPUT_DIR, output_filename))
+    with atomic_output(output_path) as temp_path:
+        wb.save(temp_path)
+    record_report(output_path, source_hash)
+    
+    pdf_path = output_path.replace(".xlsx", ".pdf")
+    if win32:
+        try:
+            with atomic_output(pdf_path) as temp_pdf:
+                convert_to_pdf(output_path, temp_pdf, print_area=None)
+            record_report(pdf_path, source_hash)
+            return pdf_path
+        except Exception as e:
+            print(f"PDF conversion failed: {e}")
+            return output_path
+    
+    return output_path
+
+
 if __name__ == "__main__":
     # Test update
-    sample_entries = [
+    sample_entries = [EntryRow.from_mapping(
         {"zone": "ZONE 1 NORAH", "clerk": "Test Clerk", "vehicle": "KXX001", "route": "R1", "fld_wgt": 100, "fact_wgt": 105, "scorch_kg": 5, "quality_pct": 25}
-    ]
+    )]
     path = update_excel_report(sample_entries, "2023-12-19")
     print(f"Generated test report: {path}")
 
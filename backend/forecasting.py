@@ -0,0 +1,280 @@
+import threading
+from collections import OrderedDict
+from datetime import date, datetime, timedelta
+
+import numpy as np
+
+from .database import get_daily_totals
+from .query_cache import DateCache
+
+
+HISTORY_DAYS = 180      # Days of daily totals fed to the model
+MA_WINDOW = 7           # Rolling window for the moving average / seasonal detrend
+TREND_WINDOW = 28       # Most recent days used to fit the linear trend
+MAX_HORIZON = 30        # Forecasts are computed this far ahead and sliced per request
+CHART_POINTS = 30       # History points returned alongside the forecast
+Z_95 = 1.96
+MAX_AS_OF_AGE = 5 * 366  # Oldest as-of date accepted, in days before today
+SERIES_CACHE_SIZE = 64   # Scopes whose daily series are kept
+FORECAST_CACHE_SIZE = 256
+FORECAST_CACHE_TTL = 3600
+
+# scope -> {"start": date, "end": date, "values": ndarray of daily totals}, LRU order
+_series_cache = OrderedDict()
+# (scope, as_of) -> computed forecast (history + MAX_HORIZON forecast points)
+_forecast_cache = DateCache(maxsize=FORECAST_CACHE_SIZE, ttl=FORECAST_CACHE_TTL)
+# Guards _series_cache only; never held across a database query
+_lock = threading.Lock()
+# Bumped by every invalidation, so a series fetched across one is not stored
+_series_generation = [0]
+
+
+def _as_date(value):
+    if value is None:
+        return date.today()
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return datetime.strptime(str(value)[:10], "%Y-%m-%d").date()
+
+
+def parse_scope(scope):
+    """Split 'all', 'zone:<name>' or 'route:<name>' into (zone, route) filters"""
+    scope = (scope or "all").strip()
+    if scope.lower() == "all":
+        return None, None
+    kind, _, name = scope.partition(":")
+    kind = kind.strip().lower()
+    name = name.strip()
+    if not name or kind not in ("zone", "route"):
+        raise ValueError("Invalid scope. Use 'all', 'zone:<name>' or 'route:<name>'")
+    return (name, None) if kind == "zone" else (None, name)
+
+
+def _normalize_scope(scope):
+    zone, route = parse_scope(scope)
+    if zone:
+        return f"zone:{zone.upper()}"
+    if route:
+        return f"route:{route.upper()}"
+    return "all"
+
+
+def _densify(rows, start, end):
+    """Turn sparse (date, total) rows into one value per calendar day, zero-filled"""
+    values = np.zeros((end - start).days + 1)
+    if rows:
+        idx = np.fromiter(((d - start).days for d, _ in rows), dtype=np.int64, count=len(rows))
+        values[idx] = np.fromiter((v for _, v in rows), dtype=float, count=len(rows))
+    return values
+
+
+def _load_series(scope, as_of):
+    """Daily totals for [as_of - HISTORY_DAYS + 1, as_of], fetching only days not cached yet"""
+    zone, route = parse_scope(scope)
+    start = as_of - timedelta(days=HISTORY_DAYS - 1)
+    with _lock:
+        cached = _series_cache.get(scope)
+        if cached is not None:
+            _series_cache.move_to_end(scope)
+            cached = dict(cached)
+        generation = _series_generation[0]
+
+    if cached is None or cached["start"] > start:
+        rows = get_daily_totals(zone=zone, route=route, start_date=start, end_date=as_of)
+        cached = {"start": start, "end": as_of, "values": _densify(rows, start, as_of)}
+    elif cached["end"] < as_of:
+        # A new day landed since the last fetch: append just the missing tail
+        tail_start = cached["end"] + timedelta(days=1)
+        rows = get_daily_totals(zone=zone, route=route, start_date=tail_start, end_date=as_of)
+        cached["values"] = np.concatenate([cached["values"], _densify(rows, tail_start, as_of)])
+        cached["end"] = as_of
+
+    if cached["end"] == as_of and cached["start"] < start:
+        # Keep the cache bounded to the window of the most recent as-of date
+        cached["values"] = cached["values"][(start - cached["start"]).days:]
+        cached["start"] = start
+
+    with _lock:
+        if generation == _series_generation[0]:
+            _series_cache[scope] = cached
+            _series_cache.move_to_end(scope)
+            while len(_series_cache) > SERIES_CACHE_SIZE:
+                _series_cache.popitem(last=False)
+
+    offset = (start - cached["start"]).days
+    return cached["values"][offset:offset + HISTORY_DAYS]
+
+
+def rolling_mean(values, window):
+    """Trailing mean over up to `window` points (shorter at the start of the series)"""
+    csum = np.concatenate([[0.0], np.cumsum(values)])
+    idx = np.arange(1, len(values) + 1)
+    lo = np.maximum(idx - window, 0)
+    return (csum[idx] - csum[lo]) / (idx - lo)
+
+
+def rolling_std(values, window):
+    """Trailing population standard deviation, same windowing as rolling_mean"""
+    mean = rolling_mean(values, window)
+    mean_sq = rolling_mean(values * values, window)
+    return np.sqrt(np.maximum(mean_sq - mean * mean, 0.0))
+
+
+def fit_seasonal_model(values, first_weekday):
+    """
+    Additive day-of-week model: linear trend on the deseasonalized recent window
+    plus a zero-mean offset per weekday (Monday=0).
+    """
+    n = len(values)
+    weekdays = (first_weekday + np.arange(n)) % 7
+
+    seasonal = np.zeros(7)
+    if n >= 2 * MA_WINDOW:
+        trailing = rolling_mean(values, MA_WINDOW)
+        # Shift the trailing average to centre it, padding the last few days
+        half = MA_WINDOW // 2
+        centered = np.concatenate([trailing[half:], np.repeat(trailing[-1], half)])
+        counts = np.bincount(weekdays, minlength=7)
+        sums = np.bincount(weekdays, weights=values - centered, minlength=7)
+        seasonal = np.divide(sums, counts, out=np.zeros(7), where=counts > 0)
+        seasonal -= seasonal.mean()
+
+    m = min(n, TREND_WINDOW)
+    x = np.arange(n - m, n, dtype=float)
+    y = values[-m:] - seasonal[weekdays[-m:]]
+    if m >= 3:
+        slope, intercept = np.polyfit(x, y, 1)
+        residuals = y - (intercept + slope * x)
+        sigma = float(np.sqrt(np.sum(residuals ** 2) / (m - 2)))
+    else:
+        slope, intercept = 0.0, float(y.mean()) if m else 0.0
+        sigma = 0.0
+
+    return {
+        "slope": float(slope),
+        "intercept": float(intercept),
+        "seasonal": seasonal,
+        "sigma": sigma,
+        "x_mean": float(x.mean()) if m else 0.0,
+        "x_ss": float(np.sum((x - x.mean()) ** 2)) if m else 0.0,
+        "fit_points": m,
+        "last_weekday": int(weekdays[-1]) if n else 0,
+        "n": n,
+    }
+
+
+def _project(model, horizon):
+    """Point forecast and 95% prediction band for days 1..horizon after the series"""
+    h = np.arange(1, horizon + 1)
+    x = model["n"] - 1 + h
+    seasonal = model["seasonal"][(model["last_weekday"] + h) % 7]
+    point = model["intercept"] + model["slope"] * x + seasonal
+
+    m = model["fit_points"]
+    if m >= 3 and model["x_ss"] > 0:
+        spread = np.sqrt(1 + 1 / m + (x - model["x_mean"]) ** 2 / model["x_ss"])
+    else:
+        spread = np.ones(horizon)
+    band = Z_95 * model["sigma"] * spread
+
+    return np.maximum(point, 0), np.maximum(point - band, 0), np.maximum(point + band, 0)
+
+
+def _compute(scope, as_of):
+    values = _load_series(scope, as_of)
+    first_day = as_of - timedelta(days=len(values) - 1)
+
+    # Ignore leading empty days from before this scope had any collections
+    nonzero = np.flatnonzero(values)
+    if len(nonzero):
+        first_day += timedelta(days=int(nonzero[0]))
+        values = values[nonzero[0]:]
+    else:
+        values = values[-1:]
+        first_day = as_of
+
+    moving_avg = rolling_mean(values, MA_WINDOW)
+    moving_std = rolling_std(values, MA_WINDOW)
+    model = fit_seasonal_model(values, first_day.weekday())
+    point, lower, upper = _project(model, MAX_HORIZON)
+
+    tail = min(len(values), CHART_POINTS)
+    history = [
+        {
+            "date": (as_of - timedelta(days=tail - 1 - i)).isoformat(),
+            "weight": round(float(values[-tail + i]), 2),
+            "movingAvg": round(float(moving_avg[-tail + i]), 2),
+            "movingStd": round(float(moving_std[-tail + i]), 2),
+        }
+        for i in range(tail)
+    ]
+    forecast = [
+        {
+            "date": (as_of + timedelta(days=i + 1)).isoformat(),
+            "weight": None,
+            "movingAvg": None,
+            "forecast": round(float(point[i]), 2),
+            "lower": round(float(lower[i]), 2),
+            "upper": round(float(upper[i]), 2),
+        }
+        for i in range(MAX_HORIZON)
+    ]
+    weekdays = ["MON", "TUE", "WED", "THU", "FRI", "SAT", "SUN"]
+    return {
+        "scope": scope,
+        "as_of": as_of.isoformat(),
+        "model": {
+            "trend_per_day": round(model["slope"], 2),
+            "seasonal": {weekdays[i]: round(float(model["seasonal"][i]), 2) for i in range(7)},
+            "residual_std": round(model["sigma"], 2),
+            "days_used": model["n"],
+        },
+        "history": history,
+        "forecast": forecast,
+    }
+
+
+def _validate_as_of(as_of):
+    today = date.today()
+    if as_of > today:
+        raise ValueError("as_of cannot be in the future")
+    if as_of < today - timedelta(days=MAX_AS_OF_AGE):
+        raise ValueError(f"as_of must be within {MAX_AS_OF_AGE} days of today")
+    return as_of
+
+
+def get_forecast(scope="all", horizon=7, as_of=None):
+    """Forecast daily collection weight for a scope, cached per (scope, as-of date)"""
+    if not 1 <= horizon <= MAX_HORIZON:
+        raise ValueError(f"Horizon must be between 1 and {MAX_HORIZON} days")
+    scope = _normalize_scope(scope)
+    try:
+        as_of = _validate_as_of(_as_date(as_of))
+    except (TypeError, OverflowError):
+        raise ValueError("as_of must be a YYYY-MM-DD date")
+
+    # Computed outside any global lock: requests for other scopes never queue behind this one
+    result = _forecast_cache.get_or_load((scope, as_of), lambda: _compute(scope, as_of))
+    return {**result, "horizon": horizon, "forecast": result["forecast"][:horizon]}
+
+
+def invalidate_forecasts(entry_date):
+    """
+    Drop forecasts that include `entry_date` and trim cached series back to the
+    day before it, so the next request refetches only the changed tail.
+    """
+    changed = _as_date(entry_date)
+    _forecast_cache.invalidate_where(lambda key: key[1] >= changed)
+    with _lock:
+        _series_generation[0] += 1
+        for scope, cached in list(_series_cache.items()):
+            if cached["end"] < changed:
+                continue
+            if cached["start"] >= changed:
+                del _series_cache[scope]
+                continue
+            keep = (changed - cached["start"]).days
+            cached["values"] = cached["values"][:keep]
+            cached["end"] = changed - timedelta(days=1)
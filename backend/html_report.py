@@ -0,0 +1,720 @@
+import os
+import json
+import threading
+from collections import OrderedDict
+from html import escape
+from typing import List
+from .report_catalog import record_report
+from .rows import EntryRow, rows_to_json
+from .artifacts import atomic_write_text, render_once, source_fingerprint
+from .svg_charts import bar_chart, bar_line_chart
+
+OUTPUT_DIR = "PDF Records"
+
+# Saved (and emailed) daily reports: 'offline' is self-contained (inline CSS,
+# server-rendered SVG charts, no CDN scripts); 'interactive' is the Tailwind/Chart.js dashboard.
+HTML_MODES = ("offline", "interactive")
+HTML_REPORT_MODE = os.getenv('HTML_REPORT_MODE', 'offline')
+if HTML_REPORT_MODE not in HTML_MODES:
+    print(f"❌ Invalid HTML_REPORT_MODE '{HTML_REPORT_MODE}' (use {' or '.join(HTML_MODES)}); using 'offline'")
+    HTML_REPORT_MODE = "offline"
+CHART_CACHE_SIZE = 32
+
+_chart_cache = OrderedDict()     # report source_hash -> (zone svg, route svg)
+_chart_lock = threading.Lock()
+
+def save_html_report_to_file(report_date: str, entries: List[EntryRow], mode: str = None) -> str:
+    mode = mode or HTML_REPORT_MODE
+    filename = f"Report_{report_date}.html"
+    source_hash = source_fingerprint(entries, mode)
+    return render_once(
+        f"daily-html:{report_date}", [filename], source_hash,
+        lambda: _write_report(filename, render_html_report(report_date, entries, mode, source_hash), source_hash)
+    )
+
+def render_html_report(report_date: str, entries: List[EntryRow], mode: str = "interactive",
+                       source_hash: str = None) -> str:
+    if mode not in HTML_MODES:
+        raise ValueError(f"Invalid mode '{mode}'. Use one of: {', '.join(HTML_MODES)}")
+    if mode == "offline":
+        return generate_offline_html_content(report_date, entries, source_hash)
+    return generate_html_content(report_date, entries)
+
+def _write_report(filename: str, html_content: str, source_hash: str) -> str:
+    # Temp file + rename: readers never see a half-written report
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
+    file_path = atomic_write_text(os.path.join(OUTPUT_DIR, filename), html_content)
+    record_report(file_path, source_hash)
+    return file_path
+
+def generate_html_content(report_date: str, entries: List[EntryRow]) -> str:
+    # Serialize entries to JSON (weights are floats, so the template can call toFixed)
+    json_data = rows_to_json(entries)
+    
+    # HTML Template with placeholders
+    html_template = """
+    <!DOCTYPE html>
+    <html lang="en">
+    <head>
+        <meta charset="UTF-8">
+        <meta name="viewport" content="width=device-width, initial-scale=1.0">
+        <title>GL Collection Report - {{REPORT_DATE}}</title>
+        <script src="https://cdn.tailwindcss.com"></script>
+        <script src="https://cdn.jsdelivr.net/npm/chart.js"></script>
+        <style>
+            :root { --primary: #16a34a; --bg: #020617; --glass: rgba(255,255,255,0.03); --border: rgba(255,255,255,0.05); }
+            body { background-color: var(--bg); color: #e2e8f0; font-family: 'Inter', system-ui, sans-serif; }
+            .glass { background: var(--glass); backdrop-filter: blur(10px); border: 1px solid var(--border); }
+            .card { transition: transform 0.2s; }
+            .card:hover { transform: translateY(-2px); border-color: rgba(255,255,255,0.1); }
+            select, input { background: rgba(0,0,0,0.3); border: 1px solid var(--border); color: white; padding: 0.5rem; border-radius: 0.5rem; outline: none; }
+            select:focus, input:focus { border-color: var(--primary); }
+            th { text-align: left; font-size: 0.75rem; text-transform: uppercase; letter-spacing: 0.05em; color: #64748b; padding: 1rem; }
+            td { padding: 1rem; border-top: 1px solid var(--border); }
+            tr:hover td { background: rgba(255,255,255,0.02); }
+        </style>
+    </head>
+    <body class="min-h-screen p-4 md:p-8">
+        <div class="max-w-7xl mx-auto space-y-8">
+            <!-- Header -->
+            <header class="flex flex-col md:flex-row justify-between items-start md:items-end gap-4 border-b border-slate-800 pb-6">
+                <div>
+                    <h1 class="text-3xl font-bold text-white tracking-tight">GL Collection Report</h1>
+                    <p class="text-slate-500 mt-1 uppercase tracking-widest text-xs font-semibold">{{REPORT_DATE}}</p>
+                </div>
+                <div class="text-left md:text-right">
+                    <p class="text-green-500 font-bold text-xl">GREENFIELDS TEA</p>
+                    <p class="text-slate-500 text-xs">Interactive Digital Dashboard</p>
+                </div>
+            </header>
+
+            <!-- Filters -->
+            <div class="glass p-4 rounded-xl flex flex-wrap gap-4 items-center">
+                <div class="flex items-center gap-2">
+                    <span class="text-xs font-bold text-slate-500 uppercase">Filter By:</span>
+                </div>
+                <select id="zoneFilter" onchange="applyFilters()" class="min-w-[150px]">
+                    <option value="">All Zones</option>
+                </select>
+                <select id="routeFilter" onchange="applyFilters()" class="min-w-[150px]">
+                    <option value="">All Routes</option>
+                </select>
+                <input type="text" id="searchFilter" onkeyup="applyFilters()" placeholder="Search clerk, vehicle..." class="min-w-[200px]">
+                <div class="ml-auto text-xs text-slate-400">
+                    Showing <span id="countDisplay" class="font-bold text-white">0</span> records
+                    &bull; <span id="flaggedDisplay" class="font-bold text-amber-400">0</span> flagged
+                </div>
+            </div>
+
+            <!-- KPI Cards -->
+            <div class="grid grid-cols-1 md:grid-cols-4 gap-6">
+                <div class="glass card p-6 rounded-2xl">
+                    <p class="text-slate-500 text-xs font-bold uppercase tracking-wider mb-1">Total Weight</p>
+                    <p class="text-3xl font-bold text-white"><span id="totalWeight">0</span> <span class="text-sm font-medium text-slate-500">KG</span></p>
+                </div>
+                <div class="glass card p-6 rounded-2xl">
+                    <p class="text-slate-500 text-xs font-bold uppercase tracking-wider mb-1">Avg Quality</p>
+                    <p class="text-3xl font-bold text-white"><span id="avgQuality">0</span>%</p>
+                </div>
+                <div class="glass card p-6 rounded-2xl">
+                    <p class="text-slate-500 text-xs font-bold uppercase tracking-wider mb-1">Routes Active</p>
+                    <p class="text-3xl font-bold text-white" id="totalRoutes">0</p>
+                </div>
+                <div class="glass card p-6 rounded-2xl">
+                    <p class="text-slate-500 text-xs font-bold uppercase tracking-wider mb-1">Entry Count</p>
+                    <p class="text-3xl font-bold text-white" id="totalCount">0</p>
+                </div>
+            </div>
+
+            <!-- Charts Row -->
+            <div class="grid grid-cols-1 md:grid-cols-2 gap-6">
+                <div class="glass p-6 rounded-2xl">
+                    <h3 class="text-sm font-bold text-slate-400 uppercase mb-4">Weight Distribution by Zone</h3>
+                    <div class="h-64">
+                         <canvas id="zoneChart"></canvas>
+                    </div>
+                </div>
+                <div class="glass p-6 rounded-2xl">
+                    <h3 class="text-sm font-bold text-slate-400 uppercase mb-4">Quality vs Weight (Top Routes)</h3>
+                    <div class="h-64">
+                        <canvas id="routeChart"></canvas>
+                    </div>
+                </div>
+            </div>
+
+            <!-- Data Table -->
+            <div class="glass rounded-2xl overflow-hidden overflow-x-auto">
+                <table class="w-full text-left font-mono text-sm">
+                    <thead class="bg-white/5">
+                        <tr>
+                            <th class="cursor-pointer hover:text-white transition-colors" onclick="handleSort('zone')">
+                                Zone <span id="sort-zone" class="ml-1 text-primary-400"></span>
+                            </th>
+                            <th class="cursor-pointer hover:text-white transition-colors" onclick="handleSort('route')">
+                                Route <span id="sort-route" class="ml-1 text-primary-400"></span>
+                            </th>
+                            <th class="cursor-pointer hover:text-white transition-colors" onclick="handleSort('vehicle')">
+                                Vehicle <span id="sort-vehicle" class="ml-1 text-primary-400"></span>
+                            </th>
+                            <th class="cursor-pointer hover:text-white transition-colors" onclick="handleSort('clerk')">
+                                Clerk <span id="sort-clerk" class="ml-1 text-primary-400"></span>
+                            </th>
+                            <th class="text-right cursor-pointer hover:text-white transition-colors" onclick="handleSort('fact_wgt')">
+                                Weight (KG) <span id="sort-fact_wgt" class="ml-1 text-primary-400"></span>
+                            </th>
+                            <th class="text-right cursor-pointer hover:text-white transition-colors" onclick="handleSort('quality_pct')">
+                                Quality % <span id="sort-quality_pct" class="ml-1 text-primary-400"></span>
+                            </th>
+                            <th class="text-right">Flags</th>
+                        </tr>
+                    </thead>
+                    <tbody id="tableBody" class="divide-y divide-white/5 text-slate-300">
+                        <!-- Rows rendered by JS -->
+                    </tbody>
+                </table>
+            </div>
+            
+            <div class="flex justify-center gap-4 text-xs font-medium text-slate-500 uppercase tracking-widest py-8">
+                <span>&copy; 2025 Greenfield Tea Factory</span>
+                <span>&bull;</span>
+                <span>Generated via Greenfield Report System</span>
+            </div>
+        </div>
+
+        <script>
+            // Embedded Data
+            const rawData = {{JSON_DATA}};
+            
+            // State
+            let filteredData = [...rawData];
+            let currentSort = { field: 'zone', asc: true }; // Default sort
+            let zoneChartInstance = null;
+            let routeChartInstance = null;
+
+            // Initialize
+            document.addEventListener('DOMContentLoaded', () => {
+                populateDropdowns();
+                applyFilters();
+            });
+
+            function populateDropdowns() {
+                const zones = [...new Set(rawData.map(d => d.zone))].sort();
+                const routes = [...new Set(rawData.map(d => d.route))].sort();
+                
+                const zSelect = document.getElementById('zoneFilter');
+                zones.forEach(z => {
+                    const opt = document.createElement('option');
+                    opt.value = z;
+                    opt.textContent = z;
+                    zSelect.appendChild(opt);
+                });
+
+                const rSelect = document.getElementById('routeFilter');
+                routes.forEach(r => {
+                    const opt = document.createElement('option');
+                    opt.value = r;
+                    opt.textContent = r;
+                    rSelect.appendChild(opt);
+                });
+            }
+
+            function applyFilters() {
+                const zVal = document.getElementById('zoneFilter').value;
+                const rVal = document.getElementById('routeFilter').value;
+                const sVal = document.getElementById('searchFilter').value.toLowerCase();
+
+                filteredData = rawData.filter(d => {
+                    const matchZone = !zVal || d.zone === zVal;
+                    const matchRoute = !rVal || d.route === rVal;
+                    const matchSearch = !sVal || 
+                        (d.clerk && d.clerk.toLowerCase().includes(sVal)) || 
+                        (d.vehicle && d.vehicle.toLowerCase().includes(sVal));
+                    return matchZone && matchRoute && matchSearch;
+                });
+
+                renderDashboard();
+            }
+
+            function handleSort(field) {
+                if (currentSort.field === field) {
+                    currentSort.asc = !currentSort.asc;
+                } else {
+                    currentSort.field = field;
+                    currentSort.asc = true;
+                }
+                renderDashboard();
+            }
+
+            function renderDashboard() {
+                // 0. Update Sort Icons
+                ['zone', 'route', 'vehicle', 'clerk', 'fact_wgt', 'quality_pct'].forEach(f => {
+                    const el = document.getElementById('sort-' + f);
+                    if (el) el.textContent = '';
+                });
+                const sortIcon = document.getElementById('sort-' + currentSort.field);
+                if (sortIcon) sortIcon.textContent = currentSort.asc ? '↑' : '↓';
+
+                // 1. Sort Data
+                if (currentSort.field) {
+                    filteredData.sort((a, b) => {
+                        let valA = a[currentSort.field];
+                        let valB = b[currentSort.field];
+                        
+                        // Handle numbers
+                        if (typeof valA === 'number' && typeof valB === 'number') {
+                            return currentSort.asc ? valA - valB : valB - valA;
+                        }
+                        
+                        // Handle strings
+                        valA = String(valA || '').toLowerCase();
+                        valB = String(valB || '').toLowerCase();
+                        if (valA < valB) return currentSort.asc ? -1 : 1;
+                        if (valA > valB) return currentSort.asc ? 1 : -1;
+                        return 0;
+                    });
+                }
+
+                // 2. KPIs
+                const totalWgt = filteredData.reduce((sum, d) => sum + (d.fact_wgt || 0), 0);
+                const avgQual = filteredData.length ? filteredData.reduce((sum, d) => sum + (d.quality_pct || 0), 0) / filteredData.length : 0;
+                const uniqueRoutes = new Set(filteredData.map(d => d.route)).size;
+
+                document.getElementById('totalWeight').textContent = totalWgt.toLocaleString(undefined, {minimumFractionDigits: 1, maximumFractionDigits: 1});
+                document.getElementById('avgQuality').textContent = avgQual.toFixed(1);
+                document.getElementById('totalRoutes').textContent = uniqueRoutes;
+                document.getElementById('totalCount').textContent = filteredData.length;
+                document.getElementById('countDisplay').textContent = filteredData.length;
+                document.getElementById('flaggedDisplay').textContent = filteredData.filter(d => d.flags && d.flags.length).length;
+
+                // 3. Table
+                const tbody = document.getElementById('tableBody');
+                tbody.innerHTML = filteredData.map(d => `
+                    <tr class="hover:bg-white/5 transition-colors">
+                        <td class="font-medium text-white">${d.zone}</td>
+                        <td>${d.route}</td>
+                        <td>${d.vehicle}</td>
+                        <td>${d.clerk}</td>
+                        <td class="text-right text-green-400 font-bold">${d.fact_wgt.toFixed(1)}</td>
+                        <td class="text-right">${d.quality_pct}%</td>
+                        <td class="text-right">${flagBadge(d)}</td>
+                    </tr>
+                `).join('');
+
+                // 4. Charts
+                renderCharts();
+            }
+
+            function flagBadge(d) {
+                if (!d.flags || !d.flags.length) return '';
+                const title = d.flags
+                    .map(f => `${f.scope.toUpperCase()} ${f.metric}: ${f.value} (mean ${f.mean} ± ${f.std}, z=${f.z})`)
+                    .join('; ');
+                return `<span class="text-amber-400 font-bold" title="${title}">&#9888; ${d.flags.length}</span>`;
+            }
+
+            function renderCharts() {
+                // Prepare Data
+                const zoneMap = {};
+                const routeMap = {};
+                
+                filteredData.forEach(d => {
+                    // Zone Aggregation
+                    if (!zoneMap[d.zone]) zoneMap[d.zone] = 0;
+                    zoneMap[d.zone] += d.fact_wgt;
+                    
+                    // Route Aggregation (Top 10 by weight)
+                    if (!routeMap[d.route]) routeMap[d.route] = { wgt: 0, qual: 0, count: 0 };
+                    routeMap[d.route].wgt += d.fact_wgt;
+                    routeMap[d.route].qual += d.quality_pct;
+                    routeMap[d.route].count++;
+                });
+
+                // Zone Chart Data
+                const zoneLabels = Object.keys(zoneMap).sort();
+                const zoneValues = zoneLabels.map(l => zoneMap[l]);
+
+                // Route Chart Data (Top 7)
+                const topRoutes = Object.entries(routeMap)
+                    .sort((a, b) => b[1].wgt - a[1].wgt)
+                    .slice(0, 7);
+                const routeLabels = topRoutes.map(x => x[0]);
+                const routeWeights = topRoutes.map(x => x[1].wgt);
+                const routeQuals = topRoutes.map(x => (x[1].qual / x[1].count).toFixed(1));
+
+                // Destroy old instances
+                if (zoneChartInstance) zoneChartInstance.destroy();
+                if (routeChartInstance) routeChartInstance.destroy();
+
+                // Render Zone Chart (Bar)
+                zoneChartInstance = new Chart(document.getElementById('zoneChart'), {
+                    type: 'bar',
+                    data: {
+                        labels: zoneLabels,
+                        datasets: [{
+                            label: 'Weight (KG)',
+                            data: zoneValues,
+                            backgroundColor: '#22c55e',
+                            borderRadius: 6
+                        }]
+                    },
+                    options: {
+                        responsive: true,
+                        maintainAspectRatio: false,
+                        plugins: { legend: { display: false } },
+                        scales: {
+                            y: { grid: { color: 'rgba(255,255,255,0.05)' } },
+                            x: { grid: { display: false } }
+                        }
+                    }
+                });
+
+                // Render Route Chart (Line/Mixed)
+                routeChartInstance = new Chart(document.getElementById('routeChart'), {
+                    type: 'line',
+                    data: {
+                        labels: routeLabels,
+                        datasets: [
+                            {
+                                label: 'Avg Quality (%)',
+                                data: routeQuals,
+                                borderColor: '#eab308',
+                                backgroundColor: '#eab308',
+                                yAxisID: 'y1',
+                                tension: 0.3
+                            },
+                            {
+                                label: 'Total Weight (KG)',
+                                data: routeWeights,
+                                backgroundColor: 'rgba(34, 197, 94, 0.2)',
+                                borderColor: 'rgba(34, 197, 94, 0.5)',
+                                fill: true,
+                                yAxisID: 'y',
+                                tension: 0.3
+                            }
+                        ]
+                    },
+                    options: {
+                        responsive: true,
+                        maintainAspectRatio: false,
+                        interaction: { mode: 'index', intersect: false },
+                        scales: {
+                            y: { 
+                                type: 'linear', display: true, position: 'left',
+                                grid: { color: 'rgba(255,255,255,0.05)' } 
+                            },
+                            y1: { 
+                                type: 'linear', display: true, position: 'right', grid: { display: false },
+                                min: 0, max: 100
+                            },
+                            x: { grid: { display: false } }
+                        }
+                    }
+                });
+            }
+        </script>
+    </body>
+    </html>
+    """
+    
+    return html_template.replace("{{REPORT_DATE}}", report_date).replace("{{JSON_DATA}}", json_data)
+
+def _report_charts(entries: List[EntryRow], source_hash: str = None):
+    """
+    Zone and route SVG charts. Cached under the report's source_hash (already
+    computed for the catalog) when there is one; ad-hoc renders build them directly.
+    """
+    if source_hash:
+        with _chart_lock:
+            charts = _chart_cache.get(source_hash)
+            if charts:
+                _chart_cache.move_to_end(source_hash)
+                return charts
+
+    zones = {}
+    routes = {}
+    for e in entries:
+        zones[e.zone] = zones.get(e.zone, 0) + (e.fact_wgt or 0)
+        wgt, qual, count = routes.get(e.route, (0, 0, 0))
+        routes[e.route] = (wgt + (e.fact_wgt or 0), qual + (e.quality_pct or 0), count + 1)
+
+    zone_labels = sorted(zones)
+    top_routes = sorted(routes.items(), key=lambda item: item[1][0], reverse=True)[:7]
+    charts = (
+        bar_chart(zone_labels, [zones[z] for z in zone_labels], "Weight Distribution by Zone"),
+        bar_line_chart([r for r, _ in top_routes], [v[0] for _, v in top_routes],
+                       [v[1] / v[2] for _, v in top_routes], "Quality vs Weight (Top Routes)"),
+    )
+    if source_hash:
+        with _chart_lock:
+            _chart_cache[source_hash] = charts
+            while len(_chart_cache) > CHART_CACHE_SIZE:
+                _chart_cache.popitem(last=False)
+    return charts
+
+def _flag_badge(flags) -> str:
+    if not flags:
+        return ""
+    title = "; ".join(
+        f"{f['scope'].upper()} {f['metric']}: {f['value']} (mean {f['mean']} ± {f['std']}, z={f['z']})" for f in flags
+    )
+    return f'<span class="flag" title="{escape(title)}">&#9888; {len(flags)}</span>'
+
+def _pct(value) -> str:
+    return "-" if value is None else f"{value:.1f}%"
+
+
+def generate_offline_html_content(report_date: str, entries: List[EntryRow], source_hash: str = None) -> str:
+    # Everything is rendered here: no scripts or stylesheets to fetch, so the
+    # attachment paints straight away without a network connection
+    zone_chart, route_chart = _report_charts(entries, source_hash)
+    total_wgt = sum(e.fact_wgt or 0 for e in entries)
+    avg_qual = sum(e.quality_pct or 0 for e in entries) / len(entries) if entries else 0
+    flagged = sum(1 for e in entries if e.flags)
+
+    rows = "".join(
+        f"<tr><td class=\"strong\">{escape(str(e.zone))}</td><td>{escape(str(e.route))}</td>"
+        f"<td>{escape(str(e.vehicle))}</td><td>{escape(str(e.clerk))}</td>"
+        f"<td class=\"num green\" data-v=\"{e.fact_wgt or 0}\">{(e.fact_wgt or 0):,.1f}</td>"
+        f"<td class=\"num\" data-v=\"{e.quality_pct or 0}\">{_pct(e.quality_pct)}</td>"
+        f"<td class=\"num\">{_flag_badge(e.flags)}</td></tr>"
+        for e in sorted(entries, key=lambda e: (str(e.zone).lower(), str(e.route).lower()))
+    )
+
+    html_template = """<!DOCTYPE html>
+<html lang="en">
+<head>
+<meta charset="UTF-8">
+<meta name="viewport" content="width=device-width, initial-scale=1.0">
+<title>GL Collection Report - {{REPORT_DATE}}</title>
+<style>
+*{box-sizing:border-box}
+body{margin:0;padding:2rem 1rem;background:#020617;color:#e2e8f0;font:14px/1.5 system-ui,-apple-system,'Segoe UI',sans-serif}
+.wrap{max-width:80rem;margin:0 auto}
+header{display:flex;flex-wrap:wrap;justify-content:space-between;align-items:flex-end;gap:1rem;border-bottom:1px solid #1e293b;padding-bottom:1.5rem;margin-bottom:2rem}
+h1{margin:0;font-size:1.875rem;color:#fff}
+.muted{color:#64748b;font-size:.75rem;text-transform:uppercase;letter-spacing:.1em;font-weight:600;margin:.25rem 0 0}
+.brand{color:#22c55e;font-weight:700;font-size:1.25rem;margin:0}
+.grid{display:grid;gap:1.5rem;margin-bottom:2rem;grid-template-columns:repeat(auto-fit,minmax(14rem,1fr))}
+.charts{grid-template-columns:repeat(auto-fit,minmax(22rem,1fr))}
+.card{background:rgba(255,255,255,.03);border:1px solid rgba(255,255,255,.05);border-radius:1rem;padding:1.5rem}
+.kpi{font-size:1.875rem;font-weight:700;color:#fff;margin:0}
+.kpi small{font-size:.875rem;color:#64748b}
+h3{margin:0 0 1rem;font-size:.875rem;color:#94a3b8;text-transform:uppercase}
+svg{width:100%;height:auto;display:block}
+.table{padding:0;overflow-x:auto}
+table{width:100%;border-collapse:collapse;font-family:ui-monospace,Menlo,Consolas,monospace;font-size:.875rem}
+th{text-align:left;font-size:.75rem;text-transform:uppercase;letter-spacing:.05em;color:#64748b;padding:1rem;background:rgba(255,255,255,.05);cursor:pointer}
+td{padding:1rem;border-top:1px solid rgba(255,255,255,.05);color:#cbd5e1}
+.num{text-align:right}
+.strong{color:#fff;font-weight:500}
+.green{color:#4ade80;font-weight:700}
+.flag{color:#fbbf24;font-weight:700}
+footer{text-align:center;color:#64748b;font-size:.75rem;text-transform:uppercase;letter-spacing:.1em;padding:2rem 0}
+</style>
+</head>
+<body>
+<div class="wrap">
+<header>
+<div><h1>GL Collection Report</h1><p class="muted">{{REPORT_DATE}}</p></div>
+<div><p class="brand">GREENFIELDS TEA</p><p class="muted">Offline Report &bull; {{COUNT}} records &bull; {{FLAGGED}} flagged</p></div>
+</header>
+<div class="grid">
+<div class="card"><p class="muted">Total Weight</p><p class="kpi">{{TOTAL_WEIGHT}} <small>KG</small></p></div>
+<div class="card"><p class="muted">Avg Quality</p><p class="kpi">{{AVG_QUALITY}}%</p></div>
+<div class="card"><p class="muted">Routes Active</p><p class="kpi">{{ROUTES}}</p></div>
+<div class="card"><p class="muted">Entry Count</p><p class="kpi">{{COUNT}}</p></div>
+</div>
+<div class="grid charts">
+<div class="card"><h3>Weight Distribution by Zone</h3>{{ZONE_CHART}}</div>
+<div class="card"><h3>Quality vs Weight (Top Routes)</h3>{{ROUTE_CHART}}</div>
+</div>
+<div class="card table">
+<table id="entries">
+<thead><tr><th>Zone</th><th>Route</th><th>Vehicle</th><th>Clerk</th><th class="num">Weight (KG)</th><th class="num">Quality %</th><th class="num">Flags</th></tr></thead>
+<tbody>{{ROWS}}</tbody>
+</table>
+</div>
+<footer>&copy; 2025 Greenfield Tea Factory &bull; Generated via Greenfield Report System</footer>
+</div>
+<script>
+// Optional click-to-sort; the report is complete without it
+document.querySelectorAll('#entries th').forEach((th, col) => th.addEventListener('click', () => {
+    const body = th.closest('table').tBodies[0], asc = th.dataset.dir !== 'asc';
+    const key = td => td.dataset.v !== undefined ? parseFloat(td.dataset.v) : td.textContent.toLowerCase();
+    [...body.rows].sort((a, b) => {
+        const x = key(a.cells[col]), y = key(b.cells[col]);
+        return (x < y ? -1 : x > y ? 1 : 0) * (asc ? 1 : -1);
+    }).forEach(row => body.appendChild(row));
+    th.dataset.dir = asc ? 'asc' : 'desc';
+}));
+</script>
+</body>
+</html>
+"""
+
+    return (html_template
+            .replace("{{REPORT_DATE}}", escape(report_date))
+            .replace("{{COUNT}}", str(len(entries)))
+            .replace("{{FLAGGED}}", str(flagged))
+            .replace("{{TOTAL_WEIGHT}}", f"{total_wgt:,.1f}")
+            .replace("{{AVG_QUALITY}}", f"{avg_qual:.1f}")
+            .replace("{{ROUTES}}", str(len({e.route for e in entries})))
+            .replace("{{ZONE_CHART}}", zone_chart)
+            .replace("{{ROUTE_CHART}}", route_chart)
+            .replace("{{ROWS}}", rows))
+
+def save_period_html_report_to_file(summary: dict) -> str:
+    filename = f"Report_{summary['period'].capitalize()}_{summary['start']}.html"
+    source_hash = source_fingerprint(summary)
+    return render_once(
+        f"{summary['period']}-html:{summary['start']}", [filename], source_hash,
+        lambda: _write_report(filename, generate_period_html_content(summary), source_hash)
+    )
+
+def generate_period_html_content(summary: dict) -> str:
+    # Only the pre-aggregated summary is embedded, never the raw daily rows
+    json_data = json.dumps(summary, default=str)
+    
+    html_template = """
+    <!DOCTYPE html>
+    <html lang="en">
+    <head>
+        <meta charset="UTF-8">
+        <meta name="viewport" content="width=device-width, initial-scale=1.0">
+        <title>GL Collection Report - {{REPORT_LABEL}}</title>
+        <script src="https://cdn.tailwindcss.com"></script>
+        <script src="https://cdn.jsdelivr.net/npm/chart.js"></script>
+        <style>
+            :root { --primary: #16a34a; --bg: #020617; --glass: rgba(255,255,255,0.03); --border: rgba(255,255,255,0.05); }
+            body { background-color: var(--bg); color: #e2e8f0; font-family: 'Inter', system-ui, sans-serif; }
+            .glass { background: var(--glass); backdrop-filter: blur(10px); border: 1px solid var(--border); }
+            th { text-align: left; font-size: 0.75rem; text-transform: uppercase; letter-spacing: 0.05em; color: #64748b; padding: 0.75rem 1rem; }
+            td { padding: 0.75rem 1rem; border-top: 1px solid var(--border); }
+            tr:hover td { background: rgba(255,255,255,0.02); }
+        </style>
+    </head>
+    <body class="min-h-screen p-4 md:p-8">
+        <div class="max-w-7xl mx-auto space-y-8">
+            <header class="flex flex-col md:flex-row justify-between items-start md:items-end gap-4 border-b border-slate-800 pb-6">
+                <div>
+                    <h1 class="text-3xl font-bold text-white tracking-tight">GL Collection Report</h1>
+                    <p class="text-slate-500 mt-1 uppercase tracking-widest text-xs font-semibold">{{REPORT_LABEL}} &bull; {{START}} to {{END}}</p>
+                </div>
+                <div class="text-left md:text-right">
+                    <p class="text-green-500 font-bold text-xl">GREENFIELDS TEA</p>
+                    <p class="text-slate-500 text-xs">Period Summary</p>
+                </div>
+            </header>
+
+            <div class="grid grid-cols-2 md:grid-cols-5 gap-6" id="kpis"></div>
+
+            <div class="glass p-6 rounded-2xl">
+                <h3 class="text-sm font-bold text-slate-400 uppercase mb-4">Daily Factory Weight by Zone</h3>
+                <div class="h-72">
+                    <canvas id="trendChart"></canvas>
+                </div>
+            </div>
+
+            <div class="grid grid-cols-1 gap-6" id="tables"></div>
+
+            <div class="flex justify-center gap-4 text-xs font-medium text-slate-500 uppercase tracking-widest py-8">
+                <span>&copy; 2025 Greenfield Tea Factory</span>
+                <span>&bull;</span>
+                <span>Generated via Greenfield Report System</span>
+            </div>
+        </div>
+
+        <script>
+            const summary = {{JSON_DATA}};
+            const COLORS = ['#22c55e', '#3b82f6', '#a855f7', '#f59e0b', '#ec4899', '#14b8a6'];
+            const fmt = (v, digits = 1) => v === null || v === undefined ? '-' :
+                Number(v).toLocaleString(undefined, { minimumFractionDigits: digits, maximumFractionDigits: digits });
+
+            function renderKpis() {
+                const k = summary.kpis;
+                const cards = [
+                    ['Total Weight', fmt(k.fact_wgt) + ' KG'],
+                    ['(%)VAR', fmt(k.var_pct, 2) + '%'],
+                    ['Avg Quality', fmt(k.avg_quality) + '%'],
+                    ['Entries', k.entries],
+                    ['Active Days', k.active_days + ' / ' + summary.trend.dates.length]
+                ];
+                document.getElementById('kpis').innerHTML = cards.map(([label, value]) => `
+                    <div class="glass p-6 rounded-2xl">
+                        <p class="text-slate-500 text-xs font-bold uppercase tracking-wider mb-1">${label}</p>
+                        <p class="text-2xl font-bold text-white">${value}</p>
+                    </div>
+                `).join('');
+            }
+
+            function renderTable(title, rows) {
+                return `
+                    <div class="glass rounded-2xl overflow-hidden overflow-x-auto">
+                        <h3 class="text-sm font-bold text-slate-400 uppercase p-4">${title}</h3>
+                        <table class="w-full text-left font-mono text-sm">
+                            <thead class="bg-white/5">
+                                <tr>
+                                    <th>Name</th><th class="text-right">Entries</th><th class="text-right">Fld Wgt</th>
+                                    <th class="text-right">Fact Wgt</th><th class="text-right">(%)VAR</th>
+                                    <th class="text-right">Scorch</th><th class="text-right">Avg Quality</th>
+                                </tr>
+                            </thead>
+                            <tbody class="text-slate-300">
+                                ${rows.map(r => `
+                                    <tr>
+                                        <td class="font-medium text-white">${r.name}</td>
+                                        <td class="text-right">${r.entries}</td>
+                                        <td class="text-right">${fmt(r.fld_wgt)}</td>
+                                        <td class="text-right text-green-400 font-bold">${fmt(r.fact_wgt)}</td>
+                                        <td class="text-right">${fmt(r.var_pct, 2)}</td>
+                                        <td class="text-right">${fmt(r.scorch_kg)}</td>
+                                        <td class="text-right">${fmt(r.avg_quality)}%</td>
+                                    </tr>
+                                `).join('')}
+                            </tbody>
+                        </table>
+                    </div>
+                `;
+            }
+
+            function renderTrend() {
+                const datasets = Object.entries(summary.trend.series).map(([zone, values], i) => ({
+                    label: zone,
+                    data: values,
+                    borderColor: COLORS[i % COLORS.length],
+                    backgroundColor: COLORS[i % COLORS.length],
+                    tension: 0.3
+                }));
+                new Chart(document.getElementById('trendChart'), {
+                    type: 'line',
+                    data: { labels: summary.trend.dates, datasets },
+                    options: {
+                        responsive: true,
+                        maintainAspectRatio: false,
+                        interaction: { mode: 'index', intersect: false },
+                        scales: {
+                            y: { grid: { color: 'rgba(255,255,255,0.05)' } },
+                            x: { grid: { display: false } }
+                        }
+                    }
+                });
+            }
+
+            document.addEventListener('DOMContentLoaded', () => {
+                renderKpis();
+                document.getElementById('tables').innerHTML =
+                    renderTable('Zones', summary.zones) +
+                    renderTable('Routes', summary.routes) +
+                    renderTable('Clerks', summary.clerks);
+                renderTrend();
+            });
+        </script>
+    </body>
+    </html>
+    """
+    
+    return (html_template
+            .replace("{{REPORT_LABEL}}", summary["label"])
+            .replace("{{START}}", summary["start"])
+            .replace("{{END}}", summary["end"])
+            .replace("{{JSON_DATA}}", json_data))
@@ -0,0 +1,382 @@
+import csv
+import json
+import os
+from collections import deque
+
+import numpy as np
+from starlette.concurrency import run_in_threadpool
+
+from .database import save_entries
+
+
+BATCH_ROWS = int(os.getenv('UPLOAD_BATCH_ROWS', '500'))   # rows validated and written per transaction
+MAX_LINE_BYTES = 64 * 1024       # a longer line is rejected rather than buffered
+MAX_REPORTED = 1000              # errors / flagged rows listed in the response
+
+TEXT_FIELDS = ("zone", "clerk", "vehicle", "route")
+TIME_FIELDS = ("time_out", "time_in", "tare_time")
+NUMBER_FIELDS = ("fld_wgt", "fact_wgt", "scorch_kg", "quality_pct")
+REQUIRED_FIELDS = ("date",) + TEXT_FIELDS + NUMBER_FIELDS
+FORMATS = ("csv", "ndjson")
+
+# Column sizes in daily_entries and its lookup tables: longer values would fail the whole batch
+MAX_LENGTHS = {**{f: 255 for f in TEXT_FIELDS}, **{f: 50 for f in TIME_FIELDS}}
+MAX_WEIGHT = 99999999.99         # DECIMAL(10, 2)
+
+
+class UploadReport:
+    """Running totals for one upload; only the first MAX_REPORTED errors/flags are kept"""
+
+    def __init__(self):
+        self.rows = 0
+        self.inserted = 0
+        self.rejected = 0
+        self.dates = set()
+        self.errors = []
+        self.flagged = []
+
+    def reject(self, line, errors):
+        self.rejected += 1
+        if len(self.errors) < MAX_REPORTED:
+            self.errors.append({"line": line, "errors": errors})
+
+    def as_dict(self):
+        return {
+            "status": "success" if not self.rejected else "partial" if self.inserted else "failed",
+            "rows": self.rows,
+            "inserted": self.inserted,
+            "rejected": self.rejected,
+            "dates": sorted(self.dates),
+            "errors": sorted(self.errors, key=lambda e: e["line"]),
+            "errors_truncated": self.rejected > len(self.errors),
+            "flags": self.flagged,
+        }
+
+
+async def _lines(chunks):
+    """
+    (line_no, bytes) for each line of an async byte stream, holding at most
+    MAX_LINE_BYTES of one partial line. Lines longer than that are skipped
+    and yielded as (line_no, None), whether they span chunks or not.
+    """
+    buffer = b""
+    line_no = 0
+    skipping = False
+    async for chunk in chunks:
+        start = 0
+        while True:
+            end = chunk.find(b"\n", start)
+            if end < 0:
+                break
+            line_no += 1
+            # Length is checked before slicing, so an over-long line is never copied
+            if skipping or len(buffer) + (end - start) > MAX_LINE_BYTES:
+                yield line_no, None
+            else:
+                yield line_no, buffer + chunk[start:end]
+            buffer = b""
+            skipping = False
+            start = end + 1
+        if skipping or len(buffer) + (len(chunk) - start) > MAX_LINE_BYTES:
+            buffer = b""
+            skipping = True
+        else:
+            buffer += chunk[start:]
+    if buffer or skipping:
+        yield line_no + 1, None if skipping else buffer
+
+
+def _decode(raw):
+    return raw.decode("utf-8-sig").rstrip("\r")
+
+
+def _missing(values):
+    return np.array([v is None or (isinstance(v, str) and not v.strip()) for v in values], dtype=bool)
+
+
+def _parse_numbers(values, missing):
+    """Float array for `values` plus a mask of cells that are not numbers (missing cells are NaN)"""
+    cells = np.array([None if m else v for v, m in zip(values, missing)], dtype=object)
+    try:
+        # Fast path: the whole column converts in one call
+        numbers = cells.astype(float)
+        return numbers, np.zeros(len(values), dtype=bool)
+    except (TypeError, ValueError):
+        pass
+    numbers = np.full(len(values), np.nan)
+    invalid = np.zeros(len(values), dtype=bool)
+    for i, cell in enumerate(cells):
+        if cell is None:
+            continue
+        try:
+            numbers[i] = float(cell)
+        except (TypeError, ValueError):
+            invalid[i] = True
+    return numbers, invalid
+
+
+def _parse_dates(values, missing):
+    """Mask of cells that are not YYYY-MM-DD dates"""
+    cells = np.array(["" if m else str(v).strip() for v, m in zip(values, missing)])
+    invalid = ~missing & (np.char.str_len(cells) != 10)
+    try:
+        np.array(np.where(missing | invalid, "1970-01-01", cells), dtype="datetime64[D]")
+        return invalid
+    except ValueError:
+        pass
+    for i, cell in enumerate(cells):
+        if missing[i] or invalid[i]:
+            continue
+        try:
+            np.datetime64(cell, "D")
+        except ValueError:
+            invalid[i] = True
+    return invalid
+
+
+def validate_chunk(records):
+    """
+    Check a chunk of (line_no, dict) records column by column.
+    Returns (valid entry dicts with their line numbers, [(line_no, {field: error})]).
+    """
+    problems = [{} for _ in records]
+    columns = {f: [r.get(f) for _, r in records] for f in REQUIRED_FIELDS + TIME_FIELDS}
+
+    for field in REQUIRED_FIELDS:
+        for i in np.flatnonzero(_missing(columns[field])):
+            problems[i][field] = "required"
+
+    for field, limit in MAX_LENGTHS.items():
+        for i, value in enumerate(columns[field]):
+            if value is not None and len(str(value).strip()) > limit:
+                problems[i][field] = f"longer than {limit} characters"
+
+    date_missing = _missing(columns["date"])
+    for i in np.flatnonzero(_parse_dates(columns["date"], date_missing)):
+        problems[i]["date"] = "expected YYYY-MM-DD"
+
+    numbers = {}
+    for field in NUMBER_FIELDS:
+        missing = _missing(columns[field])
+        values, invalid = _parse_numbers(columns[field], missing)
+        present = ~missing & ~invalid
+        out_of_range = present & ~np.isfinite(values)
+        if field == "quality_pct":
+            out_of_range |= present & ((values < 0) | (values > 100))
+            message = "must be between 0 and 100"
+        else:
+            out_of_range |= present & ((values < 0) | (values > MAX_WEIGHT))
+            message = f"must be between 0 and {MAX_WEIGHT:,.2f}"
+        for i in np.flatnonzero(invalid):
+            problems[i][field] = "not a number"
+        for i in np.flatnonzero(out_of_range):
+            problems[i][field] = message
+        numbers[field] = values
+
+    valid, rejected = [], []
+    for i, (line, _) in enumerate(records):
+        if problems[i]:
+            rejected.append((line, problems[i]))
+            continue
+        entry = {"date": str(columns["date"][i]).strip()}
+        for field in TEXT_FIELDS:
+            entry[field] = str(columns[field][i]).strip()
+        for field in TIME_FIELDS:
+            value = columns[field][i]
+            entry[field] = (str(value).strip() or None) if value is not None else None
+        for field in NUMBER_FIELDS:
+            entry[field] = float(numbers[field][i])
+        valid.append((line, entry))
+    return valid, rejected
+
+
+def _write(valid, report):
+    lines = [line for line, _ in valid]
+    entries = [entry for _, entry in valid]
+    try:
+        results = [(lines, entries, save_entries(entries))]
+    except Exception as e:
+        # One bad row rolls back the batch: retry row by row to pin it down
+        print(f"❌ Upload batch of {len(entries)} rows failed ({e}); retrying rows individually")
+        results = []
+        for line, entry in valid:
+            try:
+                results.append(([line], [entry], save_entries([entry])))
+            except Exception as row_error:
+                report.reject(line, {"row": str(row_error).strip()})
+
+    for batch_lines, batch_entries, batch_flags in results:
+        for line, entry, flags in zip(batch_lines, batch_entries, batch_flags):
+            report.inserted += 1
+            report.dates.add(entry["date"])
+            if flags and len(report.flagged) < MAX_REPORTED:
+                report.flagged.append({"line": line, "route": entry["route"], "vehicle": entry["vehicle"], "flags": flags})
+
+
+def _process_batch(records, report):
+    valid, rejected = validate_chunk(records)
+    for line, errors in rejected:
+        report.reject(line, errors)
+    if valid:
+        _write(valid, report)
+
+
+class _LineFeed:
+    """
+    Line iterator for one long-lived csv.reader. Lines are queued a whole
+    record at a time, so the reader never runs dry inside a quoted field.
+    """
+
+    def __init__(self):
+        self.lines = deque()
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if not self.lines:
+            raise StopIteration
+        return self.lines.popleft()
+
+
+_START, _UNQUOTED, _QUOTED, _QUOTE_IN_QUOTED = range(4)
+
+def _in_quotes(text, quoted):
+    """Whether a CSV record is still inside a quoted field at the end of `text`"""
+    if '"' not in text:
+        return quoted
+    state = _QUOTED if quoted else _START
+    for ch in text:
+        if state == _QUOTED:
+            if ch == '"':
+                state = _QUOTE_IN_QUOTED
+        elif ch == ",":
+            state = _START
+        elif ch == '"' and state in (_START, _QUOTE_IN_QUOTED):
+            state = _QUOTED     # opening quote, or the second half of an escaped ""
+        else:
+            state = _UNQUOTED
+    return state == _QUOTED
+
+
+async def _csv_records(lines):
+    """
+    (line_no, cells, error) per CSV record of a _lines() stream, numbered by
+    its first line. A quoted field may span lines: the record is held until
+    its quotes close, up to MAX_LINE_BYTES, then parsed by a strict
+    csv.reader. Rejected records have cells None and an error message.
+    """
+    feed = _LineFeed()
+    reader = csv.reader(feed, strict=True)
+    pending, size, start, quoted, too_long = [], 0, None, False, False
+    async for line, raw in lines:
+        in_record = bool(pending) or too_long
+        try:
+            text = _decode(raw) if raw is not None else None
+        except UnicodeDecodeError:
+            text, error = None, "not valid UTF-8"
+        else:
+            error = f"longer than {MAX_LINE_BYTES} bytes"
+        if text is None:
+            # The rest of a record we cannot read is dropped with it
+            yield (start if in_record else line), None, error
+            pending, size, quoted, too_long = [], 0, False, False
+            continue
+        if not in_record:
+            if not text.strip():
+                continue
+            start = line
+
+        quoted = _in_quotes(text, quoted)
+        size += len(raw) + 1
+        if size > MAX_LINE_BYTES:
+            # Keep following the quotes to find the record's end, without holding it
+            pending, too_long = [], True
+        if too_long:
+            if not quoted:
+                yield start, None, f"longer than {MAX_LINE_BYTES} bytes"
+                size, too_long = 0, False
+            continue
+        pending.append(text)
+        if quoted:
+            continue
+
+        feed.lines.extend(t + "\n" for t in pending)
+        pending, size = [], 0
+        try:
+            cells = next(reader)
+        except csv.Error as e:
+            feed.lines.clear()
+            yield start, None, f"unreadable CSV ({e})"
+            continue
+        yield start, cells, None
+    if pending or too_long:
+        yield start, None, "unterminated quoted field"
+
+
+async def _ndjson_records(lines):
+    """(line_no, record, error) per non-blank NDJSON line of a _lines() stream"""
+    async for line, raw in lines:
+        if raw is None:
+            yield line, None, f"longer than {MAX_LINE_BYTES} bytes"
+            continue
+        try:
+            text = _decode(raw)
+        except UnicodeDecodeError:
+            yield line, None, "not valid UTF-8"
+            continue
+        if not text.strip():
+            continue
+        try:
+            yield line, _ndjson_record(text), None
+        except ValueError as e:
+            yield line, None, str(e)
+
+
+def _ndjson_record(text):
+    try:
+        record = json.loads(text)
+    except json.JSONDecodeError as e:
+        raise ValueError(f"invalid JSON ({e.msg})")
+    if not isinstance(record, dict):
+        raise ValueError("expected a JSON object")
+    return {key.strip().lower(): value for key, value in record.items()}
+
+
+async def ingest_upload(chunks, fmt):
+    """
+    Stream a CSV (with header row) or NDJSON upload from an async byte
+    iterator, validating and saving it BATCH_ROWS at a time.
+    Raises ValueError for problems with the upload as a whole.
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Invalid format '{fmt}'. Use one of: {', '.join(FORMATS)}")
+
+    report = UploadReport()
+    header = None
+    batch = []
+    records = _csv_records(_lines(chunks)) if fmt == "csv" else _ndjson_records(_lines(chunks))
+    async for line, record, error in records:
+        if fmt == "csv" and header is None and error is None:
+            header = [name.strip().lower() for name in record]
+            absent = [f for f in REQUIRED_FIELDS if f not in header]
+            if absent:
+                raise ValueError(f"CSV header is missing required columns: {', '.join(absent)}")
+            continue
+
+        report.rows += 1
+        if error is None and fmt == "csv" and len(record) != len(header):
+            error = f"expected {len(header)} columns, got {len(record)}"
+        if error is not None:
+            report.reject(line, {"row": error})
+            continue
+        batch.append((line, dict(zip(header, record)) if fmt == "csv" else record))
+        if len(batch) >= BATCH_ROWS:
+            await run_in_threadpool(_process_batch, batch, report)
+            batch = []
+
+    if batch:
+        await run_in_threadpool(_process_batch, batch, report)
+    if fmt == "csv" and header is None:
+        raise ValueError("Upload is empty")
+    return report.as_dict()
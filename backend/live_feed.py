@@ -0,0 +1,137 @@
+import asyncio
+import json
+import os
+import threading
+from datetime import date, datetime
+from decimal import Decimal
+
+from .query_cache import listen
+
+
+# Postgres channel carrying one JSON event per committed entry insert/update
+CHANNEL = "entry_events"
+MAX_PAYLOAD = 7900  # NOTIFY payloads must stay under 8000 bytes
+
+QUEUE_SIZE = int(os.getenv('LIVE_QUEUE_SIZE', '256'))
+HEARTBEAT_SECONDS = float(os.getenv('LIVE_HEARTBEAT', '15'))
+
+# Sent instead of the dropped backlog when a client falls behind, and to everyone
+# after the listener reconnects: the client should refetch rather than trust its state
+RESYNC = "event: resync\ndata: {}\n\n"
+
+_AGGREGATE_FIELDS = ("fld_wgt", "fact_wgt", "scorch_kg")
+
+
+def _json_default(value):
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    raise TypeError(f"Cannot encode {type(value).__name__}")
+
+
+def entry_deltas(old, new):
+    """
+    Changes to the per-day, per-zone totals caused by replacing EntryRow `old`
+    with `new` (either may be None). Keys with no net change are left out.
+    """
+    totals = {}
+    for entry, sign in ((old, -1), (new, 1)):
+        if not entry:
+            continue
+        key = (entry.date, entry.zone)
+        t = totals.setdefault(key, {"entries": 0, "quality_sum": 0.0, **{f: 0.0 for f in _AGGREGATE_FIELDS}})
+        t["entries"] += sign
+        t["quality_sum"] += sign * (entry.quality_pct or 0)
+        for f in _AGGREGATE_FIELDS:
+            t[f] += sign * (getattr(entry, f) or 0)
+
+    deltas = []
+    for (day, zone), t in sorted(totals.items(), key=lambda item: (item[0][0], item[0][1] or "")):
+        rounded = {f: round(v, 2) for f, v in t.items()}
+        if any(rounded.values()):
+            deltas.append({"date": day, "zone": zone, **rounded})
+    return deltas
+
+
+def notify_entry_event(cursor, op, entry, old=None):
+    """Queue the event on the writer's transaction; it is only delivered if that commits"""
+    event = {"op": op, "entry": entry.as_dict(), "deltas": entry_deltas(old, entry)}
+    payload = json.dumps(event, default=_json_default)
+    if len(payload.encode("utf-8")) > MAX_PAYLOAD:
+        # Too big to carry the row: send the key and let clients refetch that date
+        event["entry"] = {"id": entry.id, "date": entry.date}
+        event["partial"] = True
+        payload = json.dumps(event, default=_json_default)
+    cursor.execute("SELECT pg_notify(%s, %s)", (CHANNEL, payload))
+
+
+class _Subscriber:
+    def __init__(self, loop):
+        self.loop = loop
+        self.queue = asyncio.Queue(maxsize=QUEUE_SIZE)
+        self.dropped = 0
+
+    def offer(self, message):
+        # Runs on the event loop. A client that cannot keep up loses its backlog
+        # and gets a single resync, so memory per client stays bounded.
+        if self.queue.full():
+            while not self.queue.empty():
+                self.queue.get_nowait()
+                self.dropped += 1
+            message = RESYNC
+        self.queue.put_nowait(message)
+
+
+_subscribers = set()
+_lock = threading.Lock()
+_stats = {"events": 0, "resyncs": 0, "dropped": 0}
+
+
+def _broadcast(message):
+    with _lock:
+        subscribers = list(_subscribers)
+    for sub in subscribers:
+        try:
+            sub.loop.call_soon_threadsafe(sub.offer, message)
+        except RuntimeError:
+            # Event loop already closed (shutdown)
+            pass
+
+
+@listen(CHANNEL)
+def _on_entry_event(payload):
+    # Runs on the listener thread; payload is forwarded as-is, encoded once per worker
+    if payload is None:
+        _stats["resyncs"] += 1
+        _broadcast(RESYNC)
+        return
+    _stats["events"] += 1
+    _broadcast(f"event: entry\ndata: {payload}\n\n")
+
+
+async def stream(is_disconnected):
+    """Async generator of SSE frames for one client until `is_disconnected()` is true"""
+    sub = _Subscriber(asyncio.get_running_loop())
+    with _lock:
+        _subscribers.add(sub)
+    try:
+        yield "retry: 3000\n\n"
+        while not await is_disconnected():
+            try:
+                yield await asyncio.wait_for(sub.queue.get(), timeout=HEARTBEAT_SECONDS)
+            except asyncio.TimeoutError:
+                # Comment line keeps proxies from closing an idle connection
+                yield ": keepalive\n\n"
+    finally:
+        with _lock:
+            _subscribers.discard(sub)
+        _stats["dropped"] += sub.dropped
+
+
+def feed_stats():
+    with _lock:
+        clients = len(_subscribers)
+        backlog = sum(sub.queue.qsize() for sub in _subscribers)
+        dropped = _stats["dropped"] + sum(sub.dropped for sub in _subscribers)
+    return {**_stats, "dropped": dropped, "clients": clients, "queued": backlog, "queue_size": QUEUE_SIZE}
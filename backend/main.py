@@ -1,19 +1,36 @@
-from fastapi import FastAPI, HTTPException, BackgroundTasks
+from fastapi import FastAPI, HTTPException, BackgroundTasks, Request, Response
 from pydantic import BaseModel
 from typing import List, Optional
 from datetime import datetime, timedelta
 import os
+import sys
+import time
 import smtplib
 from email.mime.multipart import MIMEMultipart
 from email.mime.text import MIMEText
 from email.mime.application import MIMEApplication
-from .database import init_db, save_entry, get_all_entries, update_entry, get_entry_by_id, get_entries_by_date
-from .excel_handler import update_excel_report
+from .database import save_entry, get_all_entries, update_entry, get_entry_by_id, get_entries_by_date, replica_stats
+from .migrations import run_migrations, verify_schema
+from .rows import EntryRow, rows_to_json
+from .query_cache import start_listener, on_entries_changed, cache_stats
+from .live_feed import stream as live_stream, feed_stats
+from .html_report import HTML_MODES, render_html_report, save_html_report_to_file, generate_period_html_content, save_period_html_report_to_file
+from .period_reports import load_period_summary
+from .report_catalog import FORMATS as REPORT_FORMATS, list_reports as list_catalog_reports, get_report as get_catalog_report, resolve_report_path
+from .profiling import ProfilingMiddleware, ProfilingRoute, enabled as profiling_enabled, authorized as profile_authorized, list_profiles, profile_path
+# Report and analytics modules (openpyxl, win32com, numpy) are imported on
+# first use inside the endpoints so that worker startup stays cheap.
 import uvicorn
 from fastapi.middleware.cors import CORSMiddleware
 
 app = FastAPI()
 
+# Opt-in request profiling: with PROFILE_TOKEN unset neither the route wrapper
+# nor the middleware is installed, so normal requests pay nothing for it.
+if profiling_enabled():
+    app.router.route_class = ProfilingRoute
+    app.add_middleware(ProfilingMiddleware)
+
 # Enable CORS for frontend
 app.add_middleware(
     CORSMiddleware,
@@ -41,21 +58,73 @@ class ReportRequest(BaseModel):
     date: str
     entries: List[Entry]
 
+class DraftConfirmation(BaseModel):
+    # The rest of the entry form; weights and times come from the weighbridge draft
+    zone: str
+    clerk: str
+    route: str
+    vehicle: Optional[str] = None
+    time_out: Optional[str] = None
+    fld_wgt: float
+    scorch_kg: float
+    quality_pct: float
+
+class RegenerateRequest(BaseModel):
+    start_date: str
+    end_date: str
+    workers: Optional[int] = None
+
 @app.on_event("startup")
 def startup():
-    init_db()
+    # Schema changes are applied by `python -m backend.migrations`; boot only checks the version.
+    # DB_AUTO_MIGRATE=1 applies pending migrations instead (handy for local development).
+    started = time.perf_counter()
+    if os.getenv('DB_AUTO_MIGRATE') == '1':
+        run_migrations()
+    else:
+        version = verify_schema()
+        print(f"✅ Database schema v{version} verified in {(time.perf_counter() - started) * 1000:.0f} ms")
+
+    start_listener()
+
+    # Parquet snapshots for /api/analytics/*; duckdb itself loads on the first refresh
+    from .analytics_store import start_refresher
+    start_refresher()
+
+    # Scale indicator listener (WEIGHBRIDGE_ENABLED=1); runs on its own threads
+    from .weighbridge import start_service
+    start_service()
+
+    # Pre-render each day's reports at the REPORT_SCHEDULE cutoffs and email them
+    from .scheduler import start_scheduler
+    start_scheduler(on_rendered=send_report_email)
+
+@on_entries_changed
+def invalidate_forecasts(entry_date):
+    # Runs for writes from this and (via LISTEN/NOTIFY) every other worker.
+    # Forecasts are only cached once the forecasting module has been loaded.
+    forecasting = sys.modules.get(f"{__package__}.forecasting")
+    if forecasting:
+        forecasting.invalidate_forecasts(entry_date if entry_date is not None else datetime.min.date())
+
+def _entries_response(rows):
+    # Rows are already JSON-native; skip FastAPI's per-field encoder
+    return Response(content=rows_to_json(rows), media_type="application/json")
 
 @app.get("/api/entries")
 def get_entries(date: Optional[str] = None):
     if date:
-        return get_entries_by_date(date)
-    return get_all_entries()
+        return _entries_response(get_entries_by_date(date))
+    return _entries_response(get_all_entries())
 
 @app.post("/api/submit")
 def submit_report(request: ReportRequest, background_tasks: BackgroundTasks):
-    # Save to database first
-    for entry in request.entries:
-        save_entry(entry.dict())
+    # Save to database first, collecting outlier flags per submitted row
+    flagged = []
+    for i, entry in enumerate(request.entries):
+        flags = save_entry(entry.dict())
+        if flags:
+            flagged.append({"index": i, "route": entry.route, "vehicle": entry.vehicle, "flags": flags})
     
     # Fetch authoritative data from DB for this date
     # This ensures we capture all entries for the day and any DB-generated fields
@@ -63,10 +132,11 @@ def submit_report(request: ReportRequest, background_tasks: BackgroundTasks):
     
     if not db_entries:
         # Fallback to request entries if DB read fails (unlikely if save worked)
-        db_entries = [entry.dict() for entry in request.entries]
+        db_entries = [EntryRow.from_mapping(entry.dict()) for entry in request.entries]
 
     # Generate Excel Report using DB data
     try:
+        from .excel_handler import update_excel_report
         xl_file = update_excel_report(db_entries, request.date)
         pdf_file = xl_file if xl_file.endswith(".pdf") else None
         
@@ -80,10 +150,47 @@ def submit_report(request: ReportRequest, background_tasks: BackgroundTasks):
         if attachments:
             background_tasks.add_task(send_report_email, attachments, request.date)
             
-        return {"status": "success", "file": xl_file}
+        return {"status": "success", "file": xl_file, "flags": flagged}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/api/upload")
+async def upload_entries(request: Request, format: Optional[str] = None):
+    # Raw CSV (header row) or NDJSON body, streamed: ?format=csv|ndjson, or inferred from Content-Type
+    from .ingest import ingest_upload
+    if not format:
+        content_type = request.headers.get("content-type", "")
+        format = "ndjson" if "ndjson" in content_type or "jsonl" in content_type else "csv"
+    try:
+        return await ingest_upload(request.stream(), format)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.get("/api/weighbridge/drafts")
+def get_weighbridge_drafts(status: str = "open", limit: int = 100):
+    from .weighbridge import list_drafts
+    return list_drafts(status, max(1, min(limit, 500)))
+
+@app.post("/api/weighbridge/drafts/{draft_id}/confirm")
+def confirm_weighbridge_draft(draft_id: int, details: DraftConfirmation):
+    from .weighbridge import confirm_draft
+    try:
+        result = confirm_draft(draft_id, details.dict())
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if result is None:
+        raise HTTPException(status_code=409, detail="Draft is not open (already confirmed or missing)")
+    entry_id, flags = result
+    return {"status": "success", "entry_id": entry_id, "flags": flags}
+
+@app.get("/api/weighbridge/status")
+def get_weighbridge_status():
+    from .weighbridge import service_status
+    status = service_status()
+    if status is None:
+        raise HTTPException(status_code=404, detail="Weighbridge listener is not running in this worker")
+    return status
+
 @app.post("/api/preview/{file_type}")
 def preview_report(file_type: str, request: ReportRequest):
     # 1. Save to database first (Ensure "Real Data")
@@ -93,7 +200,7 @@ def preview_report(file_type: str, request: ReportRequest):
     # 2. Fetch authoritative data
     db_entries = get_entries_by_date(request.date)
     if not db_entries:
-        db_entries = [entry.dict() for entry in request.entries]
+        db_entries = [EntryRow.from_mapping(entry.dict()) for entry in request.entries]
 
     try:
         file_path = None
@@ -102,6 +209,7 @@ def preview_report(file_type: str, request: ReportRequest):
 
         if file_type == 'pdf':
             # Generate PDF via Excel handler
+            from .excel_handler import update_excel_report
             generated_file = update_excel_report(db_entries, request.date)
             if generated_file.endswith(".pdf"):
                 file_path = generated_file
@@ -136,12 +244,14 @@ def update_existing_entry(entry_id: int, entry: Entry):
         raise HTTPException(status_code=404, detail="Entry not found")
     
     # 48-hour check
-    created_at = datetime.fromisoformat(db_entry['created_at'].replace(' ', 'T'))
+    created_at = datetime.fromisoformat(db_entry.created_at[:19])
     if datetime.now() - created_at > timedelta(hours=48):
         raise HTTPException(status_code=403, detail="Edit window (48h) has expired")
     
-    update_entry(entry_id, entry.dict())
-    return {"status": "success"}
+    flags = update_entry(entry_id, entry.dict())
+    if flags is None:
+        raise HTTPException(status_code=404, detail="Entry not found")
+    return {"status": "success", "flags": flags}
 
 def send_report_email(attachments: List[str], report_date: str):
     # RESTRICTED TO THIS EMAIL FOR DEVELOPMENT
@@ -176,14 +286,98 @@ def send_report_email(attachments: List[str], report_date: str):
 
 @app.get("/api/analysis")
 def get_analysis_data():
-    return get_all_entries()
+    return _entries_response(get_all_entries())
+
+@app.get("/api/analytics/zones/yearly")
+def get_zone_yearly():
+    # Served from the DuckDB snapshot when available; `as_of` is its watermark
+    from .analytics_store import zone_year_over_year
+    return zone_year_over_year()
+
+@app.get("/api/analytics/clerks")
+def get_clerk_rankings(start: Optional[str] = None, end: Optional[str] = None, limit: int = 50):
+    if not 1 <= limit <= 500:
+        raise HTTPException(status_code=400, detail="limit must be 1-500")
+    from .analytics_store import clerk_rankings
+    return clerk_rankings(start, end, limit)
+
+@app.get("/api/analytics/snapshot")
+def get_analytics_snapshot():
+    from .analytics_store import load_state
+    state = load_state()
+    if state is None:
+        raise HTTPException(status_code=404, detail="No analytics snapshot yet")
+    return state
+
+@app.post("/api/analytics/snapshot/refresh")
+def refresh_analytics_snapshot(full: bool = False):
+    from .analytics_store import refresh_snapshot
+    state = refresh_snapshot(full)
+    if state is None:
+        return {"status": "busy", "detail": "Another worker is refreshing the snapshot"}
+    return {"status": "success", **state}
+
+@app.get("/api/forecast")
+def get_forecast_data(scope: str = "all", horizon: int = 7, as_of: Optional[str] = None):
+    # scope: 'all', 'zone:<name>' or 'route:<name>'
+    from .forecasting import get_forecast
+    try:
+        return get_forecast(scope, horizon, as_of)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.get("/api/cache/stats")
+def get_cache_stats():
+    return cache_stats()
+
+@app.get("/api/db/replica")
+def get_replica_stats():
+    return replica_stats()
+
+from fastapi.responses import StreamingResponse
+@app.get("/api/live")
+async def live_feed(request: Request):
+    # Server-Sent Events: `entry` events carry the saved row plus day/zone total deltas,
+    # `resync` means the client missed events and should refetch
+    return StreamingResponse(
+        live_stream(request.is_disconnected),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@app.get("/api/live/stats")
+def get_live_stats():
+    return feed_stats()
+
+def _require_profile_token(request: Request):
+    if not profiling_enabled():
+        raise HTTPException(status_code=404, detail="Profiling is not enabled (set PROFILE_TOKEN)")
+    token = request.headers.get("x-profile-token") or request.query_params.get("token")
+    if not profile_authorized(token):
+        raise HTTPException(status_code=403, detail="Invalid profile token")
+
+@app.get("/api/profiles")
+def get_profiles(request: Request, limit: int = 50):
+    _require_profile_token(request)
+    if not 1 <= limit <= 500:
+        raise HTTPException(status_code=400, detail="limit must be 1-500")
+    return list_profiles(limit)
+
+@app.get("/api/profiles/{name}")
+def get_profile(name: str, request: Request):
+    # Speedscope JSON: open at https://www.speedscope.app or with `npx speedscope <file>`
+    _require_profile_token(request)
+    file_path = profile_path(name)
+    if not file_path:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return FileResponse(file_path, media_type="application/json", filename=name)
 
 @app.get("/api/metadata")
 def get_metadata():
     entries = get_all_entries()
-    zones = sorted(list(set(e['zone'] for e in entries if e['zone'])))
-    routes = sorted(list(set(e['route'] for e in entries if e['route'])))
-    vehicles = sorted(list(set(e['vehicle'] for e in entries if e['vehicle'])))
+    zones = sorted(list(set(e.zone for e in entries if e.zone)))
+    routes = sorted(list(set(e.route for e in entries if e.route)))
+    vehicles = sorted(list(set(e.vehicle for e in entries if e.vehicle)))
     return {
         "zones": zones,
         "routes": routes,
@@ -191,401 +385,94 @@ def get_metadata():
     }
 
 @app.get("/api/reports")
-def list_reports():
-    records_dir = "PDF Records"
-    if not os.path.exists(records_dir):
-        return []
-    files = [f for f in os.listdir(records_dir) if f.endswith(".pdf")]
-    # Extract dates or just return filenames
-    return sorted(files, reverse=True)
+def list_reports(start: Optional[str] = None, end: Optional[str] = None, format: Optional[str] = None,
+                 period: Optional[str] = None, limit: int = 50, offset: int = 0):
+    if format and format not in REPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Invalid format. Use one of: {', '.join(REPORT_FORMATS)}")
+    if not 1 <= limit <= 500 or offset < 0:
+        raise HTTPException(status_code=400, detail="limit must be 1-500 and offset >= 0")
+    return list_catalog_reports(start, end, format, period, limit, offset)
 
 from fastapi.responses import FileResponse
-@app.get("/api/reports/{filename}")
-def get_report(filename: str):
-    file_path = os.path.join("PDF Records", filename)
-    if os.path.exists(file_path):
-        return FileResponse(file_path)
+@app.get("/api/reports/{report_id}/file")
+def get_report(report_id: int):
+    # Files are only served through catalog ids, never from user-supplied names
+    report = get_catalog_report(report_id)
+    file_path = resolve_report_path(report) if report else None
+    if file_path and os.path.exists(file_path):
+        return FileResponse(file_path, filename=report["filename"])
     raise HTTPException(status_code=404, detail="File not found")
 
 from fastapi.responses import HTMLResponse
 @app.get("/api/reports/html/{report_date}", response_class=HTMLResponse)
-def get_html_report(report_date: str):
+def get_html_report(report_date: str, mode: str = "interactive"):
+    if mode not in HTML_MODES:
+        raise HTTPException(status_code=400, detail=f"Invalid mode. Use one of: {', '.join(HTML_MODES)}")
     entries = get_entries_by_date(report_date)
     if not entries:
         raise HTTPException(status_code=404, detail="No data for this date")
     
-    # Simple Interactive HTML Template
-    html_content = generate_html_content(report_date, entries)
-    return html_content
-
-def save_html_report_to_file(report_date: str, entries: List[dict]) -> str:
-    html_content = generate_html_content(report_date, entries)
-    filename = f"Report_{report_date}.html"
-    file_path = os.path.join("PDF Records", filename)
-    with open(file_path, "w", encoding="utf-8") as f:
-        f.write(html_content)
-    return file_path
-
-def generate_html_content(report_date: str, entries: List[dict]) -> str:
-    import json
-    
-    # Serialize entries to JSON
-    json_data = json.dumps(entries, default=str)
-    
-    # HTML Template with placeholders
-    html_template = """
-    <!DOCTYPE html>
-    <html lang="en">
-    <head>
-        <meta charset="UTF-8">
-        <meta name="viewport" content="width=device-width, initial-scale=1.0">
-        <title>GL Collection Report - {{REPORT_DATE}}</title>
-        <script src="https://cdn.tailwindcss.com"></script>
-        <script src="https://cdn.jsdelivr.net/npm/chart.js"></script>
-        <style>
-            :root { --primary: #16a34a; --bg: #020617; --glass: rgba(255,255,255,0.03); --border: rgba(255,255,255,0.05); }
-            body { background-color: var(--bg); color: #e2e8f0; font-family: 'Inter', system-ui, sans-serif; }
-            .glass { background: var(--glass); backdrop-filter: blur(10px); border: 1px solid var(--border); }
-            .card { transition: transform 0.2s; }
-            .card:hover { transform: translateY(-2px); border-color: rgba(255,255,255,0.1); }
-            select, input { background: rgba(0,0,0,0.3); border: 1px solid var(--border); color: white; padding: 0.5rem; border-radius: 0.5rem; outline: none; }
-            select:focus, input:focus { border-color: var(--primary); }
-            th { text-align: left; font-size: 0.75rem; text-transform: uppercase; letter-spacing: 0.05em; color: #64748b; padding: 1rem; }
-            td { padding: 1rem; border-top: 1px solid var(--border); }
-            tr:hover td { background: rgba(255,255,255,0.02); }
-        </style>
-    </head>
-    <body class="min-h-screen p-4 md:p-8">
-        <div class="max-w-7xl mx-auto space-y-8">
-            <!-- Header -->
-            <header class="flex flex-col md:flex-row justify-between items-start md:items-end gap-4 border-b border-slate-800 pb-6">
-                <div>
-                    <h1 class="text-3xl font-bold text-white tracking-tight">GL Collection Report</h1>
-                    <p class="text-slate-500 mt-1 uppercase tracking-widest text-xs font-semibold">{{REPORT_DATE}}</p>
-                </div>
-                <div class="text-left md:text-right">
-                    <p class="text-green-500 font-bold text-xl">GREENFIELDS TEA</p>
-                    <p class="text-slate-500 text-xs">Interactive Digital Dashboard</p>
-                </div>
-            </header>
-
-            <!-- Filters -->
-            <div class="glass p-4 rounded-xl flex flex-wrap gap-4 items-center">
-                <div class="flex items-center gap-2">
-                    <span class="text-xs font-bold text-slate-500 uppercase">Filter By:</span>
-                </div>
-                <select id="zoneFilter" onchange="applyFilters()" class="min-w-[150px]">
-                    <option value="">All Zones</option>
-                </select>
-                <select id="routeFilter" onchange="applyFilters()" class="min-w-[150px]">
-                    <option value="">All Routes</option>
-                </select>
-                <input type="text" id="searchFilter" onkeyup="applyFilters()" placeholder="Search clerk, vehicle..." class="min-w-[200px]">
-                <div class="ml-auto text-xs text-slate-400">
-                    Showing <span id="countDisplay" class="font-bold text-white">0</span> records
-                </div>
-            </div>
-
-            <!-- KPI Cards -->
-            <div class="grid grid-cols-1 md:grid-cols-4 gap-6">
-                <div class="glass card p-6 rounded-2xl">
-                    <p class="text-slate-500 text-xs font-bold uppercase tracking-wider mb-1">Total Weight</p>
-                    <p class="text-3xl font-bold text-white"><span id="totalWeight">0</span> <span class="text-sm font-medium text-slate-500">KG</span></p>
-                </div>
-                <div class="glass card p-6 rounded-2xl">
-                    <p class="text-slate-500 text-xs font-bold uppercase tracking-wider mb-1">Avg Quality</p>
-                    <p class="text-3xl font-bold text-white"><span id="avgQuality">0</span>%</p>
-                </div>
-                <div class="glass card p-6 rounded-2xl">
-                    <p class="text-slate-500 text-xs font-bold uppercase tracking-wider mb-1">Routes Active</p>
-                    <p class="text-3xl font-bold text-white" id="totalRoutes">0</p>
-                </div>
-                <div class="glass card p-6 rounded-2xl">
-                    <p class="text-slate-500 text-xs font-bold uppercase tracking-wider mb-1">Entry Count</p>
-                    <p class="text-3xl font-bold text-white" id="totalCount">0</p>
-                </div>
-            </div>
-
-            <!-- Charts Row -->
-            <div class="grid grid-cols-1 md:grid-cols-2 gap-6">
-                <div class="glass p-6 rounded-2xl">
-                    <h3 class="text-sm font-bold text-slate-400 uppercase mb-4">Weight Distribution by Zone</h3>
-                    <div class="h-64">
-                         <canvas id="zoneChart"></canvas>
-                    </div>
-                </div>
-                <div class="glass p-6 rounded-2xl">
-                    <h3 class="text-sm font-bold text-slate-400 uppercase mb-4">Quality vs Weight (Top Routes)</h3>
-                    <div class="h-64">
-                        <canvas id="routeChart"></canvas>
-                    </div>
-                </div>
-            </div>
-
-            <!-- Data Table -->
-            <div class="glass rounded-2xl overflow-hidden overflow-x-auto">
-                <table class="w-full text-left font-mono text-sm">
-                    <thead class="bg-white/5">
-                        <tr>
-                            <th class="cursor-pointer hover:text-white transition-colors" onclick="handleSort('zone')">
-                                Zone <span id="sort-zone" class="ml-1 text-primary-400"></span>
-                            </th>
-                            <th class="cursor-pointer hover:text-white transition-colors" onclick="handleSort('route')">
-                                Route <span id="sort-route" class="ml-1 text-primary-400"></span>
-                            </th>
-                            <th class="cursor-pointer hover:text-white transition-colors" onclick="handleSort('vehicle')">
-                                Vehicle <span id="sort-vehicle" class="ml-1 text-primary-400"></span>
-                            </th>
-                            <th class="cursor-pointer hover:text-white transition-colors" onclick="handleSort('clerk')">
-                                Clerk <span id="sort-clerk" class="ml-1 text-primary-400"></span>
-                            </th>
-                            <th class="text-right cursor-pointer hover:text-white transition-colors" onclick="handleSort('fact_wgt')">
-                                Weight (KG) <span id="sort-fact_wgt" class="ml-1 text-primary-400"></span>
-                            </th>
-                            <th class="text-right cursor-pointer hover:text-white transition-colors" onclick="handleSort('quality_pct')">
-                                Quality % <span id="sort-quality_pct" class="ml-1 text-primary-400"></span>
-                            </th>
-                        </tr>
-                    </thead>
-                    <tbody id="tableBody" class="divide-y divide-white/5 text-slate-300">
-                        <!-- Rows rendered by JS -->
-                    </tbody>
-                </table>
-            </div>
-            
-            <div class="flex justify-center gap-4 text-xs font-medium text-slate-500 uppercase tracking-widest py-8">
-                <span>&copy; 2025 Greenfield Tea Factory</span>
-                <span>&bull;</span>
-                <span>Generated via Greenfield Report System</span>
-            </div>
-        </div>
-
-        <script>
-            // Embedded Data
-            const rawData = {{JSON_DATA}};
-            
-            // State
-            let filteredData = [...rawData];
-            let currentSort = { field: 'zone', asc: true }; // Default sort
-            let zoneChartInstance = null;
-            let routeChartInstance = null;
-
-            // Initialize
-            document.addEventListener('DOMContentLoaded', () => {
-                populateDropdowns();
-                applyFilters();
-            });
-
-            function populateDropdowns() {
-                const zones = [...new Set(rawData.map(d => d.zone))].sort();
-                const routes = [...new Set(rawData.map(d => d.route))].sort();
-                
-                const zSelect = document.getElementById('zoneFilter');
-                zones.forEach(z => {
-                    const opt = document.createElement('option');
-                    opt.value = z;
-                    opt.textContent = z;
-                    zSelect.appendChild(opt);
-                });
-
-                const rSelect = document.getElementById('routeFilter');
-                routes.forEach(r => {
-                    const opt = document.createElement('option');
-                    opt.value = r;
-                    opt.textContent = r;
-                    rSelect.appendChild(opt);
-                });
-            }
-
-            function applyFilters() {
-                const zVal = document.getElementById('zoneFilter').value;
-                const rVal = document.getElementById('routeFilter').value;
-                const sVal = document.getElementById('searchFilter').value.toLowerCase();
-
-                filteredData = rawData.filter(d => {
-                    const matchZone = !zVal || d.zone === zVal;
-                    const matchRoute = !rVal || d.route === rVal;
-                    const matchSearch = !sVal || 
-                        (d.clerk && d.clerk.toLowerCase().includes(sVal)) || 
-                        (d.vehicle && d.vehicle.toLowerCase().includes(sVal));
-                    return matchZone && matchRoute && matchSearch;
-                });
-
-                renderDashboard();
-            }
-
-            function handleSort(field) {
-                if (currentSort.field === field) {
-                    currentSort.asc = !currentSort.asc;
-                } else {
-                    currentSort.field = field;
-                    currentSort.asc = true;
-                }
-                renderDashboard();
-            }
-
-            function renderDashboard() {
-                // 0. Update Sort Icons
-                ['zone', 'route', 'vehicle', 'clerk', 'fact_wgt', 'quality_pct'].forEach(f => {
-                    const el = document.getElementById('sort-' + f);
-                    if (el) el.textContent = '';
-                });
-                const sortIcon = document.getElementById('sort-' + currentSort.field);
-                if (sortIcon) sortIcon.textContent = currentSort.asc ? '↑' : '↓';
-
-                // 1. Sort Data
-                if (currentSort.field) {
-                    filteredData.sort((a, b) => {
-                        let valA = a[currentSort.field];
-                        let valB = b[currentSort.field];
-                        
-                        // Handle numbers
-                        if (typeof valA === 'number' && typeof valB === 'number') {
-                            return currentSort.asc ? valA - valB : valB - valA;
-                        }
-                        
-                        // Handle strings
-                        valA = String(valA || '').toLowerCase();
-                        valB = String(valB || '').toLowerCase();
-                        if (valA < valB) return currentSort.asc ? -1 : 1;
-                        if (valA > valB) return currentSort.asc ? 1 : -1;
-                        return 0;
-                    });
-                }
-
-                // 2. KPIs
-                const totalWgt = filteredData.reduce((sum, d) => sum + (d.fact_wgt || 0), 0);
-                const avgQual = filteredData.length ? filteredData.reduce((sum, d) => sum + (d.quality_pct || 0), 0) / filteredData.length : 0;
-                const uniqueRoutes = new Set(filteredData.map(d => d.route)).size;
-
-                document.getElementById('totalWeight').textContent = totalWgt.toLocaleString(undefined, {minimumFractionDigits: 1, maximumFractionDigits: 1});
-                document.getElementById('avgQuality').textContent = avgQual.toFixed(1);
-                document.getElementById('totalRoutes').textContent = uniqueRoutes;
-                document.getElementById('totalCount').textContent = filteredData.length;
-                document.getElementById('countDisplay').textContent = filteredData.length;
-
-                // 3. Table
-                const tbody = document.getElementById('tableBody');
-                tbody.innerHTML = filteredData.map(d => `
-                    <tr class="hover:bg-white/5 transition-colors">
-                        <td class="font-medium text-white">${d.zone}</td>
-                        <td>${d.route}</td>
-                        <td>${d.vehicle}</td>
-                        <td>${d.clerk}</td>
-                        <td class="text-right text-green-400 font-bold">${d.fact_wgt.toFixed(1)}</td>
-                        <td class="text-right">${d.quality_pct}%</td>
-                    </tr>
-                `).join('');
-
-                // 4. Charts
-                renderCharts();
-            }
-
-            function renderCharts() {
-                // Prepare Data
-                const zoneMap = {};
-                const routeMap = {};
-                
-                filteredData.forEach(d => {
-                    // Zone Aggregation
-                    if (!zoneMap[d.zone]) zoneMap[d.zone] = 0;
-                    zoneMap[d.zone] += d.fact_wgt;
-                    
-                    // Route Aggregation (Top 10 by weight)
-                    if (!routeMap[d.route]) routeMap[d.route] = { wgt: 0, qual: 0, count: 0 };
-                    routeMap[d.route].wgt += d.fact_wgt;
-                    routeMap[d.route].qual += d.quality_pct;
-                    routeMap[d.route].count++;
-                });
-
-                // Zone Chart Data
-                const zoneLabels = Object.keys(zoneMap).sort();
-                const zoneValues = zoneLabels.map(l => zoneMap[l]);
-
-                // Route Chart Data (Top 7)
-                const topRoutes = Object.entries(routeMap)
-                    .sort((a, b) => b[1].wgt - a[1].wgt)
-                    .slice(0, 7);
-                const routeLabels = topRoutes.map(x => x[0]);
-                const routeWeights = topRoutes.map(x => x[1].wgt);
-                const routeQuals = topRoutes.map(x => (x[1].qual / x[1].count).toFixed(1));
-
-                // Destroy old instances
-                if (zoneChartInstance) zoneChartInstance.destroy();
-                if (routeChartInstance) routeChartInstance.destroy();
-
-                // Render Zone Chart (Bar)
-                zoneChartInstance = new Chart(document.getElementById('zoneChart'), {
-                    type: 'bar',
-                    data: {
-                        labels: zoneLabels,
-                        datasets: [{
-                            label: 'Weight (KG)',
-                            data: zoneValues,
-                            backgroundColor: '#22c55e',
-                            borderRadius: 6
-                        }]
-                    },
-                    options: {
-                        responsive: true,
-                        maintainAspectRatio: false,
-                        plugins: { legend: { display: false } },
-                        scales: {
-                            y: { grid: { color: 'rgba(255,255,255,0.05)' } },
-                            x: { grid: { display: false } }
-                        }
-                    }
-                });
-
-                // Render Route Chart (Line/Mixed)
-                routeChartInstance = new Chart(document.getElementById('routeChart'), {
-                    type: 'line',
-                    data: {
-                        labels: routeLabels,
-                        datasets: [
-                            {
-                                label: 'Avg Quality (%)',
-                                data: routeQuals,
-                                borderColor: '#eab308',
-                                backgroundColor: '#eab308',
-                                yAxisID: 'y1',
-                                tension: 0.3
-                            },
-                            {
-                                label: 'Total Weight (KG)',
-                                data: routeWeights,
-                                backgroundColor: 'rgba(34, 197, 94, 0.2)',
-                                borderColor: 'rgba(34, 197, 94, 0.5)',
-                                fill: true,
-                                yAxisID: 'y',
-                                tension: 0.3
-                            }
-                        ]
-                    },
-                    options: {
-                        responsive: true,
-                        maintainAspectRatio: false,
-                        interaction: { mode: 'index', intersect: false },
-                        scales: {
-                            y: { 
-                                type: 'linear', display: true, position: 'left',
-                                grid: { color: 'rgba(255,255,255,0.05)' } 
-                            },
-                            y1: { 
-                                type: 'linear', display: true, position: 'right', grid: { display: false },
-                                min: 0, max: 100
-                            },
-                            x: { grid: { display: false } }
-                        }
-                    }
-                });
-            }
-        </script>
-    </body>
-    </html>
-    """
-    
-    return html_template.replace("{{REPORT_DATE}}", report_date).replace("{{JSON_DATA}}", json_data)
+    # Interactive dashboard by default; mode=offline is the self-contained version that gets emailed
+    return render_html_report(report_date, entries, mode)
+
+def _load_period_or_400(period: str, date: Optional[str]):
+    try:
+        summary = load_period_summary(period, date)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if not summary["kpis"]["entries"]:
+        raise HTTPException(status_code=404, detail="No data for this period")
+    return summary
+
+@app.get("/api/reports/period/{period}/html", response_class=HTMLResponse)
+def get_period_html_report(period: str, date: Optional[str] = None):
+    # period: 'weekly' or 'monthly'; date picks the week/month (defaults to today)
+    summary = _load_period_or_400(period, date)
+    return generate_period_html_content(summary)
+
+@app.post("/api/reports/period/{period}")
+def generate_period_report(period: str, date: Optional[str] = None):
+    from .excel_handler import write_period_report
+    summary = _load_period_or_400(period, date)
+    xl_file = write_period_report(summary)
+    html_file = save_period_html_report_to_file(summary)
+    return {"status": "success", "file": xl_file, "html": html_file, "start": summary["start"], "end": summary["end"]}
+
+@app.post("/api/reports/regenerate")
+def regenerate_reports_range(request: RegenerateRequest):
+    if request.start_date > request.end_date:
+        raise HTTPException(status_code=400, detail="start_date must be on or before end_date")
+    from .batch import start_regeneration_job
+    job = start_regeneration_job(request.start_date, request.end_date, request.workers)
+    return {"status": "started", "job_id": job["id"]}
+
+@app.get("/api/reports/jobs/{job_id}")
+def get_regeneration_job(job_id: str):
+    from .batch import get_job
+    job = get_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+@app.get("/api/reports/schedule")
+def get_report_schedule(date: Optional[str] = None, status: Optional[str] = None, limit: int = 50):
+    from .scheduler import schedule_status, list_runs
+    if not 1 <= limit <= 500:
+        raise HTTPException(status_code=400, detail="limit must be 1-500")
+    return {**schedule_status(), "runs": list_runs(date, status, limit)}
+
+@app.post("/api/reports/schedule/run")
+def run_report_schedule(date: Optional[str] = None, force: bool = False):
+    # Manual pre-render of one day (default today); unchanged days are skipped unless force
+    from .scheduler import run_scheduled
+    try:
+        report_date = datetime.strptime(date, "%Y-%m-%d").date() if date else datetime.now().date()
+    except ValueError:
+        raise HTTPException(status_code=400, detail="date must be YYYY-MM-DD")
+    results = run_scheduled("manual", datetime.now().replace(microsecond=0), [report_date], force)
+    if results is None:
+        raise HTTPException(status_code=409, detail="A scheduled run is already in progress")
+    return {"status": "success", "results": results}
 
 @app.post("/api/reports/send/{report_date}")
 def trigger_email(report_date: str, background_tasks: BackgroundTasks):
@@ -595,6 +482,7 @@ def trigger_email(report_date: str, background_tasks: BackgroundTasks):
     if not entries:
          raise HTTPException(status_code=404, detail="No data for this date")
     
+    from .excel_handler import update_excel_report
     xl_file = update_excel_report(entries, report_date)
     pdf_file = xl_file if xl_file.endswith(".pdf") else None
     
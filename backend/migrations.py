@@ -0,0 +1,321 @@
+import hashlib
+import os
+import re
+import sys
+import time
+from datetime import datetime
+
+import psycopg2
+
+from .database import get_connection
+from .report_catalog import OUTPUT_DIR as REPORT_DIR
+
+
+# Arbitrary key for pg_advisory_lock so only one process migrates at a time
+MIGRATION_LOCK_ID = 47310001
+
+# Every migration is self-contained: backfills use SQL and helpers frozen to
+# that version rather than the live database/report_catalog code, so a later
+# change to those can never change what an old migration does on a fresh database.
+
+
+def _001_base_schema(cursor):
+    # 1. Create Lookup Tables
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS zones (
+            id SERIAL PRIMARY KEY,
+            name VARCHAR(255) UNIQUE NOT NULL
+        )
+    """)
+
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS vehicles (
+            id SERIAL PRIMARY KEY,
+            reg_number VARCHAR(255) UNIQUE NOT NULL
+        )
+    """)
+
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS clerks (
+            id SERIAL PRIMARY KEY,
+            name VARCHAR(255) UNIQUE NOT NULL
+        )
+    """)
+
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS routes (
+            id SERIAL PRIMARY KEY,
+            name VARCHAR(255) UNIQUE NOT NULL,
+            zone_id INTEGER REFERENCES zones(id)
+        )
+    """)
+
+    # 2. Create main entries table
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS daily_entries (
+            id SERIAL PRIMARY KEY,
+            date DATE NOT NULL,
+            zone_id INTEGER REFERENCES zones(id),
+            clerk_id INTEGER REFERENCES clerks(id),
+            vehicle_id INTEGER REFERENCES vehicles(id),
+            route_id INTEGER REFERENCES routes(id),
+            time_out VARCHAR(50),
+            time_in VARCHAR(50),
+            tare_time VARCHAR(50),
+            fld_wgt DECIMAL(10, 2),
+            fact_wgt DECIMAL(10, 2),
+            scorch_kg DECIMAL(10, 2),
+            quality_pct DECIMAL(5, 2),
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+
+    # Create indexes for better performance
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_daily_entries_date ON daily_entries(date)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_daily_entries_zone ON daily_entries(zone_id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_daily_entries_route ON daily_entries(route_id)")
+
+def _002_entry_stats(cursor):
+    # Running per-route / per-vehicle statistics for outlier flags
+    cursor.execute("ALTER TABLE daily_entries ADD COLUMN IF NOT EXISTS flags JSONB")
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS entry_stats (
+            scope VARCHAR(20) NOT NULL,
+            scope_id INTEGER NOT NULL,
+            metric VARCHAR(50) NOT NULL,
+            n INTEGER NOT NULL DEFAULT 0,
+            mean DOUBLE PRECISION NOT NULL DEFAULT 0,
+            m2 DOUBLE PRECISION NOT NULL DEFAULT 0,
+            PRIMARY KEY (scope, scope_id, metric)
+        )
+    """)
+
+    # Backfill from the full history (as of v2: route/vehicle x var_pct, quality_pct, scorch_kg)
+    cursor.execute("DELETE FROM entry_stats")
+    for scope, col in (("route", "route_id"), ("vehicle", "vehicle_id")):
+        for metric, expr, cond in (
+            ("var_pct", "(COALESCE(fact_wgt, 0) - fld_wgt) / fld_wgt * 100", "fld_wgt IS NOT NULL AND fld_wgt <> 0"),
+            ("quality_pct", "COALESCE(quality_pct, 0)", "TRUE"),
+            ("scorch_kg", "COALESCE(scorch_kg, 0)", "TRUE"),
+        ):
+            cursor.execute(f"""
+                INSERT INTO entry_stats (scope, scope_id, metric, n, mean, m2)
+                SELECT %s, {col}, %s, COUNT(*), AVG({expr}), COALESCE(VAR_POP({expr}) * COUNT(*), 0)
+                FROM daily_entries
+                WHERE {col} IS NOT NULL AND {cond}
+                GROUP BY {col}
+            """, (scope, metric))
+
+def _003_daily_rollups(cursor):
+    # Per-day zone/route/clerk totals for weekly and monthly reports
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS daily_rollups (
+            date DATE NOT NULL,
+            dimension VARCHAR(20) NOT NULL,
+            name VARCHAR(255) NOT NULL,
+            entries INTEGER NOT NULL,
+            fld_wgt DECIMAL(12, 2) NOT NULL,
+            fact_wgt DECIMAL(12, 2) NOT NULL,
+            scorch_kg DECIMAL(12, 2) NOT NULL,
+            quality_sum DECIMAL(12, 2) NOT NULL,
+            PRIMARY KEY (date, dimension, name)
+        )
+    """)
+
+    # Backfill every date (as of v3: zone/route/clerk totals)
+    cursor.execute("DELETE FROM daily_rollups")
+    for dimension, table, col, fk in (("zone", "zones", "name", "zone_id"),
+                                      ("route", "routes", "name", "route_id"),
+                                      ("clerk", "clerks", "name", "clerk_id")):
+        cursor.execute(f"""
+            INSERT INTO daily_rollups (date, dimension, name, entries, fld_wgt, fact_wgt, scorch_kg, quality_sum)
+            SELECT e.date, %s, COALESCE(d.{col}, 'UNKNOWN'), COUNT(*),
+                   COALESCE(SUM(e.fld_wgt), 0), COALESCE(SUM(e.fact_wgt), 0),
+                   COALESCE(SUM(e.scorch_kg), 0), COALESCE(SUM(e.quality_pct), 0)
+            FROM daily_entries e
+            LEFT JOIN {table} d ON e.{fk} = d.id
+            GROUP BY e.date, COALESCE(d.{col}, 'UNKNOWN')
+        """, (dimension,))
+
+def _004_report_catalog(cursor):
+    # Generated report files, filled at generation time and by `report_catalog reconcile`
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS report_catalog (
+            id SERIAL PRIMARY KEY,
+            report_date DATE NOT NULL,
+            period VARCHAR(20) NOT NULL,
+            format VARCHAR(10) NOT NULL,
+            filename VARCHAR(255) UNIQUE NOT NULL,
+            path TEXT NOT NULL,
+            size_bytes BIGINT NOT NULL,
+            content_hash CHAR(64) NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_report_catalog_date ON report_catalog(report_date, format)")
+
+    # Backfill the files already on disk, with v4's columns and filename patterns
+    if not os.path.isdir(REPORT_DIR):
+        return
+    pattern = re.compile(
+        r"^Report_(?:(?P<period>Weekly|Monthly)_)?(?P<date>\d{4}-?\d{2}-?\d{2})\.(?P<ext>pdf|xlsm|xlsx|html)$"
+    )
+    for filename in sorted(os.listdir(REPORT_DIR)):
+        match = pattern.match(filename)
+        if not match:
+            continue
+        path = os.path.join(REPORT_DIR, filename)
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                digest.update(chunk)
+        cursor.execute("""
+            INSERT INTO report_catalog (report_date, period, format, filename, path, size_bytes, content_hash, created_at)
+            VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+            ON CONFLICT (filename) DO NOTHING
+        """, (datetime.strptime(match.group("date").replace("-", ""), "%Y%m%d").date(),
+              (match.group("period") or "daily").lower(), match.group("ext"),
+              filename, path, os.path.getsize(path), digest.hexdigest(),
+              datetime.fromtimestamp(os.path.getmtime(path))))
+
+def _005_report_source_hash(cursor):
+    # Hash of the data each file was rendered from, so concurrent renders can reuse it
+    cursor.execute("ALTER TABLE report_catalog ADD COLUMN IF NOT EXISTS source_hash CHAR(64)")
+
+def _006_entry_updated_at(cursor):
+    # Lets analytics snapshots find the months touched since their last export
+    cursor.execute("ALTER TABLE daily_entries ADD COLUMN IF NOT EXISTS updated_at TIMESTAMP")
+    cursor.execute("UPDATE daily_entries SET updated_at = COALESCE(created_at, CURRENT_TIMESTAMP) WHERE updated_at IS NULL")
+    cursor.execute("ALTER TABLE daily_entries ALTER COLUMN updated_at SET DEFAULT CURRENT_TIMESTAMP")
+    cursor.execute("ALTER TABLE daily_entries ALTER COLUMN updated_at SET NOT NULL")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_daily_entries_updated_at ON daily_entries(updated_at)")
+
+def _007_weighbridge_drafts(cursor):
+    # Paired gross/tare weighings from the indicator service, waiting for a clerk to confirm
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS weighbridge_drafts (
+            id SERIAL PRIMARY KEY,
+            scale VARCHAR(50) NOT NULL,
+            vehicle VARCHAR(255),
+            gross_kg DECIMAL(10, 2) NOT NULL,
+            tare_kg DECIMAL(10, 2) NOT NULL,
+            net_kg DECIMAL(10, 2) NOT NULL,
+            gross_at TIMESTAMP NOT NULL,
+            tare_at TIMESTAMP NOT NULL,
+            status VARCHAR(20) NOT NULL DEFAULT 'open',
+            entry_id INTEGER REFERENCES daily_entries(id),
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_weighbridge_drafts_status ON weighbridge_drafts(status, gross_at)")
+
+def _008_report_schedule_runs(cursor):
+    # One row per day considered by a scheduled (or manual) pre-render run
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS report_schedule_runs (
+            id SERIAL PRIMARY KEY,
+            trigger VARCHAR(100) NOT NULL,
+            scheduled_for TIMESTAMP NOT NULL,
+            report_date DATE NOT NULL,
+            status VARCHAR(20) NOT NULL,
+            entries INTEGER NOT NULL DEFAULT 0,
+            source_marker VARCHAR(32),
+            files TEXT,
+            emailed BOOLEAN NOT NULL DEFAULT FALSE,
+            error TEXT,
+            started_at TIMESTAMP NOT NULL,
+            finished_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_report_schedule_runs_date ON report_schedule_runs(report_date, status, id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_report_schedule_runs_fired ON report_schedule_runs(scheduled_for, trigger)")
+
+# Ordered (version, description, apply) - append only, never edit a released entry
+MIGRATIONS = [
+    (1, "Lookup tables, daily_entries and indexes", _001_base_schema),
+    (2, "Outlier flags and running entry_stats", _002_entry_stats),
+    (3, "daily_rollups for period reports", _003_daily_rollups),
+    (4, "report_catalog of generated files", _004_report_catalog),
+    (5, "report_catalog.source_hash for render reuse", _005_report_source_hash),
+    (6, "daily_entries.updated_at for analytics snapshots", _006_entry_updated_at),
+    (7, "weighbridge_drafts from the indicator service", _007_weighbridge_drafts),
+    (8, "report_schedule_runs history for scheduled pre-rendering", _008_report_schedule_runs),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+def _current_version(cursor):
+    cursor.execute("SELECT COALESCE(MAX(version), 0) FROM schema_version")
+    return cursor.fetchone()[0]
+
+def run_migrations():
+    """Apply pending migrations in order, one transaction each"""
+    conn = get_connection()
+    cursor = conn.cursor()
+
+    try:
+        # Session-level lock: concurrent runners wait here, then find nothing to do
+        cursor.execute("SELECT pg_advisory_lock(%s)", (MIGRATION_LOCK_ID,))
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS schema_version (
+                version INTEGER PRIMARY KEY,
+                description VARCHAR(255) NOT NULL,
+                applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+        conn.commit()
+
+        version = _current_version(cursor)
+        for target, description, apply in MIGRATIONS:
+            if target <= version:
+                continue
+            try:
+                apply(cursor)
+                cursor.execute(
+                    "INSERT INTO schema_version (version, description) VALUES (%s, %s)",
+                    (target, description)
+                )
+                conn.commit()
+                print(f"✅ Applied migration {target}: {description}")
+            except Exception as e:
+                conn.rollback()
+                print(f"❌ Migration {target} failed: {e}")
+                raise
+
+        print(f"✅ Database schema at version {LATEST_VERSION}")
+    finally:
+        try:
+            cursor.execute("SELECT pg_advisory_unlock(%s)", (MIGRATION_LOCK_ID,))
+            conn.commit()
+        except psycopg2.Error:
+            pass
+        cursor.close()
+        conn.close()
+
+def verify_schema():
+    """Cheap startup check: one read of schema_version, no DDL"""
+    conn = get_connection()
+    cursor = conn.cursor()
+
+    try:
+        try:
+            version = _current_version(cursor)
+        except psycopg2.errors.UndefinedTable:
+            version = 0
+        if version < LATEST_VERSION:
+            raise RuntimeError(
+                f"Database schema is at version {version}, expected {LATEST_VERSION}. "
+                f"Run `python -m backend.migrations` first."
+            )
+        return version
+    finally:
+        cursor.close()
+        conn.close()
+
+if __name__ == "__main__":
+    started = time.perf_counter()
+    try:
+        run_migrations()
+    except Exception:
+        sys.exit(1)
+    print(f"Done in {time.perf_counter() - started:.2f}s")
@@ -0,0 +1,91 @@
+import calendar
+from datetime import date, datetime, timedelta
+
+from .database import get_period_rollups
+
+
+PERIODS = ("weekly", "monthly")
+
+
+def _to_date(value):
+    if value is None:
+        return date.today()
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return datetime.strptime(str(value)[:10], "%Y-%m-%d").date()
+
+
+def period_bounds(period, anchor_date=None):
+    """First and last day of the week (Mon-Sun) or month containing anchor_date"""
+    anchor = _to_date(anchor_date)
+    if period == "weekly":
+        start = anchor - timedelta(days=anchor.weekday())
+        return start, start + timedelta(days=6)
+    if period == "monthly":
+        last_day = calendar.monthrange(anchor.year, anchor.month)[1]
+        return anchor.replace(day=1), anchor.replace(day=last_day)
+    raise ValueError(f"Invalid period '{period}'. Use one of: {', '.join(PERIODS)}")
+
+
+def period_label(period, start):
+    if period == "weekly":
+        return f"Week of {start.isoformat()}"
+    return start.strftime("%B %Y")
+
+
+def _totals_row(name, t):
+    fld = t["fld_wgt"]
+    return {
+        "name": name,
+        "entries": t["entries"],
+        "fld_wgt": round(fld, 2),
+        "fact_wgt": round(t["fact_wgt"], 2),
+        "var_pct": round((t["fact_wgt"] - fld) / fld * 100, 2) if fld else None,
+        "scorch_kg": round(t["scorch_kg"], 2),
+        "avg_quality": round(t["quality_sum"] / t["entries"], 2) if t["entries"] else 0,
+    }
+
+
+def build_period_summary(period, start, end, rollups):
+    """Fold per-day rollup rows into period totals per zone/route/clerk plus a daily zone trend"""
+    days = [(start + timedelta(days=i)).isoformat() for i in range((end - start).days + 1)]
+    day_index = {d: i for i, d in enumerate(days)}
+    fields = ("entries", "fld_wgt", "fact_wgt", "scorch_kg", "quality_sum")
+
+    totals = {"zone": {}, "route": {}, "clerk": {}}
+    trend = {}
+    for row in rollups:
+        dim = totals[row["dimension"]]
+        t = dim.setdefault(row["name"], {f: 0 for f in fields})
+        for f in fields:
+            t[f] += int(row[f]) if f == "entries" else float(row[f])
+        if row["dimension"] == "zone":
+            series = trend.setdefault(row["name"], [0.0] * len(days))
+            series[day_index[_to_date(row["date"]).isoformat()]] += float(row["fact_wgt"])
+
+    # Every entry has exactly one zone row, so zone totals give the period KPIs
+    overall = {f: sum(t[f] for t in totals["zone"].values()) for f in fields}
+    active_days = sum(1 for i in range(len(days)) if any(s[i] for s in trend.values()))
+
+    def ranked(dimension):
+        rows = [_totals_row(name, t) for name, t in totals[dimension].items()]
+        return sorted(rows, key=lambda r: r["fact_wgt"], reverse=True)
+
+    return {
+        "period": period,
+        "label": period_label(period, start),
+        "start": start.isoformat(),
+        "end": end.isoformat(),
+        "kpis": {**_totals_row("ALL", overall), "active_days": active_days},
+        "zones": ranked("zone"),
+        "routes": ranked("route"),
+        "clerks": ranked("clerk"),
+        "trend": {"dates": days, "series": {name: [round(v, 2) for v in s] for name, s in sorted(trend.items())}},
+    }
+
+
+def load_period_summary(period, anchor_date=None):
+    start, end = period_bounds(period, anchor_date)
+    return build_period_summary(period, start, end, get_period_rollups(start, end))
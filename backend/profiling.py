@@ -0,0 +1,231 @@
+import asyncio
+import contextvars
+import functools
+import hmac
+import json
+import os
+import re
+import sys
+import threading
+import time
+from datetime import datetime
+from urllib.parse import parse_qs
+
+from fastapi.routing import APIRoute
+from starlette.concurrency import run_in_threadpool
+
+
+# Profiling is only wired in when PROFILE_TOKEN is set; requests opt in with
+# `X-Profile: <token>` or `?profile=<token>`. Without the token nothing below runs.
+PROFILE_TOKEN = os.getenv('PROFILE_TOKEN')
+PROFILE_DIR = os.getenv('PROFILE_DIR', 'profiles')
+PROFILE_KEEP = int(os.getenv('PROFILE_KEEP', '50'))
+SAMPLE_INTERVAL = 0.002     # seconds between stack samples
+MAX_CONCURRENT = 2          # further opt-in requests run unprofiled
+MAX_DEPTH = 200
+
+_SUFFIX = ".speedscope.json"
+_NAME_RE = re.compile(r"^[\w.-]+\.speedscope\.json$")
+
+_current = contextvars.ContextVar("profile", default=None)
+_active = threading.BoundedSemaphore(MAX_CONCURRENT)
+
+
+def enabled():
+    return bool(PROFILE_TOKEN)
+
+
+def authorized(token):
+    return enabled() and token is not None and hmac.compare_digest(token, PROFILE_TOKEN)
+
+
+class _Profile:
+    """Samples the stacks of the threads running one request's endpoint"""
+
+    def __init__(self, label):
+        self.label = label
+        self.threads = set()
+        self.frames = []            # speedscope frame table
+        self._frame_index = {}      # code object -> index in frames
+        self.samples = []
+        self.weights = []
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+        self.started = time.perf_counter()
+
+    def _index(self, code):
+        index = self._frame_index.get(code)
+        if index is None:
+            index = len(self.frames)
+            self._frame_index[code] = index
+            self.frames.append({"name": code.co_name, "file": code.co_filename, "line": code.co_firstlineno})
+        return index
+
+    def _run(self):
+        me = threading.get_ident()
+        last = time.perf_counter()
+        while not self._stop.wait(SAMPLE_INTERVAL):
+            now = time.perf_counter()
+            frames = sys._current_frames()
+            for ident in list(self.threads):
+                frame = frames.get(ident)
+                if frame is None or ident == me:
+                    continue
+                stack = []
+                while frame is not None and len(stack) < MAX_DEPTH:
+                    stack.append(self._index(frame.f_code))
+                    frame = frame.f_back
+                stack.reverse()
+                self.samples.append(stack)
+                self.weights.append(round((now - last) * 1000, 3))
+            last = now
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        return (time.perf_counter() - self.started) * 1000
+
+    def speedscope(self, duration_ms):
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "name": self.label,
+            "exporter": "greenfield-reports",
+            "shared": {"frames": self.frames},
+            "profiles": [{
+                "type": "sampled",
+                "name": self.label,
+                "unit": "milliseconds",
+                "startValue": 0,
+                "endValue": round(duration_ms, 3),
+                "samples": self.samples,
+                "weights": self.weights,
+            }],
+        }
+
+
+def _bind_thread(endpoint):
+    """Wrap an endpoint so the thread that runs it is sampled when its request is profiled"""
+    if asyncio.iscoroutinefunction(endpoint):
+        @functools.wraps(endpoint)
+        async def wrapper(*args, **kwargs):
+            profile = _current.get()
+            if profile is None:
+                return await endpoint(*args, **kwargs)
+            # Async endpoints share the event loop thread, so concurrent requests show up too
+            profile.threads.add(threading.get_ident())
+            return await endpoint(*args, **kwargs)
+    else:
+        @functools.wraps(endpoint)
+        def wrapper(*args, **kwargs):
+            profile = _current.get()
+            if profile is None:
+                return endpoint(*args, **kwargs)
+            ident = threading.get_ident()
+            profile.threads.add(ident)
+            try:
+                return endpoint(*args, **kwargs)
+            finally:
+                profile.threads.discard(ident)
+    return wrapper
+
+
+class ProfilingRoute(APIRoute):
+    """APIRoute whose endpoint registers its worker thread with the active profile"""
+
+    def __init__(self, path, endpoint, **kwargs):
+        super().__init__(path, _bind_thread(endpoint), **kwargs)
+
+
+def _slug(path):
+    return re.sub(r"[^\w-]+", "_", path.strip("/"))[:60] or "root"
+
+
+def _save(profile, method, path, status, duration_ms):
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    stamp = datetime.now().strftime("%Y%m%d-%H%M%S-%f")
+    name = f"{stamp}_{method}_{_slug(path)}_{duration_ms:.0f}ms{_SUFFIX}"
+    data = profile.speedscope(duration_ms)
+    data["meta"] = {"method": method, "path": path, "status": status, "duration_ms": round(duration_ms, 1),
+                    "samples": len(profile.samples), "created_at": datetime.now().isoformat(timespec="seconds")}
+    from .artifacts import atomic_write_text
+    atomic_write_text(os.path.join(PROFILE_DIR, name), json.dumps(data))
+
+    # Keep the newest PROFILE_KEEP files
+    names = sorted(n for n in os.listdir(PROFILE_DIR) if n.endswith(_SUFFIX))
+    for old in names[:-PROFILE_KEEP]:
+        os.remove(os.path.join(PROFILE_DIR, old))
+    return name
+
+
+class ProfilingMiddleware:
+    """ASGI middleware: profiles HTTP requests that carry a valid profile token"""
+
+    def __init__(self, app):
+        self.app = app
+
+    @staticmethod
+    def _token(scope):
+        for key, value in scope.get("headers", ()):
+            if key == b"x-profile":
+                return value.decode("latin-1")
+        query = scope.get("query_string", b"")
+        if b"profile=" in query:
+            return parse_qs(query.decode("latin-1")).get("profile", [None])[0]
+        return None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not authorized(self._token(scope)):
+            return await self.app(scope, receive, send)
+        if not _active.acquire(blocking=False):
+            return await self.app(scope, receive, send)
+
+        profile = _Profile(f"{scope['method']} {scope['path']}")
+        status = {}
+
+        async def send_recording_status(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        token = _current.set(profile)
+        profile.start()
+        try:
+            await self.app(scope, receive, send_recording_status)
+        finally:
+            _current.reset(token)
+            duration_ms = profile.stop()
+            _active.release()
+            try:
+                # Serialising and pruning touch the disk: keep them off the event loop
+                name = await run_in_threadpool(_save, profile, scope["method"], scope["path"],
+                                               status.get("code"), duration_ms)
+                print(f"Profiled {profile.label} in {duration_ms:.0f} ms -> {name}")
+            except OSError as e:
+                print(f"❌ Failed to save profile: {e}")
+
+
+def list_profiles(limit=50):
+    """Newest first: name, request, status, duration and sample count of stored profiles"""
+    if not os.path.isdir(PROFILE_DIR):
+        return []
+    items = []
+    for name in sorted((n for n in os.listdir(PROFILE_DIR) if n.endswith(_SUFFIX)), reverse=True)[:limit]:
+        path = os.path.join(PROFILE_DIR, name)
+        try:
+            with open(path, encoding="utf-8") as f:
+                meta = json.load(f).get("meta", {})
+        except (OSError, ValueError):
+            continue
+        items.append({"name": name, **meta, "size_bytes": os.path.getsize(path)})
+    return items
+
+
+def profile_path(name):
+    """Path of a stored profile, or None for unknown or unsafe names"""
+    if not _NAME_RE.match(name):
+        return None
+    path = os.path.join(PROFILE_DIR, name)
+    return path if os.path.exists(path) else None
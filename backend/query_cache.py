@@ -0,0 +1,258 @@
+import os
+import select
+import threading
+import time
+from collections import OrderedDict
+from datetime import date, datetime
+
+
+# Postgres channel carrying the date (YYYY-MM-DD) of every committed entry write
+CHANNEL = "entries_changed"
+
+
+class DateCache:
+    """
+    LRU + TTL cache of query results (per date, per forecast scope and as-of).
+
+    A key that is loading carries a generation number that invalidate() bumps,
+    so a result loaded while a write to the same date was committing is never stored.
+    """
+
+    def __init__(self, maxsize=64, ttl=300):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.enabled = ttl > 0 and maxsize > 0
+        self._data = OrderedDict()      # key -> (expires_at, value)
+        self._generations = {}          # key -> bumped on every invalidation
+        self._loading = {}              # key -> loads in flight
+        self._epoch = 0                 # bumped on clear()
+        self._lock = threading.Lock()
+        self._counters = {"hits": 0, "misses": 0, "invalidations": 0, "evictions": 0, "expired": 0}
+
+    def get_or_load(self, key, loader):
+        with self._lock:
+            item = self._data.get(key)
+            if item is not None and self.enabled:
+                expires_at, value = item
+                if expires_at > time.monotonic():
+                    self._data.move_to_end(key)
+                    self._counters["hits"] += 1
+                    return value
+                del self._data[key]
+                self._counters["expired"] += 1
+            self._counters["misses"] += 1
+            token = (self._epoch, self._generations.get(key, 0))
+            self._loading[key] = self._loading.get(key, 0) + 1
+
+        try:
+            value = loader()
+        except BaseException:
+            with self._lock:
+                self._finish_load(key)
+            raise
+
+        with self._lock:
+            if self.enabled and token == (self._epoch, self._generations.get(key, 0)):
+                self._data[key] = (time.monotonic() + self.ttl, value)
+                self._data.move_to_end(key)
+                while len(self._data) > self.maxsize:
+                    self._data.popitem(last=False)
+                    self._counters["evictions"] += 1
+            self._finish_load(key)
+        return value
+
+    def _finish_load(self, key):
+        # Generations only matter while a load is in flight; drop them after the last one
+        remaining = self._loading.pop(key) - 1
+        if remaining:
+            self._loading[key] = remaining
+        else:
+            self._generations.pop(key, None)
+
+    def invalidate(self, key):
+        with self._lock:
+            if key in self._loading:
+                self._generations[key] = self._generations.get(key, 0) + 1
+            self._data.pop(key, None)
+            self._counters["invalidations"] += 1
+
+    def invalidate_where(self, predicate):
+        """Invalidate every cached or currently loading key for which predicate(key) is true"""
+        with self._lock:
+            for key in [k for k in set(self._data) | set(self._loading) if predicate(k)]:
+                if key in self._loading:
+                    self._generations[key] = self._generations.get(key, 0) + 1
+                self._data.pop(key, None)
+                self._counters["invalidations"] += 1
+
+    def clear(self):
+        with self._lock:
+            self._epoch += 1
+            self._generations.clear()
+            self._data.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self._counters["hits"] + self._counters["misses"]
+            return {
+                **self._counters,
+                "hit_ratio": round(self._counters["hits"] / lookups, 3) if lookups else None,
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "ttl": self.ttl,
+                "enabled": self.enabled,
+            }
+
+
+entries_cache = DateCache(
+    maxsize=int(os.getenv('ENTRY_CACHE_SIZE', '64')),
+    ttl=float(os.getenv('ENTRY_CACHE_TTL', '300')),
+)
+
+# Called with the changed date, or None when changes may have been missed
+_callbacks = []
+# Other channels sharing the listener connection: channel -> handler(payload_or_None)
+_channel_handlers = {}
+_listener = {"thread": None, "connected": False, "notifications": 0, "reconnects": 0}
+
+
+def cache_key(value):
+    """
+    Canonical YYYY-MM-DD key for a date, datetime or date string ("2025-1-5",
+    "2025-01-05T08:00"), so reads and invalidations agree; raises ValueError otherwise
+    """
+    if isinstance(value, datetime):
+        return value.date().isoformat()
+    if isinstance(value, date):
+        return value.isoformat()
+    text = str(value).strip()
+    try:
+        return datetime.strptime(text, "%Y-%m-%d").date().isoformat()
+    except ValueError:
+        pass
+    try:
+        return datetime.fromisoformat(text).date().isoformat()
+    except ValueError:
+        raise ValueError(f"Invalid date '{value}'") from None
+
+
+def on_entries_changed(callback):
+    """Register callback(YYYY-MM-DD or None) for entry writes made by any worker"""
+    _callbacks.append(callback)
+    return callback
+
+
+def listen(channel):
+    """
+    Register handler(payload) for another NOTIFY channel on the listener
+    connection. It is called with None after every (re)connect, since
+    notifications sent while disconnected are lost.
+    """
+    def register(handler):
+        _channel_handlers[channel] = handler
+        return handler
+    return register
+
+
+def entries_changed(date):
+    """Invalidate local caches for `date` (None = everything)"""
+    if date is not None:
+        try:
+            date = cache_key(date)
+        except ValueError:
+            # Unknown payload: we cannot tell which date changed, so drop everything
+            print(f"❌ Unexpected entries_changed payload {date!r}, clearing the cache")
+            date = None
+    if date is None:
+        entries_cache.clear()
+    else:
+        entries_cache.invalidate(date)
+    for callback in _callbacks:
+        try:
+            callback(date)
+        except Exception as e:
+            print(f"❌ Cache invalidation callback failed: {e}")
+
+
+def notify_entries_changed(cursor, date):
+    """Queue a NOTIFY for other workers; Postgres delivers it only if the transaction commits"""
+    cursor.execute("SELECT pg_notify(%s, %s)", (CHANNEL, cache_key(date)))
+
+
+def _dispatch(channel, payload):
+    handler = _channel_handlers.get(channel)
+    if handler is None:
+        return
+    try:
+        handler(payload)
+    except Exception as e:
+        print(f"❌ Handler for {channel} failed: {e}")
+
+
+def _dispatch_all(payload):
+    for channel in list(_channel_handlers):
+        _dispatch(channel, payload)
+
+
+def _listen_forever():
+    import psycopg2.extensions
+    from .database import get_connection
+
+    backoff = 1
+    while True:
+        conn = None
+        try:
+            conn = get_connection()
+            conn.set_isolation_level(psycopg2.extensions.ISOLATION_LEVEL_AUTOCOMMIT)
+            cursor = conn.cursor()
+            for channel in (CHANNEL, *_channel_handlers):
+                cursor.execute(f"LISTEN {channel}")
+            # Anything written while we were disconnected is unknown: start clean
+            entries_changed(None)
+            _dispatch_all(None)
+            entries_cache.enabled = entries_cache.ttl > 0 and entries_cache.maxsize > 0
+            _listener["connected"] = True
+            backoff = 1
+            while True:
+                if select.select([conn], [], [], 30) == ([], [], []):
+                    continue
+                conn.poll()
+                while conn.notifies:
+                    notify = conn.notifies.pop(0)
+                    _listener["notifications"] += 1
+                    if notify.channel == CHANNEL:
+                        entries_changed(notify.payload or None)
+                    else:
+                        _dispatch(notify.channel, notify.payload)
+        except Exception as e:
+            print(f"❌ Cache invalidation listener disconnected: {e}")
+        finally:
+            # Without a listener other workers' writes would go unseen: stop serving cached results
+            _listener["connected"] = False
+            entries_cache.enabled = False
+            entries_changed(None)
+            if conn is not None:
+                try:
+                    conn.close()
+                except Exception:
+                    pass
+        _listener["reconnects"] += 1
+        time.sleep(backoff)
+        backoff = min(backoff * 2, 30)
+
+
+def start_listener():
+    """Start the LISTEN thread; until it connects the cache is bypassed"""
+    if _listener["thread"] is not None:
+        return
+    entries_cache.enabled = False
+    thread = threading.Thread(target=_listen_forever, name="entries-cache-listener", daemon=True)
+    _listener["thread"] = thread
+    thread.start()
+
+
+def cache_stats():
+    return {
+        "entries_by_date": entries_cache.stats(),
+        "listener": {k: v for k, v in _listener.items() if k != "thread"},
+    }
@@ -0,0 +1,216 @@
+import hashlib
+import os
+import re
+import sys
+from datetime import datetime
+
+from psycopg2.extras import RealDictCursor
+
+from .database import get_connection
+
+
+OUTPUT_DIR = "PDF Records"
+FORMATS = ("pdf", "xlsm", "xlsx", "html")
+
+# Report_20250101.pdf, Report_2025-01-01.html, Report_Weekly_20250106.xlsx, Report_Monthly_2025-01-01.html
+_FILENAME_RE = re.compile(
+    r"^Report_(?:(?P<period>Weekly|Monthly)_)?(?P<date>\d{4}-?\d{2}-?\d{2})\.(?P<ext>pdf|xlsm|xlsx|html)$"
+)
+
+_COLUMNS = "id, report_date, period, format, filename, path, size_bytes, content_hash, source_hash, created_at"
+
+
+def parse_report_filename(filename):
+    """(report_date, period, format) for a generated report filename, or None"""
+    match = _FILENAME_RE.match(filename)
+    if not match:
+        return None
+    report_date = datetime.strptime(match.group("date").replace("-", ""), "%Y%m%d").date()
+    period = (match.group("period") or "daily").lower()
+    return report_date, period, match.group("ext")
+
+
+def _file_hash(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _upsert(cursor, filename, report_date, period, fmt, created_at=None, source_hash=None):
+    path = os.path.join(OUTPUT_DIR, filename)
+    # source_hash identifies the data a file was rendered from; a reconcile
+    # (no source_hash) keeps the known one as long as the file is unchanged
+    cursor.execute(f"""
+        INSERT INTO report_catalog (report_date, period, format, filename, path, size_bytes, content_hash, source_hash, created_at)
+        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, COALESCE(%s, CURRENT_TIMESTAMP))
+        ON CONFLICT (filename) DO UPDATE SET
+            report_date=EXCLUDED.report_date, period=EXCLUDED.period, format=EXCLUDED.format,
+            path=EXCLUDED.path, size_bytes=EXCLUDED.size_bytes, content_hash=EXCLUDED.content_hash,
+            source_hash=CASE WHEN report_catalog.content_hash = EXCLUDED.content_hash
+                             THEN COALESCE(EXCLUDED.source_hash, report_catalog.source_hash)
+                             ELSE EXCLUDED.source_hash END,
+            created_at=CASE WHEN report_catalog.content_hash = EXCLUDED.content_hash AND %s IS NOT NULL
+                            THEN report_catalog.created_at
+                            ELSE EXCLUDED.created_at END
+        RETURNING {_COLUMNS}
+    """, (report_date, period, fmt, filename, path, os.path.getsize(path), _file_hash(path), source_hash,
+          created_at, created_at))
+    return cursor.fetchone()
+
+
+def record_report(file_path, source_hash=None):
+    """
+    Add or refresh the catalog row for a report that was just written.
+    Failures are logged, not raised: the file exists and `reconcile` can catch up.
+    """
+    filename = os.path.basename(file_path)
+    parsed = parse_report_filename(filename)
+    if not parsed:
+        print(f"Warning: not cataloguing unrecognised report file {filename}")
+        return None
+
+    conn = None
+    try:
+        conn = get_connection()
+        cursor = conn.cursor(cursor_factory=RealDictCursor)
+        row = _upsert(cursor, filename, *parsed, source_hash=source_hash)
+        conn.commit()
+        cursor.close()
+        return dict(row)
+    except Exception as e:
+        if conn is not None:
+            conn.rollback()
+        print(f"❌ Failed to catalogue report {filename}: {e}")
+        return None
+    finally:
+        if conn is not None:
+            conn.close()
+
+
+def list_reports(start_date=None, end_date=None, fmt=None, period=None, limit=50, offset=0):
+    conn = get_connection()
+    cursor = conn.cursor(cursor_factory=RealDictCursor)
+
+    try:
+        where, params = [], []
+        if start_date:
+            where.append("report_date >= %s")
+            params.append(start_date)
+        if end_date:
+            where.append("report_date <= %s")
+            params.append(end_date)
+        if fmt:
+            where.append("format = %s")
+            params.append(fmt)
+        if period:
+            where.append("period = %s")
+            params.append(period)
+        clause = f"WHERE {' AND '.join(where)}" if where else ""
+
+        cursor.execute(f"SELECT COUNT(*) AS total FROM report_catalog {clause}", params)
+        total = cursor.fetchone()["total"]
+        cursor.execute(f"""
+            SELECT {_COLUMNS} FROM report_catalog {clause}
+            ORDER BY report_date DESC, id DESC
+            LIMIT %s OFFSET %s
+        """, params + [limit, offset])
+        return {"items": [dict(row) for row in cursor.fetchall()], "total": total, "limit": limit, "offset": offset}
+    finally:
+        cursor.close()
+        conn.close()
+
+
+def get_report(report_id):
+    conn = get_connection()
+    cursor = conn.cursor(cursor_factory=RealDictCursor)
+
+    try:
+        cursor.execute(f"SELECT {_COLUMNS} FROM report_catalog WHERE id=%s", (report_id,))
+        row = cursor.fetchone()
+        return dict(row) if row else None
+    finally:
+        cursor.close()
+        conn.close()
+
+
+def find_reusable_report(filenames, source_hash):
+    """
+    First of `filenames` (in order) that was catalogued from the same source
+    data and still exists on disk.
+    """
+    if not source_hash:
+        return None
+    conn = get_connection()
+    cursor = conn.cursor()
+
+    try:
+        cursor.execute("""
+            SELECT filename FROM report_catalog
+            WHERE filename = ANY(%s) AND source_hash = %s
+        """, (list(filenames), source_hash))
+        found = {row[0] for row in cursor.fetchall()}
+    finally:
+        cursor.close()
+        conn.close()
+
+    for filename in filenames:
+        path = os.path.join(OUTPUT_DIR, filename)
+        if filename in found and os.path.exists(path):
+            return os.path.abspath(path)
+    return None
+
+
+def resolve_report_path(report):
+    """Absolute path of a catalogued file, refusing anything outside OUTPUT_DIR"""
+    root = os.path.realpath(OUTPUT_DIR)
+    path = os.path.realpath(os.path.join(root, report["filename"]))
+    if os.path.commonpath([root, path]) != root:
+        return None
+    return path
+
+
+def _reconcile(cursor):
+    on_disk = set()
+    if os.path.isdir(OUTPUT_DIR):
+        for filename in os.listdir(OUTPUT_DIR):
+            parsed = parse_report_filename(filename)
+            if parsed:
+                # Files found on disk keep their modification time as created_at
+                mtime = datetime.fromtimestamp(os.path.getmtime(os.path.join(OUTPUT_DIR, filename)))
+                _upsert(cursor, filename, *parsed, created_at=mtime)
+                on_disk.add(filename)
+
+    cursor.execute("SELECT id, filename FROM report_catalog")
+    missing = [row[0] for row in cursor.fetchall() if row[1] not in on_disk]
+    if missing:
+        cursor.execute("DELETE FROM report_catalog WHERE id = ANY(%s)", (missing,))
+    return {"files": len(on_disk), "removed": len(missing)}
+
+
+def reconcile():
+    """Rebuild the catalog from the files on disk: add/refresh present files, drop missing ones"""
+    conn = get_connection()
+    cursor = conn.cursor()
+
+    try:
+        result = _reconcile(cursor)
+        conn.commit()
+        print(f"✅ Report catalog reconciled: {result['files']} files, {result['removed']} stale rows removed")
+        return result
+    except Exception as e:
+        conn.rollback()
+        print(f"❌ Report catalog reconciliation failed: {e}")
+        raise
+    finally:
+        cursor.close()
+        conn.close()
+
+
+if __name__ == "__main__":
+    # python -m backend.report_catalog reconcile
+    if sys.argv[1:] != ["reconcile"]:
+        print("Usage: python -m backend.report_catalog reconcile")
+        sys.exit(1)
+    reconcile()
@@ -0,0 +1,75 @@
+import json
+from collections import namedtuple
+from datetime import date, datetime
+from decimal import Decimal
+
+import psycopg2.extensions
+
+
+# Column order of every entry query (database._ENTRY_SELECT)
+ENTRY_FIELDS = (
+    "id", "date", "zone", "clerk", "vehicle", "route", "time_out", "time_in", "tare_time",
+    "fld_wgt", "fact_wgt", "scorch_kg", "quality_pct", "flags", "created_at", "updated_at",
+)
+
+_NUMERIC_FIELDS = ("fld_wgt", "fact_wgt", "scorch_kg", "quality_pct")
+
+# Typecasters applied per cursor, so entry rows come off the wire already converted:
+# NUMERIC -> float, DATE -> 'YYYY-MM-DD', TIMESTAMP -> 'YYYY-MM-DDTHH:MM:SS[.ffffff]'
+_FLOAT = psycopg2.extensions.new_type(
+    psycopg2.extensions.DECIMAL.values, "ENTRY_FLOAT", lambda value, cur: float(value) if value is not None else None
+)
+_ISO_DATE = psycopg2.extensions.new_type((1082,), "ENTRY_ISO_DATE", lambda value, cur: value)
+_ISO_TIMESTAMP = psycopg2.extensions.new_type(
+    (1114, 1184), "ENTRY_ISO_TIMESTAMP", lambda value, cur: value.replace(" ", "T", 1) if value is not None else None
+)
+
+
+class EntryRow(namedtuple("EntryRow", ENTRY_FIELDS)):
+    """
+    One daily entry as an immutable tuple (no per-row dict). Weights are
+    floats, dates and timestamps ISO strings, so rows go to JSON, Excel and
+    pickled worker processes without further conversion.
+    """
+    __slots__ = ()
+
+    @classmethod
+    def from_mapping(cls, data):
+        """Build from a dict (a submitted Entry, or test data); missing fields are None"""
+        values = []
+        for field in ENTRY_FIELDS:
+            value = data.get(field)
+            if field in _NUMERIC_FIELDS and value is not None:
+                value = float(value)
+            elif isinstance(value, (date, datetime)):
+                value = value.isoformat()
+            values.append(value)
+        return cls._make(values)
+
+    def as_dict(self):
+        return self._asdict()
+
+
+def entry_cursor(conn):
+    """Plain (tuple) cursor with the entry typecasters registered on it only"""
+    cursor = conn.cursor()
+    for caster in (_FLOAT, _ISO_DATE, _ISO_TIMESTAMP):
+        psycopg2.extensions.register_type(caster, cursor)
+    return cursor
+
+
+def fetch_entry_rows(cursor):
+    return list(map(EntryRow._make, cursor.fetchall()))
+
+
+def _json_default(value):
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    raise TypeError(f"Cannot encode {type(value).__name__}")
+
+
+def rows_to_json(rows):
+    """JSON array of objects for a list of EntryRows"""
+    return json.dumps([row._asdict() for row in rows], default=_json_default)
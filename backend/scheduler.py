@@ -0,0 +1,317 @@
+import json
+import os
+import sys
+import threading
+import time
+from datetime import date, datetime, timedelta
+
+from psycopg2.extras import RealDictCursor
+
+from .database import get_connection, get_entries_by_date
+from .html_report import save_html_report_to_file
+from .query_cache import entries_cache, cache_key
+
+
+# Cron-style cutoffs (local time) at which each day's reports are pre-rendered,
+# e.g. "30 18 * * 1-6;0 22 * * *". Empty disables the scheduler.
+SCHEDULE = os.getenv('REPORT_SCHEDULE', '')
+LOOKBACK_DAYS = int(os.getenv('REPORT_SCHEDULE_DAYS', '2'))    # today plus the previous day(s), for late edits
+EMAIL = os.getenv('REPORT_SCHEDULE_EMAIL', '1') == '1'
+
+SCHEDULE_LOCK_ID = 47310003  # pg_try_advisory_lock key: one worker renders per cutoff
+
+_FIELDS = (
+    ("minute", 0, 59),
+    ("hour", 0, 23),
+    ("day", 1, 31),
+    ("month", 1, 12),
+    ("weekday", 0, 7),   # 0 and 7 = Sunday, as in cron
+)
+
+_state = {"thread": None, "on_rendered": None}
+_run_lock = threading.Lock()
+
+
+class CronSchedule:
+    """A five-field cron expression: minute hour day month weekday, with * , - and /"""
+
+    def __init__(self, expr):
+        self.expr = " ".join(expr.split())
+        parts = self.expr.split(" ")
+        if len(parts) != 5:
+            raise ValueError(f"Cron expression '{expr}' must have 5 fields")
+        self.values = {}
+        for text, (name, low, high) in zip(parts, _FIELDS):
+            self.values[name] = self._parse_field(text, name, low, high)
+        # Cron semantics: when both day fields are restricted, either one may match
+        self._either_day = parts[2] != "*" and parts[4] != "*"
+
+    @staticmethod
+    def _parse_field(text, name, low, high):
+        values = set()
+        for item in text.split(","):
+            base, _, step = item.partition("/")
+            try:
+                if base == "*":
+                    start, end = low, high
+                elif "-" in base:
+                    start, end = (int(v) for v in base.split("-", 1))
+                else:
+                    start = int(base)
+                    end = high if step else start
+                step = int(step) if step else 1
+            except ValueError:
+                raise ValueError(f"Invalid {name} field '{text}'")
+            if not (low <= start <= end <= high) or step < 1:
+                raise ValueError(f"Invalid {name} field '{text}'")
+            values.update(range(start, end + 1, step))
+        if name == "weekday" and 7 in values:
+            values.discard(7)
+            values.add(0)
+        return values
+
+    def _day_matches(self, day):
+        in_month = day.day in self.values["day"]
+        in_week = (day.isoweekday() % 7) in self.values["weekday"]
+        return (in_month or in_week) if self._either_day else (in_month and in_week)
+
+    def next_after(self, moment):
+        """First matching minute strictly after `moment`"""
+        candidate = moment.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        for _ in range(366 * 5):
+            if candidate.month in self.values["month"] and self._day_matches(candidate):
+                for hour in sorted(h for h in self.values["hour"] if h >= candidate.hour):
+                    first = candidate.minute if hour == candidate.hour else 0
+                    minutes = [m for m in sorted(self.values["minute"]) if m >= first]
+                    if minutes:
+                        return candidate.replace(hour=hour, minute=minutes[0])
+            candidate = (candidate + timedelta(days=1)).replace(hour=0, minute=0)
+        raise ValueError(f"Cron expression '{self.expr}' never fires")
+
+
+def parse_schedule(text=None):
+    text = SCHEDULE if text is None else text
+    return [CronSchedule(expr) for expr in text.split(";") if expr.strip()]
+
+
+def _day_marker(cursor, report_date):
+    """
+    (entries, marker) for a day. The report also charts the zone totals of the
+    last SUMMARY_DAYS dates with data up to this one, so the marker covers the
+    rows of that whole window: it changes whenever any of them is added or
+    edited, or the window itself shifts. Entries are never deleted.
+    """
+    from .excel_handler import SUMMARY_DAYS
+
+    cursor.execute("""
+        WITH summary_dates AS (
+            SELECT DISTINCT date FROM daily_entries WHERE date <= %s ORDER BY date DESC LIMIT %s
+        )
+        SELECT COUNT(*) FILTER (WHERE e.date = %s),
+               md5(string_agg(e.id::text || '@' || e.updated_at::text, ',' ORDER BY e.id))
+        FROM daily_entries e
+        WHERE e.date IN (SELECT date FROM summary_dates)
+    """, (report_date, SUMMARY_DAYS, report_date))
+    count, marker = cursor.fetchone()
+    return count, marker
+
+
+def _last_rendered_marker(cursor, report_date):
+    cursor.execute("""
+        SELECT source_marker FROM report_schedule_runs
+        WHERE report_date = %s AND status = 'rendered'
+        ORDER BY id DESC LIMIT 1
+    """, (report_date,))
+    row = cursor.fetchone()
+    return row[0] if row else None
+
+
+def _record(cursor, trigger, scheduled_for, report_date, status, started_at,
+            entries=0, marker=None, files=None, emailed=False, error=None):
+    cursor.execute("""
+        INSERT INTO report_schedule_runs
+            (trigger, scheduled_for, report_date, status, entries, source_marker, files, emailed, error, started_at)
+        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+    """, (trigger, scheduled_for, report_date, status, entries, marker,
+          json.dumps(files) if files else None, emailed, error, started_at))
+
+
+def _render_day(report_date):
+    """
+    Render the day's PDF/Excel and HTML reports. The files are catalogued with
+    the hash of their source data, so any worker serving the same day later
+    reuses them instead of rendering again.
+    """
+    from .excel_handler import update_excel_report
+
+    # Reload rather than trust a cached list that may predate the marker just read
+    entries_cache.invalidate(cache_key(report_date))
+    entries = get_entries_by_date(report_date)
+    xl_file = update_excel_report(entries, report_date)
+    html_file = save_html_report_to_file(report_date, entries)
+    return [f for f in (xl_file if xl_file.endswith(".pdf") else None, html_file) if f], xl_file
+
+
+def run_day(cursor, report_date, trigger, scheduled_for, force=False, email=EMAIL):
+    """Pre-render one day unless nothing changed since its last rendered run; returns the history row"""
+    started_at = datetime.now()
+    day = report_date.isoformat() if isinstance(report_date, date) else report_date
+
+    # The marker is read before the entries, so a write landing in between
+    # makes the next run render again rather than being missed
+    count, marker = _day_marker(cursor, day)
+    if not count:
+        status, files, emailed, error = "empty", None, False, None
+    elif not force and marker == _last_rendered_marker(cursor, day):
+        status, files, emailed, error = "skipped", None, False, None
+    else:
+        emailed, error = False, None
+        try:
+            attachments, xl_file = _render_day(day)
+            files = sorted(set(attachments + [xl_file]))
+            status = "rendered"
+            if email and attachments and _state["on_rendered"]:
+                _state["on_rendered"](attachments, day)
+                emailed = True
+        except Exception as e:
+            print(f"❌ Scheduled render of {day} failed: {e}")
+            status, files, error = "failed", None, str(e)
+    _record(cursor, trigger, scheduled_for, day, status, started_at, count, marker, files, emailed, error)
+    return {"date": day, "status": status, "entries": count, "files": files, "emailed": emailed, "error": error}
+
+
+def run_scheduled(trigger, scheduled_for, dates=None, force=False):
+    """
+    Pre-render the days for one cutoff. Only one worker runs a given cutoff:
+    the others find the advisory lock taken, or its history rows already
+    written, and return None.
+    """
+    if dates is None:
+        dates = [scheduled_for.date() - timedelta(days=i) for i in range(max(LOOKBACK_DAYS, 1))]
+    if not _run_lock.acquire(blocking=False):
+        return None
+    try:
+        conn = get_connection()
+        # Autocommit: no transaction stays open while a day renders, and each history row lands as it finishes
+        conn.autocommit = True
+        cursor = conn.cursor()
+        try:
+            cursor.execute("SELECT pg_try_advisory_lock(%s)", (SCHEDULE_LOCK_ID,))
+            if not cursor.fetchone()[0]:
+                return None
+            try:
+                cursor.execute(
+                    "SELECT 1 FROM report_schedule_runs WHERE scheduled_for = %s AND trigger = %s LIMIT 1",
+                    (scheduled_for, trigger)
+                )
+                if cursor.fetchone():
+                    return None
+                started = time.perf_counter()
+                results = [run_day(cursor, d, trigger, scheduled_for, force) for d in sorted(dates)]
+                rendered = sum(r["status"] == "rendered" for r in results)
+                print(f"✅ Report schedule '{trigger}': {rendered} rendered, "
+                      f"{len(results) - rendered} skipped/empty/failed in {time.perf_counter() - started:.1f}s")
+                return results
+            finally:
+                cursor.execute("SELECT pg_advisory_unlock(%s)", (SCHEDULE_LOCK_ID,))
+        finally:
+            cursor.close()
+            conn.close()
+    finally:
+        _run_lock.release()
+
+
+def _run_forever(schedules):
+    while True:
+        now = datetime.now()
+        due, schedule = min(((s.next_after(now), s) for s in schedules), key=lambda item: item[0])
+        # Sleep in short steps so clock changes (NTP, DST) don't push a cutoff far out
+        while datetime.now() < due:
+            time.sleep(min(60, max((due - datetime.now()).total_seconds(), 0.5)))
+        try:
+            run_scheduled(schedule.expr, due)
+        except Exception as e:
+            print(f"❌ Report schedule '{schedule.expr}' failed: {e}")
+
+
+def start_scheduler(on_rendered=None):
+    """
+    Start the cutoff loop (REPORT_SCHEDULE) in a background thread.
+    `on_rendered(attachments, report_date)` receives each freshly rendered day, e.g. to email it.
+    """
+    _state["on_rendered"] = on_rendered
+    if _state["thread"] is not None:
+        return
+    try:
+        schedules = parse_schedule()
+    except ValueError as e:
+        print(f"❌ Invalid REPORT_SCHEDULE: {e}")
+        return
+    if not schedules:
+        return
+    thread = threading.Thread(target=_run_forever, args=(schedules,), name="report-schedule", daemon=True)
+    _state["thread"] = thread
+    thread.start()
+    print(f"✅ Report schedule: {'; '.join(s.expr for s in schedules)}")
+
+
+def schedule_status():
+    try:
+        schedules = parse_schedule()
+        error = None
+    except ValueError as e:
+        schedules, error = [], str(e)
+    now = datetime.now()
+    return {
+        "schedule": [{"cron": s.expr, "next_run": s.next_after(now).isoformat(timespec="minutes")} for s in schedules],
+        "error": error,
+        "running_here": _state["thread"] is not None,
+        "lookback_days": LOOKBACK_DAYS,
+        "email": EMAIL,
+    }
+
+
+def list_runs(report_date=None, status=None, limit=50):
+    """Run history, newest first"""
+    conn = get_connection()
+    cursor = conn.cursor(cursor_factory=RealDictCursor)
+
+    try:
+        where, params = [], []
+        if report_date:
+            where.append("report_date = %s")
+            params.append(report_date)
+        if status:
+            where.append("status = %s")
+            params.append(status)
+        clause = f"WHERE {' AND '.join(where)}" if where else ""
+        cursor.execute(f"""
+            SELECT id, trigger, scheduled_for, report_date, status, entries, files, emailed, error, started_at, finished_at
+            FROM report_schedule_runs {clause}
+            ORDER BY id DESC LIMIT %s
+        """, params + [limit])
+        rows = []
+        for row in cursor.fetchall():
+            row = dict(row)
+            row["files"] = json.loads(row["files"]) if row["files"] else []
+            rows.append(row)
+        return rows
+    finally:
+        cursor.close()
+        conn.close()
+
+
+if __name__ == "__main__":
+    # python -m backend.scheduler next            -> upcoming cutoffs
+    # python -m backend.scheduler run [DATE] [--force]
+    command = sys.argv[1] if len(sys.argv) > 1 else "next"
+    if command == "next":
+        print(json.dumps(schedule_status(), indent=2))
+    elif command == "run":
+        args = [a for a in sys.argv[2:] if a != "--force"]
+        day = date.fromisoformat(args[0]) if args else date.today()
+        results = run_scheduled("manual", datetime.now().replace(microsecond=0), [day], force="--force" in sys.argv)
+        print(json.dumps(results, indent=2, default=str) if results is not None else "Another run is in progress")
+    else:
+        print("Usage: python -m backend.scheduler [next | run [DATE] [--force]]")
+        sys.exit(1)
@@ -0,0 +1,125 @@
+import math
+from html import escape
+
+
+# Server-side charts for the offline HTML report: plain inline SVG strings,
+# styled to match the dashboard (dark glass cards, green bars, amber line).
+WIDTH = 560
+HEIGHT = 256
+PAD_LEFT = 52
+PAD_RIGHT = 40
+PAD_TOP = 12
+PAD_BOTTOM = 44
+GRID = "rgba(255,255,255,0.08)"
+AXIS_TEXT = "#64748b"
+BAR = "#22c55e"
+LINE = "#eab308"
+
+
+def _nice_max(value, ticks=4):
+    """Smallest 1/2/2.5/5 x 10^n step that fits `value` in `ticks` steps, times `ticks`"""
+    if value <= 0:
+        return ticks
+    raw = value / ticks
+    magnitude = 10 ** math.floor(math.log10(raw))
+    for factor in (1, 2, 2.5, 5, 10):
+        if raw <= factor * magnitude:
+            return factor * magnitude * ticks
+    return 10 * magnitude * ticks
+
+
+def _fmt(value):
+    return f"{value:,.0f}" if abs(value) >= 10 or value == int(value) else f"{value:,.1f}"
+
+
+def _label(text, limit=12):
+    text = str(text)
+    return text if len(text) <= limit else text[:limit - 1] + "…"
+
+
+def _frame(body, title):
+    return (
+        f'<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 {WIDTH} {HEIGHT}" '
+        f'role="img" aria-label="{escape(title)}" font-family="system-ui,sans-serif" font-size="11">'
+        f"{body}</svg>"
+    )
+
+
+def _y_axis(top, ticks=4, side="left", suffix=""):
+    plot_h = HEIGHT - PAD_TOP - PAD_BOTTOM
+    parts = []
+    for i in range(ticks + 1):
+        value = top * i / ticks
+        y = HEIGHT - PAD_BOTTOM - plot_h * i / ticks
+        if side == "left":
+            parts.append(f'<line x1="{PAD_LEFT}" y1="{y:.1f}" x2="{WIDTH - PAD_RIGHT}" y2="{y:.1f}" stroke="{GRID}"/>')
+            parts.append(f'<text x="{PAD_LEFT - 6}" y="{y + 4:.1f}" text-anchor="end" fill="{AXIS_TEXT}">{_fmt(value)}{suffix}</text>')
+        else:
+            parts.append(f'<text x="{WIDTH - PAD_RIGHT + 6}" y="{y + 4:.1f}" fill="{LINE}">{_fmt(value)}{suffix}</text>')
+    return "".join(parts)
+
+
+def _slots(count):
+    """x position and width of each category slot"""
+    plot_w = WIDTH - PAD_LEFT - PAD_RIGHT
+    slot = plot_w / max(count, 1)
+    return [(PAD_LEFT + slot * i, slot) for i in range(count)]
+
+
+def _x_labels(labels):
+    parts = []
+    for (x, slot), label in zip(_slots(len(labels)), labels):
+        parts.append(
+            f'<text x="{x + slot / 2:.1f}" y="{HEIGHT - PAD_BOTTOM + 16}" text-anchor="middle" fill="{AXIS_TEXT}">'
+            f"{escape(_label(label))}</text>"
+        )
+    return "".join(parts)
+
+
+def _bars(labels, values, top, unit):
+    plot_h = HEIGHT - PAD_TOP - PAD_BOTTOM
+    parts = []
+    for (x, slot), label, value in zip(_slots(len(labels)), labels, values):
+        h = plot_h * value / top if top else 0
+        w = min(slot * 0.6, 56)
+        parts.append(
+            f'<rect x="{x + (slot - w) / 2:.1f}" y="{HEIGHT - PAD_BOTTOM - h:.1f}" width="{w:.1f}" height="{h:.1f}" '
+            f'rx="4" fill="{BAR}"><title>{escape(str(label))}: {value:,.1f} {unit}</title></rect>'
+        )
+    return "".join(parts)
+
+
+def bar_chart(labels, values, title, unit="KG"):
+    """Vertical bar chart of one series"""
+    if not labels:
+        return _frame(f'<text x="{WIDTH / 2}" y="{HEIGHT / 2}" text-anchor="middle" fill="{AXIS_TEXT}">No data</text>', title)
+    top = _nice_max(max(values))
+    return _frame(_y_axis(top) + _bars(labels, values, top, unit) + _x_labels(labels), title)
+
+
+def bar_line_chart(labels, bars, line, title, bar_unit="KG", line_unit="%", line_max=100):
+    """Bars on the left axis with a line on a fixed 0..line_max right axis (weight vs quality)"""
+    if not labels:
+        return bar_chart(labels, bars, title, bar_unit)
+    top = _nice_max(max(bars))
+    plot_h = HEIGHT - PAD_TOP - PAD_BOTTOM
+    points = []
+    dots = []
+    for (x, slot), label, value in zip(_slots(len(labels)), labels, line):
+        cx = x + slot / 2
+        cy = HEIGHT - PAD_BOTTOM - plot_h * min(max(value, 0), line_max) / line_max
+        points.append(f"{cx:.1f},{cy:.1f}")
+        dots.append(
+            f'<circle cx="{cx:.1f}" cy="{cy:.1f}" r="3.5" fill="{LINE}">'
+            f"<title>{escape(str(label))}: {value:.1f}{line_unit}</title></circle>"
+        )
+    polyline = f'<polyline points="{" ".join(points)}" fill="none" stroke="{LINE}" stroke-width="2"/>'
+    legend = (
+        f'<rect x="{PAD_LEFT}" y="{HEIGHT - 14}" width="10" height="10" rx="2" fill="{BAR}"/>'
+        f'<text x="{PAD_LEFT + 14}" y="{HEIGHT - 5}" fill="{AXIS_TEXT}">Total Weight ({bar_unit})</text>'
+        f'<rect x="{PAD_LEFT + 130}" y="{HEIGHT - 14}" width="10" height="10" rx="2" fill="{LINE}"/>'
+        f'<text x="{PAD_LEFT + 144}" y="{HEIGHT - 5}" fill="{AXIS_TEXT}">Avg Quality ({line_unit})</text>'
+    )
+    body = (_y_axis(top) + _y_axis(line_max, side="right") + _bars(labels, bars, top, bar_unit)
+            + polyline + "".join(dots) + _x_labels(labels) + legend)
+    return _frame(body, title)
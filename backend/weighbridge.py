@@ -0,0 +1,532 @@
+import asyncio
+import ipaddress
+import os
+import random
+import sys
+import threading
+import time
+from collections import deque, namedtuple
+from datetime import datetime
+
+from psycopg2.extras import RealDictCursor, execute_values
+
+from .database import get_connection, save_entries
+
+
+# Indicator line protocol, one reading per line:
+#   <scale>,<ST|US>,<GS|TR>,<weight kg>[,<vehicle>]     e.g. "WB1,ST,GS,12450.5,KBX 123A"
+# ST/US = stable/unstable flag from the indicator, GS/TR = gross or tare weighing.
+# The vehicle tag (RFID/ANPR) is optional; untagged tares pair with the oldest gross on that scale.
+LISTEN_PORT = int(os.getenv('WEIGHBRIDGE_PORT', '9100'))
+# Loopback by default; set WEIGHBRIDGE_HOST to the interface facing the indicators
+LISTEN_HOST = os.getenv('WEIGHBRIDGE_HOST', '127.0.0.1')
+# Comma-separated IPs/CIDRs allowed to send readings; empty = loopback only
+ALLOWED_PEERS = os.getenv('WEIGHBRIDGE_ALLOWED_PEERS', '')
+
+RING_SIZE = 8192            # readings held between the socket and the processor
+STABLE_READINGS = 5         # consecutive stable readings ...
+STABLE_TOLERANCE_KG = 20    # ... within this spread make one weighing
+MIN_LOAD_KG = 500           # below this the deck counts as empty (re-arms capture)
+MIN_NET_KG = 50             # a tare must be at least this much lighter than its gross
+PAIR_WINDOW = 6 * 3600      # seconds a gross waits for its tare
+FLUSH_ROWS = 50             # micro-batch size ...
+FLUSH_SECONDS = 0.5         # ... or age that triggers a write
+MAX_UNWRITTEN = 5000        # drafts kept in memory while the database is unreachable
+WRITE_TIMEOUT = 5           # seconds a draft write may spend connecting, and again executing
+MAX_RETRY_SECONDS = 30      # longest wait between writes while the database is failing
+
+Reading = namedtuple("Reading", "scale stable mode weight vehicle at")
+
+
+def parse_peers(text):
+    """ip_network list from 'a.b.c.d, e.f.g.h/24, ...'; raises ValueError on a bad entry"""
+    return [ipaddress.ip_network(item.strip(), strict=False) for item in text.split(",") if item.strip()]
+
+
+def peer_allowed(address, networks):
+    try:
+        ip = ipaddress.ip_address(address)
+    except ValueError:
+        return False
+    if getattr(ip, "ipv4_mapped", None):
+        ip = ip.ipv4_mapped
+    if not networks:
+        return ip.is_loopback
+    return any(ip in network for network in networks)
+
+
+def parse_reading(line, at=None):
+    """Reading for one protocol line, or None if it is malformed"""
+    parts = [p.strip() for p in line.split(",")]
+    if len(parts) not in (4, 5) or not parts[0]:
+        return None
+    status, mode = parts[1].upper(), parts[2].upper()
+    if status not in ("ST", "US") or mode not in ("GS", "TR"):
+        return None
+    try:
+        value = parts[3].lower()
+        weight = float(value[:-2] if value.endswith("kg") else value)
+    except ValueError:
+        return None
+    vehicle = parts[4].upper() if len(parts) == 5 and parts[4] else None
+    return Reading(parts[0].upper(), status == "ST", mode, weight, vehicle, time.time() if at is None else at)
+
+
+class RingBuffer:
+    """Bounded FIFO between threads; when full the oldest readings are overwritten and counted"""
+
+    def __init__(self, capacity=RING_SIZE):
+        self._items = deque(maxlen=capacity)
+        self._cond = threading.Condition()
+        self.pushed = 0
+        self.overruns = 0
+
+    def push_many(self, items):
+        with self._cond:
+            free = self._items.maxlen - len(self._items)
+            self.overruns += max(0, len(items) - free)
+            self._items.extend(items)
+            self.pushed += len(items)
+            self._cond.notify()
+
+    def pop_many(self, limit, timeout):
+        with self._cond:
+            if not self._items:
+                self._cond.wait(timeout)
+            count = min(limit, len(self._items))
+            return [self._items.popleft() for _ in range(count)]
+
+    def __len__(self):
+        return len(self._items)
+
+
+class StabilityDetector:
+    """Turns one scale's reading stream into weighings: one per load on the deck"""
+
+    def __init__(self):
+        self._window = deque(maxlen=STABLE_READINGS)
+        self._armed = True
+
+    def feed(self, reading):
+        if reading.weight < MIN_LOAD_KG:
+            # Deck empty: the next load may be captured
+            self._window.clear()
+            self._armed = True
+            return None
+        if not reading.stable:
+            self._window.clear()
+            return None
+        self._window.append(reading)
+        if not self._armed or len(self._window) < STABLE_READINGS:
+            return None
+        weights = [r.weight for r in self._window]
+        if max(weights) - min(weights) > STABLE_TOLERANCE_KG:
+            return None
+        self._armed = False
+        vehicle = next((r.vehicle for r in reversed(self._window) if r.vehicle), None)
+        return reading._replace(weight=round(sum(weights) / len(weights), 1), vehicle=vehicle,
+                                at=self._window[0].at)
+
+
+class Pairer:
+    """Matches tare weighings to earlier gross weighings of the same vehicle (or, untagged, scale)"""
+
+    def __init__(self):
+        self._pending = deque()     # gross weighings, oldest first
+        self.unpaired_gross = 0
+        self.unmatched_tare = 0
+
+    def _expire(self, now):
+        while self._pending and now - self._pending[0].at > PAIR_WINDOW:
+            self._pending.popleft()
+            self.unpaired_gross += 1
+
+    def add(self, weighing):
+        """Draft entry dict when `weighing` completes a gross/tare pair, else None"""
+        self._expire(weighing.at)
+        if weighing.mode == "GS":
+            self._pending.append(weighing)
+            return None
+
+        if weighing.vehicle:
+            candidates = [g for g in self._pending if g.vehicle == weighing.vehicle]
+        else:
+            candidates = [g for g in self._pending if g.scale == weighing.scale and not g.vehicle]
+        gross = next((g for g in candidates if g.weight - weighing.weight >= MIN_NET_KG), None)
+        if gross is None:
+            self.unmatched_tare += 1
+            return None
+        self._pending.remove(gross)
+        return {
+            "scale": gross.scale,
+            "vehicle": weighing.vehicle or gross.vehicle,
+            "gross_kg": gross.weight,
+            "tare_kg": weighing.weight,
+            "net_kg": round(gross.weight - weighing.weight, 1),
+            "gross_at": datetime.fromtimestamp(gross.at),
+            "tare_at": datetime.fromtimestamp(weighing.at),
+        }
+
+    def __len__(self):
+        return len(self._pending)
+
+
+def save_drafts(drafts):
+    """Insert a micro-batch of drafts in one statement and transaction"""
+    # Bounded so an unreachable or locked database fails the batch instead of hanging the writer
+    conn = get_connection(connect_timeout=WRITE_TIMEOUT,
+                          options=f"-c statement_timeout={WRITE_TIMEOUT * 1000}")
+    cursor = conn.cursor()
+
+    try:
+        execute_values(cursor, """
+            INSERT INTO weighbridge_drafts (scale, vehicle, gross_kg, tare_kg, net_kg, gross_at, tare_at)
+            VALUES %s
+        """, [(d["scale"], d["vehicle"], d["gross_kg"], d["tare_kg"], d["net_kg"], d["gross_at"], d["tare_at"])
+              for d in drafts])
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+        conn.close()
+
+
+class WeighbridgeService:
+    """
+    TCP listener (asyncio, own thread) -> ring buffer -> processor thread that
+    detects stable weights and pairs gross/tare -> writer thread that saves the
+    drafts in micro-batches. A slow or unreachable database only stalls the
+    writer, never the processor. No thread touches the API's event loop.
+    """
+
+    def __init__(self, host=LISTEN_HOST, port=LISTEN_PORT, allowed_peers=ALLOWED_PEERS):
+        self.host = host
+        self.port = port
+        self.allowed = parse_peers(allowed_peers)
+        self._threads = {}
+        self.last_error = None
+        self.ring = RingBuffer()
+        self.pairer = Pairer()
+        self._detectors = {}
+        self._unwritten = deque()     # drafts waiting for the writer, oldest first
+        self._pending = threading.Condition()
+        self._ready = threading.Event()
+        self._error = None
+        self.stats = {"connections": 0, "rejected_peers": 0, "readings": 0, "malformed": 0, "weighings": 0,
+                      "drafts_written": 0, "drafts_dropped": 0, "flushes": 0, "write_errors": 0,
+                      "processor_errors": 0}
+
+    async def _handle(self, reader, writer):
+        peer = writer.get_extra_info("peername")
+        if not peer or not peer_allowed(peer[0], self.allowed):
+            self.stats["rejected_peers"] += 1
+            print(f"❌ Weighbridge connection from {peer[0] if peer else 'unknown'} rejected (not in WEIGHBRIDGE_ALLOWED_PEERS)")
+            writer.close()
+            return
+        self.stats["connections"] += 1
+        buffer = b""
+        try:
+            while True:
+                chunk = await reader.read(65536)
+                if not chunk:
+                    break
+                *lines, buffer = (buffer + chunk).split(b"\n")
+                now = time.time()
+                readings = []
+                for raw in lines:
+                    reading = parse_reading(raw.decode("ascii", "replace"), now)
+                    if reading is None:
+                        if raw.strip():
+                            self.stats["malformed"] += 1
+                        continue
+                    readings.append(reading)
+                if readings:
+                    self.stats["readings"] += len(readings)
+                    self.ring.push_many(readings)
+                if len(buffer) > 1024:
+                    # No newline in sight: not our protocol
+                    self.stats["malformed"] += 1
+                    buffer = b""
+        finally:
+            writer.close()
+
+    def _serve_forever(self):
+        async def main():
+            server = await asyncio.start_server(self._handle, self.host, self.port)
+            self._ready.set()
+            async with server:
+                await server.serve_forever()
+        try:
+            asyncio.run(main())
+        except OSError as e:
+            self._error = e
+            self._ready.set()
+
+    def _queue_draft(self, draft):
+        with self._pending:
+            if len(self._unwritten) >= MAX_UNWRITTEN:
+                # Bounded so an outage cannot exhaust memory: the oldest draft goes
+                self._unwritten.popleft()
+                self.stats["drafts_dropped"] += 1
+            self._unwritten.append(draft)
+            if len(self._unwritten) >= FLUSH_ROWS:
+                self._pending.notify()
+
+    def _take_batch(self):
+        with self._pending:
+            if len(self._unwritten) < FLUSH_ROWS:
+                self._pending.wait(FLUSH_SECONDS)
+            batch = list(self._unwritten)
+            self._unwritten.clear()
+            return batch
+
+    def _requeue(self, batch):
+        """Put a failed batch back ahead of newer drafts, dropping its oldest if over MAX_UNWRITTEN"""
+        with self._pending:
+            room = max(0, MAX_UNWRITTEN - len(self._unwritten))
+            keep = batch[len(batch) - room:] if room < len(batch) else batch
+            self.stats["drafts_dropped"] += len(batch) - len(keep)
+            self._unwritten.extendleft(reversed(keep))
+
+    def _flush(self):
+        """Write one micro-batch; False if it failed and was kept for the next attempt"""
+        batch = self._take_batch()
+        if not batch:
+            return True
+        try:
+            save_drafts(batch)
+        except Exception as e:
+            print(f"❌ Failed to write {len(batch)} weighbridge drafts: {e}")
+            self.stats["write_errors"] += 1
+            self._requeue(batch)
+            return False
+        self.stats["drafts_written"] += len(batch)
+        self.stats["flushes"] += 1
+        return True
+
+    def _write_forever(self):
+        delay = FLUSH_SECONDS
+        while True:
+            try:
+                if self._flush():
+                    delay = FLUSH_SECONDS
+                    continue
+            except Exception as e:
+                print(f"❌ Weighbridge writer: {e}")
+            # Back off while the database is failing; drafts keep queueing meanwhile
+            time.sleep(delay)
+            delay = min(delay * 2, MAX_RETRY_SECONDS)
+
+    def _process(self, reading):
+        detector = self._detectors.setdefault(reading.scale, StabilityDetector())
+        weighing = detector.feed(reading)
+        if weighing is None:
+            return
+        self.stats["weighings"] += 1
+        draft = self.pairer.add(weighing)
+        if draft:
+            self._queue_draft(draft)
+
+    def _processor_error(self, what, error):
+        self.stats["processor_errors"] += 1
+        self.last_error = {"at": datetime.now().isoformat(timespec="seconds"), "error": f"{what}: {error}"}
+        print(f"❌ Weighbridge processor: {what}: {error}")
+
+    def _process_forever(self):
+        # Nothing may escape this loop: a dead processor would leave the ring to overflow
+        while True:
+            try:
+                for reading in self.ring.pop_many(1000, FLUSH_SECONDS):
+                    try:
+                        self._process(reading)
+                    except Exception as e:
+                        self._processor_error(f"reading {reading!r}", e)
+            except Exception as e:
+                self._processor_error("loop", e)
+                time.sleep(FLUSH_SECONDS)
+
+    def start(self):
+        """Start the threads; raises OSError if the port cannot be bound"""
+        self._threads["listener"] = threading.Thread(target=self._serve_forever, name="weighbridge-listener", daemon=True)
+        self._threads["listener"].start()
+        self._ready.wait()
+        if self._error:
+            raise self._error
+        self._threads["processor"] = threading.Thread(target=self._process_forever, name="weighbridge-processor", daemon=True)
+        self._threads["processor"].start()
+        self._threads["writer"] = threading.Thread(target=self._write_forever, name="weighbridge-writer", daemon=True)
+        self._threads["writer"].start()
+        allowed = ", ".join(map(str, self.allowed)) or "loopback only"
+        print(f"✅ Weighbridge listener on {self.host}:{self.port} (peers: {allowed})")
+        return self
+
+    def status(self):
+        return {
+            **self.stats,
+            "host": self.host,
+            "port": self.port,
+            "listener_alive": bool(self._threads.get("listener") and self._threads["listener"].is_alive()),
+            "processor_alive": bool(self._threads.get("processor") and self._threads["processor"].is_alive()),
+            "writer_alive": bool(self._threads.get("writer") and self._threads["writer"].is_alive()),
+            "last_error": self.last_error,
+            "buffered": len(self.ring),
+            "ring_overruns": self.ring.overruns,
+            "pending_gross": len(self.pairer),
+            "unpaired_gross": self.pairer.unpaired_gross,
+            "unmatched_tare": self.pairer.unmatched_tare,
+            "unwritten": len(self._unwritten),
+        }
+
+
+_service = {"instance": None}
+
+
+def start_service():
+    """Run the service inside this process when WEIGHBRIDGE_ENABLED=1 (first worker to bind wins)"""
+    if _service["instance"] is not None or os.getenv('WEIGHBRIDGE_ENABLED') != '1':
+        return None
+    try:
+        _service["instance"] = WeighbridgeService().start()
+    except ValueError as e:
+        print(f"❌ Invalid WEIGHBRIDGE_ALLOWED_PEERS: {e}")
+    except OSError as e:
+        print(f"Weighbridge listener not started in this worker: {e}")
+    return _service["instance"]
+
+
+def service_status():
+    service = _service["instance"]
+    return service.status() if service else None
+
+
+def list_drafts(status="open", limit=100):
+    conn = get_connection()
+    cursor = conn.cursor(cursor_factory=RealDictCursor)
+
+    try:
+        cursor.execute("""
+            SELECT * FROM weighbridge_drafts WHERE status=%s
+            ORDER BY gross_at DESC LIMIT %s
+        """, (status, limit))
+        return [dict(row) for row in cursor.fetchall()]
+    finally:
+        cursor.close()
+        conn.close()
+
+
+def _set_draft_status(draft_id, status, from_status, entry_id=None):
+    conn = get_connection()
+    cursor = conn.cursor(cursor_factory=RealDictCursor)
+
+    try:
+        cursor.execute("""
+            UPDATE weighbridge_drafts SET status=%s, entry_id=COALESCE(%s, entry_id)
+            WHERE id=%s AND status=%s
+            RETURNING *
+        """, (status, entry_id, draft_id, from_status))
+        row = cursor.fetchone()
+        conn.commit()
+        return dict(row) if row else None
+    finally:
+        cursor.close()
+        conn.close()
+
+
+def confirm_draft(draft_id, details):
+    """
+    Turn an open draft into a daily entry. The scale supplies fact_wgt (net),
+    time_in (gross) and tare_time; `details` supplies the rest of the form.
+    Returns (entry_id, flags), or None if the draft is not open.
+    """
+    draft = _set_draft_status(draft_id, "confirming", "open")
+    if draft is None:
+        return None
+    entry = {
+        **details,
+        "vehicle": details.get("vehicle") or draft["vehicle"],
+        "date": draft["gross_at"].date().isoformat(),
+        "time_in": draft["gross_at"].strftime("%H:%M"),
+        "tare_time": draft["tare_at"].strftime("%H:%M"),
+        "fact_wgt": float(draft["net_kg"]),
+    }
+    try:
+        if not entry["vehicle"]:
+            raise ValueError("Vehicle is required for an untagged weighing")
+        [(entry_id, flags)] = save_entries([entry], with_ids=True)
+    except Exception:
+        _set_draft_status(draft_id, "open", "confirming")
+        raise
+    _set_draft_status(draft_id, "confirmed", "confirming", entry_id)
+    return entry_id, flags
+
+
+async def simulate(host="127.0.0.1", port=LISTEN_PORT, trucks=20, rate=300, scales=2, seed=None):
+    """
+    Drive a listener with synthetic indicator output: each truck drives on,
+    settles (gross), leaves, and comes back empty (tare). `rate` is readings
+    per second across all scales. Returns the number of gross/tare pairs sent.
+    """
+    rng = random.Random(seed)
+    _, writer = await asyncio.open_connection(host, port)
+
+    def weighing(scale, mode, weight, vehicle):
+        lines = [f"{scale},US,{mode},{rng.uniform(0, 50):.1f}" for _ in range(3)]
+        lines += [f"{scale},US,{mode},{weight * f + rng.uniform(-300, 300):.1f}" for f in (0.4, 0.8, 1.0, 1.0)]
+        lines += [f"{scale},ST,{mode},{weight + rng.uniform(-5, 5):.1f},{vehicle}" for _ in range(STABLE_READINGS + 3)]
+        lines += [f"{scale},US,{mode},{weight * f:.1f}" for f in (0.5, 0.1)]
+        return lines
+
+    plan = []
+    for i in range(trucks):
+        scale = f"WB{i % scales + 1}"
+        vehicle = f"KSIM {i:03d}"
+        tare = rng.uniform(3000, 6000)
+        gross = tare + rng.uniform(500, 8000)
+        plan.append(weighing(scale, "GS", gross, vehicle))
+        plan.append(weighing(scale, "TR", tare, vehicle))
+
+    interval = 1.0 / rate
+    sent = 0
+    started = time.monotonic()
+    for lines in plan:
+        for line in lines:
+            writer.write(f"{line}\n".encode("ascii"))
+            sent += 1
+            # Pace to `rate` without sleeping per line
+            ahead = sent * interval - (time.monotonic() - started)
+            if ahead > 0.01:
+                await writer.drain()
+                await asyncio.sleep(ahead)
+    await writer.drain()
+    writer.close()
+    await writer.wait_closed()
+    elapsed = time.monotonic() - started
+    print(f"Sent {sent} readings for {trucks} trucks in {elapsed:.2f}s ({sent / elapsed:.0f}/s)")
+    return trucks
+
+
+if __name__ == "__main__":
+    # python -m backend.weighbridge serve [PORT]
+    # python -m backend.weighbridge simulate [HOST] [PORT] [TRUCKS] [RATE]
+    command = sys.argv[1] if len(sys.argv) > 1 else None
+    if command == "serve":
+        service = WeighbridgeService(port=int(sys.argv[2]) if len(sys.argv) > 2 else LISTEN_PORT).start()
+        try:
+            while True:
+                time.sleep(60)
+                print(service.status())
+        except KeyboardInterrupt:
+            pass
+    elif command == "simulate":
+        args = sys.argv[2:]
+        asyncio.run(simulate(
+            host=args[0] if len(args) > 0 else "127.0.0.1",
+            port=int(args[1]) if len(args) > 1 else LISTEN_PORT,
+            trucks=int(args[2]) if len(args) > 2 else 20,
+            rate=int(args[3]) if len(args) > 3 else 300,
+        ))
+    else:
+        print("Usage: python -m backend.weighbridge serve [PORT] | simulate [HOST] [PORT] [TRUCKS] [RATE]")
+        sys.exit(1)
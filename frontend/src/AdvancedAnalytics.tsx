@@ -23,7 +23,7 @@ interface AdvancedAnalyticsProps {
     vehicleUtilization: Array<{ name: string; totalWeight: number; routesCovered: number; trips: number; utilization: number }>;
     heatmapData: Array<{ date: string; value: number; day: number; week: number }>;
     comparativeAnalysis: Array<any>;
-    predictiveTrends: Array<{ date: string; weight: number | null; movingAvg: number | null; forecast?: number }>;
+    predictiveTrends: Array<{ date: string; weight: number | null; movingAvg: number | null; forecast?: number; band?: [number, number] }>;
 }
 
 const AdvancedAnalytics: React.FC<AdvancedAnalyticsProps> = ({
@@ -162,10 +162,6 @@ const AdvancedAnalytics: React.FC<AdvancedAnalyticsProps> = ({
                                     <stop offset="5%" stopColor="#22c55e" stopOpacity={0.3} />
                                     <stop offset="95%" stopColor="#22c55e" stopOpacity={0} />
                                 </linearGradient>
-                                <linearGradient id="colorForecast" x1="0" y1="0" x2="0" y2="1">
-                                    <stop offset="5%" stopColor="#f59e0b" stopOpacity={0.2} />
-                                    <stop offset="95%" stopColor="#f59e0b" stopOpacity={0} />
-                                </linearGradient>
                             </defs>
                             <CartesianGrid strokeDasharray="3 3" stroke="#ffffff05" />
                             <XAxis dataKey="date" stroke="#475569" fontSize={10} />
@@ -174,7 +170,8 @@ const AdvancedAnalytics: React.FC<AdvancedAnalyticsProps> = ({
                             <Legend />
                             <Area type="monotone" dataKey="weight" stroke="#22c55e" fill="url(#colorActual)" name="Actual" />
                             <Area type="monotone" dataKey="movingAvg" stroke="#3b82f6" fill="none" strokeWidth={2} name="7-Day MA" />
-                            <Area type="monotone" dataKey="forecast" stroke="#f59e0b" fill="url(#colorForecast)" strokeDasharray="5 5" name="Forecast" />
+                            <Area type="monotone" dataKey="band" stroke="none" fill="#f59e0b" fillOpacity={0.15} name="Forecast range" />
+                            <Area type="monotone" dataKey="forecast" stroke="#f59e0b" fill="none" strokeDasharray="5 5" strokeWidth={2} name="Forecast" />
                         </AreaChart>
                     </ResponsiveContainer>
                 </div>
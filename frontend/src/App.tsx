@@ -1,4 +1,4 @@
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, useRef } from 'react';
 import axios from 'axios';
 import {
     BarChart3,
@@ -58,6 +58,16 @@ interface Entry {
     quality_pct: number;
 }
 
+interface ReportRecord {
+    id: number;
+    report_date: string;
+    period: string;
+    format: string;
+    filename: string;
+    size_bytes: number;
+    created_at: string;
+}
+
 const ZONES = [
     "ZONE 1 NORAH",
     "ZONE 2",
@@ -94,21 +104,76 @@ function App() {
         quality_pct: 0
     }]);
     const [history, setHistory] = useState<Entry[]>([]);
-    const [reportFiles, setReportFiles] = useState<string[]>([]);
+    const [reportFiles, setReportFiles] = useState<ReportRecord[]>([]);
     const [metadata, setMetadata] = useState<{ zones: string[], routes: string[], vehicles: string[] }>({
         zones: ZONES,
         routes: [],
         vehicles: []
     });
+    const [forecast, setForecast] = useState<{
+        history: Array<{ date: string; weight: number; movingAvg: number }>;
+        forecast: Array<{ date: string; weight: null; movingAvg: null; forecast: number; lower: number; upper: number }>;
+    } | null>(null);
     const [loading, setLoading] = useState(false);
     const [message, setMessage] = useState<{ type: 'success' | 'error', text: string } | null>(null);
 
+    const liveConnected = useRef(false);
+
     useEffect(() => {
         fetchHistory();
         fetchMetadata();
         fetchReports();
+        fetchForecast();
+    }, []);
+
+    // Live feed: patch history/metadata from other clients' saves instead of refetching
+    useEffect(() => {
+        const source = new EventSource('/api/live');
+        source.onopen = () => {
+            // Anything saved while we were disconnected was missed
+            if (!liveConnected.current) {
+                fetchHistory();
+                fetchMetadata();
+            }
+            liveConnected.current = true;
+        };
+        source.onerror = () => {
+            liveConnected.current = false;
+        };
+        source.addEventListener('entry', (e: MessageEvent) => {
+            const event: { op: 'insert' | 'update', entry: Entry, partial?: boolean } = JSON.parse(e.data);
+            if (event.partial) {
+                fetchHistory();
+                return;
+            }
+            applyLiveEntry(event.entry);
+        });
+        source.addEventListener('resync', () => {
+            fetchHistory();
+            fetchMetadata();
+        });
+        return () => source.close();
     }, []);
 
+    const applyLiveEntry = (row: Entry) => {
+        setHistory(prev => {
+            const index = prev.findIndex(h => h.id === row.id);
+            if (index === -1) return [row, ...prev];
+            const next = [...prev];
+            next[index] = row;
+            return next;
+        });
+        setMetadata(prev => {
+            const add = (list: string[], value?: string) =>
+                value && !list.includes(value) ? [...list, value].sort() : list;
+            return {
+                zones: add(prev.zones, row.zone),
+                routes: add(prev.routes, row.route),
+                vehicles: add(prev.vehicles, row.vehicle)
+            };
+        });
+    };
+
     // Load existing entries when date changes
     useEffect(() => {
         const currentDate = entries[0].date;
@@ -150,6 +215,15 @@ function App() {
         }
     };
 
+    const fetchForecast = async () => {
+        try {
+            const res = await axios.get('/api/forecast?scope=all&horizon=7');
+            setForecast(res.data);
+        } catch (err) {
+            console.error("Failed to fetch forecast", err);
+        }
+    };
+
     const fetchMetadata = async () => {
         try {
             const res = await axios.get('/api/metadata');
@@ -165,13 +239,27 @@ function App() {
 
     const fetchReports = async () => {
         try {
-            const res = await axios.get('/api/reports');
-            setReportFiles(res.data);
+            const res = await axios.get('/api/reports?format=pdf&limit=100');
+            setReportFiles(res.data.items);
         } catch (err) {
             console.error("Failed to fetch reports", err);
         }
     };
 
+    const openReport = async (date: string, format: 'pdf' | 'html') => {
+        try {
+            const res = await axios.get(`/api/reports?start=${date}&end=${date}&format=${format}&period=daily&limit=1`);
+            const report: ReportRecord | undefined = res.data.items[0];
+            if (report) {
+                window.open(`http://localhost:8000/api/reports/${report.id}/file`, '_blank');
+            } else {
+                setMessage({ type: 'error', text: `No ${format.toUpperCase()} report generated for ${date} yet` });
+            }
+        } catch (err) {
+            console.error("Failed to look up report", err);
+        }
+    };
+
     const addRow = () => {
         setEntries([...entries, {
             ...entries[entries.length - 1],
@@ -262,15 +350,25 @@ function App() {
                 setEditingId(null);
             } else {
                 const reportDate = entries[0].date;
-                await axios.post('/api/submit', {
+                const res = await axios.post('/api/submit', {
                     date: reportDate,
                     entries: entries
                 });
-                setMessage({ type: 'success', text: `Data saved successfully for ${reportDate}!` });
+                const flagged = res.data.flags?.length || 0;
+                setMessage({
+                    type: 'success',
+                    text: flagged
+                        ? `Data saved for ${reportDate}. ${flagged} row(s) flagged as unusual for their route/vehicle - please double-check.`
+                        : `Data saved successfully for ${reportDate}!`
+                });
+            }
+            // History and metadata arrive over the live feed when it is connected
+            if (!liveConnected.current) {
+                fetchHistory();
+                fetchMetadata();
             }
-            fetchHistory();
-            fetchMetadata();
             fetchReports();
+            fetchForecast();
             fetchEntriesForDate(entries[0].date);
         } catch (err: any) {
             setMessage({ type: 'error', text: err.response?.data?.detail || "Failed to submit report" });
@@ -467,43 +565,15 @@ function App() {
         });
     }, [history]);
 
-    // 6. Predictive Trends (7-day moving average)
+    // 6. Predictive Trends (server-side day-of-week forecast)
     const predictiveTrends = React.useMemo(() => {
-        const daily: Record<string, number> = {};
-        history.forEach(e => {
-            daily[e.date] = (daily[e.date] || 0) + e.fact_wgt;
-        });
-
-        const sorted = Object.entries(daily)
-            .map(([date, weight]) => ({ date, weight }))
-            .sort((a, b) => a.date.localeCompare(b.date));
-
-        // Calculate 7-day moving average
-        const withMA = sorted.map((item, idx) => {
-            const window = sorted.slice(Math.max(0, idx - 6), idx + 1);
-            const ma = window.reduce((sum, d) => sum + d.weight, 0) / window.length;
-            return { ...item, movingAvg: ma };
-        });
-
-        // Add forecast (simple projection)
-        const lastMA = withMA[withMA.length - 1]?.movingAvg || 0;
-        const trend = withMA.length > 1 ?
-            (withMA[withMA.length - 1].movingAvg - withMA[withMA.length - 7]?.movingAvg || 0) / 7 : 0;
-
-        const forecast = [];
-        for (let i = 1; i <= 7; i++) {
-            const lastDate = new Date(withMA[withMA.length - 1]?.date || new Date());
-            lastDate.setDate(lastDate.getDate() + i);
-            forecast.push({
-                date: lastDate.toISOString().split('T')[0],
-                weight: null,
-                movingAvg: null,
-                forecast: lastMA + (trend * i)
-            });
-        }
-
-        return [...withMA.slice(-30), ...forecast];
-    }, [history]);
+        if (!forecast) return [];
+        // [lower, upper] pairs drive the uncertainty band (a range Area)
+        return [
+            ...forecast.history,
+            ...forecast.forecast.map(f => ({ ...f, band: [f.lower, f.upper] as [number, number] }))
+        ];
+    }, [forecast]);
 
     // Filter state for interactivity
     const [analysisFilters, setAnalysisFilters] = React.useState({
@@ -583,7 +653,7 @@ function App() {
                                         <Eye className="w-4 h-4" /> Preview HTML
                                     </button>
                                     <button
-                                        onClick={() => window.open(`http://localhost:8000/api/reports/Report_${entries[0].date.replace(/-/g, '')}.pdf`, '_blank')}
+                                        onClick={() => openReport(entries[0].date, 'pdf')}
                                         className="flex items-center gap-2 bg-slate-800 hover:bg-slate-700 text-white px-4 py-2 rounded-lg text-sm transition-all"
                                     >
                                         <FileSpreadsheet className="w-4 h-4" /> Preview PDF
@@ -862,16 +932,16 @@ function App() {
                     <div className="space-y-6">
                         <h2 className="text-xl font-bold text-white">Generated Reports Gallery</h2>
                         <div className="grid grid-cols-1 sm:grid-cols-2 md:grid-cols-3 lg:grid-cols-4 gap-4">
-                            {reportFiles.map((file) => (
-                                <div key={file} className="glass group rounded-xl p-4 border border-slate-800 hover:border-primary-500/50 transition-all">
+                            {reportFiles.map((report) => (
+                                <div key={report.id} className="glass group rounded-xl p-4 border border-slate-800 hover:border-primary-500/50 transition-all">
                                     <div className="aspect-[3/4] bg-slate-900 rounded-lg mb-4 flex items-center justify-center relative overflow-hidden">
                                         <FileSpreadsheet className="w-12 h-12 text-slate-700 group-hover:text-primary-600 transition-colors" />
                                         <div className="absolute inset-0 bg-primary-600/10 opacity-0 group-hover:opacity-100 transition-opacity" />
                                     </div>
-                                    <h4 className="text-sm font-medium text-slate-300 truncate mb-1">{file}</h4>
-                                    <p className="text-[10px] text-slate-500 mb-3">{file.includes('_') ? file.split('_')[1].split('.')[0] : 'Report'}</p>
+                                    <h4 className="text-sm font-medium text-slate-300 truncate mb-1">{report.filename}</h4>
+                                    <p className="text-[10px] text-slate-500 mb-3">{report.report_date} &bull; {(report.size_bytes / 1024).toFixed(0)} KB</p>
                                     <a
-                                        href={`/api/reports/${file}`}
+                                        href={`/api/reports/${report.id}/file`}
                                         target="_blank"
                                         rel="noreferrer"
                                         className="flex items-center justify-center gap-2 w-full py-2 bg-slate-800 hover:bg-primary-600 text-white rounded-lg text-xs font-semibold transition-all"
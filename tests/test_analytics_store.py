@@ -0,0 +1,81 @@
+import json
+import os
+
+import pytest
+
+from backend import analytics_store
+
+
+class FakeCursor:
+    description = [("entries",)]
+
+    def __init__(self, queries):
+        self.queries = queries
+
+    def execute(self, sql, params=()):
+        self.queries.append(sql)
+
+    def fetchall(self):
+        return [(0,)]
+
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    def __init__(self):
+        self.queries = []
+
+    def cursor(self):
+        return FakeCursor(self.queries)
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def snapshot_dir(tmp_path, monkeypatch):
+    entries_dir = tmp_path / "entries"
+    entries_dir.mkdir()
+    monkeypatch.setattr(analytics_store, "ENGINE", "duckdb")
+    monkeypatch.setattr(analytics_store, "_STATE_PATH", str(tmp_path / "state.json"))
+    monkeypatch.setattr(analytics_store, "_PARQUET_GLOB", str(entries_dir / "*.parquet"))
+    pg = FakeConnection()
+    monkeypatch.setattr(analytics_store, "get_read_connection", lambda: pg)
+    return tmp_path, pg
+
+
+def _write_state(path, rows, months):
+    (path / "state.json").write_text(json.dumps({"watermark": "2025-01-31T00:00:00", "rows": rows, "months": months}))
+
+
+def test_empty_snapshot_falls_back_to_postgres(snapshot_dir):
+    path, pg = snapshot_dir
+    _write_state(path, 0, {})
+
+    result = analytics_store.run_query("SELECT COUNT(*) AS entries FROM entries")
+
+    assert result["source"] == "postgres"
+    assert pg.queries and pg.queries[0].startswith("WITH entries AS")
+
+
+def test_state_without_parquet_files_falls_back_to_postgres(snapshot_dir):
+    path, _ = snapshot_dir
+    _write_state(path, 10, {"2025-01": 10})
+
+    assert analytics_store.run_query("SELECT COUNT(*) AS entries FROM entries")["source"] == "postgres"
+
+
+def test_snapshot_with_files_is_answered_by_duckdb(snapshot_dir):
+    duckdb = pytest.importorskip("duckdb")
+    path, pg = snapshot_dir
+    _write_state(path, 2, {"2025-01": 2})
+    target = os.path.join(path, "entries", "2025-01.parquet").replace("'", "''")
+    duckdb.connect().execute(
+        f"COPY (SELECT * FROM (VALUES ('A', 10.0), ('B', 5.0)) t(zone, fact_wgt)) TO '{target}' (FORMAT parquet)"
+    )
+
+    result = analytics_store.run_query("SELECT SUM(fact_wgt) AS total FROM entries WHERE fact_wgt > %s", (1,))
+
+    assert result == {"rows": [{"total": 15.0}], "source": "duckdb", "as_of": "2025-01-31T00:00:00"}
+    assert pg.queries == []
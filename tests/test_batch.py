@@ -0,0 +1,76 @@
+import time
+
+import pytest
+
+from backend import batch
+
+
+@pytest.fixture(autouse=True)
+def jobs(monkeypatch):
+    monkeypatch.setattr(batch, "_jobs", {})
+    return batch._jobs
+
+
+def _wait(job_id):
+    for _ in range(200):
+        job = batch.get_job(job_id)
+        if job["status"] != "running":
+            return job
+        time.sleep(0.01)
+    raise AssertionError("job did not finish")
+
+
+def test_failed_job_records_error(monkeypatch):
+    def fail(*args):
+        raise RuntimeError("database is down")
+
+    monkeypatch.setattr(batch, "regenerate_reports", fail)
+    job = _wait(batch.start_regeneration_job("2025-01-01", "2025-01-02")["id"])
+    assert job["status"] == "failed"
+    assert job["error"] == "database is down"
+    assert not any(key.startswith("_") for key in job)
+
+
+def test_finished_jobs_are_pruned_by_age_and_count(monkeypatch, jobs):
+    now = time.monotonic()
+    jobs.update({
+        "running": {"status": "running", "results": []},
+        "old": {"status": "completed", "results": [], "_finished": now - 7200},
+        **{f"recent{i}": {"status": "completed", "results": [], "_finished": now - i} for i in range(5)},
+    })
+    monkeypatch.setattr(batch, "MAX_JOBS", 4)
+
+    assert batch.get_job("old") is None
+    assert set(jobs) == {"running", "recent0", "recent1", "recent2"}
+
+
+def test_pool_uses_spawn_context(monkeypatch):
+    from concurrent.futures import Future
+
+    seen = {}
+
+    class Pool:
+        def __init__(self, max_workers, mp_context):
+            seen["method"] = mp_context.get_start_method()
+
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *exc):
+            return False
+
+        def submit(self, fn, *args):
+            future = Future()
+            future.set_result({"date": args[0], "file": "x.pdf"})
+            return future
+
+    class Entry:
+        date = "2025-01-01"
+
+    monkeypatch.setattr(batch, "ProcessPoolExecutor", Pool)
+    monkeypatch.setattr(batch, "get_entries_between", lambda start, end: [Entry()])
+    monkeypatch.setattr(batch, "get_zone_daily_totals", lambda end: [])
+    monkeypatch.setattr(batch, "summary_windows", lambda sums, dates: {d: None for d in dates})
+
+    assert batch.regenerate_reports("2025-01-01", "2025-01-01") == [{"date": "2025-01-01", "file": "x.pdf"}]
+    assert seen["method"] == "spawn"
@@ -0,0 +1,184 @@
+import random
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from backend import database
+from backend.anomalies import welford_add, welford_remove
+
+
+def test_welford_add_and_remove_match_batch_statistics():
+    random.seed(7)
+    values = [random.uniform(-20, 20) for _ in range(200)]
+    n, mean, m2 = 0, 0.0, 0.0
+    for x in values:
+        n, mean, m2 = welford_add(n, mean, m2, x)
+    assert n == len(values)
+    assert mean == pytest.approx(np.mean(values))
+    assert m2 / (n - 1) == pytest.approx(np.var(values, ddof=1))
+
+    # Removing (as an edit does) leaves the stats of the remaining values
+    for x in values[:50]:
+        n, mean, m2 = welford_remove(n, mean, m2, x)
+    assert mean == pytest.approx(np.mean(values[50:]))
+    assert m2 / (n - 1) == pytest.approx(np.var(values[50:], ddof=1))
+    assert welford_remove(1, 5.0, 0.0, 5.0) == (0, 0.0, 0.0)
+
+
+class StatsDB:
+    """entry_stats rows with per-row locks taken by SELECT ... FOR UPDATE and released on commit"""
+
+    def __init__(self):
+        self.rows = {}
+        self.locks = {}
+        self.meta = threading.Lock()
+        self.deadlocked = False
+
+
+class StatsCursor:
+    def __init__(self, db):
+        self.db = db
+        self.held = []
+        self.result = None
+
+    def execute(self, sql, params):
+        sql = " ".join(sql.split())
+        assert sql.startswith("SELECT scope, scope_id, metric, n, mean, m2 FROM entry_stats"), sql
+        assert "ORDER BY scope, scope_id, metric FOR UPDATE" in sql
+        self.result = []
+        # Postgres locks the rows in the order they come out of the sort
+        for key in sorted(params[0]):
+            lock = self.db.locks[key]
+            if lock not in self.held:
+                if not lock.acquire(timeout=2):
+                    self.db.deadlocked = True
+                    raise RuntimeError("deadlock")
+                self.held.append(lock)
+                time.sleep(0.01)  # widen the window for a conflicting lock order
+            self.result.append((*key, *self.db.rows[key]))
+
+    def execute_values(self, sql, rows):
+        sql = " ".join(sql.split())
+        if sql.startswith("INSERT INTO entry_stats") and "DO NOTHING" in sql:
+            with self.db.meta:
+                for scope, scope_id, metric, *state in rows:
+                    self.db.rows.setdefault((scope, scope_id, metric), tuple(state))
+                    self.db.locks.setdefault((scope, scope_id, metric), threading.Lock())
+        elif sql.startswith("UPDATE entry_stats"):
+            for scope, scope_id, metric, *state in rows:
+                assert self.db.locks[(scope, scope_id, metric)] in self.held
+                self.db.rows[(scope, scope_id, metric)] = tuple(state)
+        else:
+            raise AssertionError(sql)
+
+    def fetchall(self):
+        return self.result
+
+    def commit(self):
+        for lock in self.held:
+            lock.release()
+        self.held = []
+
+
+@pytest.fixture
+def db(monkeypatch):
+    monkeypatch.setattr(database, "execute_values", lambda cursor, sql, rows: cursor.execute_values(sql, rows))
+    return StatsDB()
+
+
+def _write(db, changes):
+    cursor = StatsCursor(db)
+    try:
+        return database._apply_entry_stats(cursor, changes)
+    finally:
+        cursor.commit()
+
+
+def _run_concurrently(*targets):
+    threads = [threading.Thread(target=t) for t in targets]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+
+ENTRIES = [
+    {"fld_wgt": 100, "fact_wgt": 90, "quality_pct": 80, "scorch_kg": 1},
+    {"fld_wgt": 100, "fact_wgt": 110, "quality_pct": 70, "scorch_kg": 3},
+]
+
+
+def test_concurrent_first_writers_for_a_new_route_both_count(db):
+    _run_concurrently(*(lambda e=e: _write(db, [(1, None, e, False)]) for e in ENTRIES))
+
+    n, mean, m2 = db.rows[("route", 1, "quality_pct")]
+    assert n == 2
+    assert mean == pytest.approx(75)
+    assert m2 == pytest.approx(50)
+    assert db.rows[("route", 1, "var_pct")][1] == pytest.approx(0)
+
+
+def test_batches_touching_the_same_rows_in_opposite_orders_do_not_deadlock(db):
+    forward = [(1, 10, ENTRIES[0], False), (2, 20, ENTRIES[1], False)]
+    backward = [(2, 20, ENTRIES[0], False), (1, 10, ENTRIES[1], False)]
+    _run_concurrently(lambda: _write(db, forward), lambda: _write(db, backward))
+
+    assert not db.deadlocked
+    for key in [("route", 1, "quality_pct"), ("route", 2, "quality_pct"),
+                ("vehicle", 10, "quality_pct"), ("vehicle", 20, "quality_pct")]:
+        assert db.rows[key][0] == 2
+        assert db.rows[key][1] == pytest.approx(75)
+
+
+def test_later_rows_see_earlier_ones_and_edits_move_the_sample(db):
+    # Five identical rows then an outlier, in one batch: only the outlier is flagged
+    steady = {"fld_wgt": 100, "fact_wgt": 100, "quality_pct": 80, "scorch_kg": 1}
+    rows = [dict(steady, quality_pct=80 + (i % 2)) for i in range(6)] + [dict(steady, quality_pct=20)]
+    flags = _write(db, [(1, None, row, False) for row in rows])
+    assert flags[:-1] == [[]] * 6
+    assert [f["metric"] for f in flags[-1]] == ["quality_pct"]
+
+    # An edit moving the outlier to route 2 takes it out of route 1
+    _write(db, [(1, None, rows[-1], True), (2, None, rows[-1], False)])
+    n, mean, _ = db.rows[("route", 1, "quality_pct")]
+    assert n == 6
+    assert mean == pytest.approx(80.5)
+    assert db.rows[("route", 2, "quality_pct")][:2] == (1, 20)
+
+
+def test_entries_without_route_or_vehicle_skip_the_stats(db):
+    assert _write(db, [(None, None, ENTRIES[0], False)]) == [[]]
+    assert db.rows == {}
+
+
+class MissingEntryConnection:
+    def __init__(self):
+        self.executed = []
+        self.rolled_back = False
+
+    def cursor(self, *args, **kwargs):
+        return self
+
+    def execute(self, sql, params=None):
+        self.executed.append(" ".join(sql.split()))
+
+    def fetchone(self):
+        return None
+
+    def rollback(self):
+        self.rolled_back = True
+
+    def close(self):
+        pass
+
+
+def test_update_of_a_missing_entry_changes_nothing(monkeypatch):
+    conn = MissingEntryConnection()
+    monkeypatch.setattr(database, "get_connection", lambda: conn)
+    monkeypatch.setattr(database, "_apply_entry_stats", lambda *a: pytest.fail("stats touched"))
+
+    assert database.update_entry(42, dict(ENTRIES[0], zone="Z", clerk="C", vehicle="V", route="R")) is None
+    assert len(conn.executed) == 1 and "FOR UPDATE" in conn.executed[0]
+    assert conn.rolled_back
@@ -0,0 +1,95 @@
+import threading
+import time
+from datetime import date, timedelta
+
+import pytest
+
+from backend import forecasting
+from backend.query_cache import DateCache
+
+
+@pytest.fixture
+def totals(monkeypatch):
+    """Fake get_daily_totals: 100 kg every day; records each call"""
+    calls = []
+
+    def get_daily_totals(zone=None, route=None, start_date=None, end_date=None):
+        calls.append((zone, route, start_date, end_date))
+        days = (end_date - start_date).days + 1
+        return [(start_date + timedelta(days=i), 100.0) for i in range(days)]
+
+    monkeypatch.setattr(forecasting, "get_daily_totals", get_daily_totals)
+    monkeypatch.setattr(forecasting, "_series_cache", forecasting.OrderedDict())
+    monkeypatch.setattr(forecasting, "_forecast_cache", DateCache(maxsize=4, ttl=60))
+    return calls
+
+
+def test_forecast_is_cached_per_scope_and_as_of(totals):
+    first = forecasting.get_forecast("zone:a", 7)
+    second = forecasting.get_forecast("ZONE:A", 3)
+    assert len(totals) == 1
+    assert first["forecast"][0]["forecast"] == pytest.approx(100.0)
+    assert len(second["forecast"]) == 3
+
+
+@pytest.mark.parametrize("as_of", [
+    (date.today() + timedelta(days=1)).isoformat(),
+    (date.today() - timedelta(days=forecasting.MAX_AS_OF_AGE + 1)).isoformat(),
+    "not-a-date",
+])
+def test_as_of_outside_the_accepted_range_is_rejected(totals, as_of):
+    with pytest.raises(ValueError):
+        forecasting.get_forecast("all", 7, as_of)
+    assert totals == []
+
+
+def test_caches_are_bounded(totals, monkeypatch):
+    monkeypatch.setattr(forecasting, "SERIES_CACHE_SIZE", 3)
+    for i in range(10):
+        forecasting.get_forecast(f"route:r{i}", 1)
+    assert len(forecasting._series_cache) == 3
+    assert forecasting._forecast_cache.stats()["size"] == 4
+
+
+def test_slow_scope_does_not_block_other_scopes(totals, monkeypatch):
+    release = threading.Event()
+    fast = forecasting.get_daily_totals
+
+    def get_daily_totals(zone=None, route=None, start_date=None, end_date=None):
+        if zone == "SLOW":
+            release.wait(5)
+        return fast(zone, route, start_date, end_date)
+
+    monkeypatch.setattr(forecasting, "get_daily_totals", get_daily_totals)
+    slow = threading.Thread(target=forecasting.get_forecast, args=("zone:slow",))
+    slow.start()
+    time.sleep(0.05)
+    started = time.perf_counter()
+    forecasting.get_forecast("zone:fast")
+    assert time.perf_counter() - started < 1
+    release.set()
+    slow.join()
+
+
+def test_invalidation_during_compute_is_not_cached(totals, monkeypatch):
+    fast = forecasting.get_daily_totals
+
+    def get_daily_totals(**kwargs):
+        # A write to today lands while this forecast is being computed
+        forecasting.invalidate_forecasts(date.today())
+        return fast(**kwargs)
+
+    monkeypatch.setattr(forecasting, "get_daily_totals", get_daily_totals)
+    forecasting.get_forecast("all")
+    assert forecasting._forecast_cache.stats()["size"] == 0
+    assert forecasting._series_cache == {}
+
+
+def test_invalidation_keeps_forecasts_before_the_changed_date(totals):
+    old = date.today() - timedelta(days=10)
+    forecasting.get_forecast("all", 7, old.isoformat())
+    forecasting.get_forecast("all")
+    forecasting.invalidate_forecasts(date.today())
+    calls = len(totals)
+    forecasting.get_forecast("all", 7, old.isoformat())
+    assert len(totals) == calls
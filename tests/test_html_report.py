@@ -0,0 +1,69 @@
+import os
+import re
+import subprocess
+import sys
+
+import pytest
+
+from backend import html_report
+from backend.rows import EntryRow
+
+
+def _entries():
+    return [
+        EntryRow.from_mapping({"id": i, "date": "2025-01-01", "zone": zone, "route": route, "clerk": "C<1>",
+                               "vehicle": "KBX", "fld_wgt": 100, "fact_wgt": weight, "scorch_kg": 1,
+                               "quality_pct": 80})
+        for i, (zone, route, weight) in enumerate([("A", "R1", 120), ("B", "R2", 80), ("A", "R2", 50)])
+    ]
+
+
+@pytest.fixture(autouse=True)
+def empty_chart_cache(monkeypatch):
+    monkeypatch.setattr(html_report, "_chart_cache", html_report.OrderedDict())
+
+
+def test_offline_report_makes_no_external_requests():
+    html = html_report.render_html_report("2025-01-01", _entries(), "offline")
+    assert not re.search(r'(?:src|href)=["\']?(?:https?:)?//', html)
+    assert html.count("<svg") == 2
+    assert "C&lt;1&gt;" in html and "C<1>" not in html
+    assert "250.0" in html  # total weight
+
+
+def test_offline_rows_show_a_dash_for_missing_quality():
+    entries = _entries()
+    entries[1] = entries[1]._replace(quality_pct=None)
+    html = html_report.render_html_report("2025-01-01", entries, "offline")
+    assert "None" not in html
+    assert '<td class="num" data-v="0">-</td>' in html
+    assert '<td class="num" data-v="80.0">80.0%</td>' in html
+
+
+def test_charts_are_cached_by_source_hash(monkeypatch):
+    calls = []
+    real = html_report.bar_chart
+    monkeypatch.setattr(html_report, "bar_chart", lambda *a, **k: calls.append(a) or real(*a, **k))
+
+    first = html_report.render_html_report("2025-01-01", _entries(), "offline", "hash-1")
+    second = html_report.render_html_report("2025-01-01", _entries(), "offline", "hash-1")
+    html_report.render_html_report("2025-01-01", _entries(), "offline")  # ad-hoc: not cached
+
+    assert first == second
+    assert len(calls) == 2
+    assert list(html_report._chart_cache) == ["hash-1"]
+
+
+def test_unknown_mode_is_rejected():
+    with pytest.raises(ValueError):
+        html_report.render_html_report("2025-01-01", _entries(), "fancy")
+
+
+def test_invalid_mode_setting_falls_back_to_offline():
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    result = subprocess.run(
+        [sys.executable, "-c", "from backend import html_report; print(html_report.HTML_REPORT_MODE)"],
+        cwd=root, env={**os.environ, "HTML_REPORT_MODE": "Offline "}, capture_output=True, text=True, check=True,
+    )
+    assert result.stdout.strip().splitlines()[-1] == "offline"
+    assert "Invalid HTML_REPORT_MODE" in result.stdout
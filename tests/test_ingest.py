@@ -0,0 +1,156 @@
+import asyncio
+
+import pytest
+
+from backend import ingest
+
+
+def _collect(chunks, limit=10):
+    async def stream():
+        for chunk in chunks:
+            yield chunk
+
+    async def run():
+        return [item async for item in ingest._lines(stream())]
+
+    original = ingest.MAX_LINE_BYTES
+    ingest.MAX_LINE_BYTES = limit
+    try:
+        return asyncio.run(run())
+    finally:
+        ingest.MAX_LINE_BYTES = original
+
+
+def test_lines_split_across_chunks_are_joined():
+    assert _collect([b"ab", b"c\nde", b"f\n", b"g"]) == [(1, b"abc"), (2, b"def"), (3, b"g")]
+
+
+def test_trailing_newline_does_not_add_an_empty_line():
+    assert _collect([b"a\nb\n"]) == [(1, b"a"), (2, b"b")]
+    assert _collect([]) == []
+
+
+def test_blank_lines_keep_their_numbers():
+    assert _collect([b"a\n\r\n\nb"]) == [(1, b"a"), (2, b"\r"), (3, b""), (4, b"b")]
+
+
+def test_line_at_the_limit_is_kept():
+    assert _collect([b"x" * 10 + b"\n"]) == [(1, b"x" * 10)]
+
+
+def test_over_long_line_inside_one_chunk_is_skipped():
+    assert _collect([b"ok\n" + b"x" * 11 + b"\nfine\n"]) == [(1, b"ok"), (2, None), (3, b"fine")]
+
+
+def test_over_long_line_spanning_chunks_is_skipped():
+    chunks = [b"ok\nxxxxxx", b"xxxxxx", b"xxxx\nfine"]
+    assert _collect(chunks) == [(1, b"ok"), (2, None), (3, b"fine")]
+
+
+def test_line_growing_past_the_limit_at_a_boundary_is_skipped():
+    assert _collect([b"xxxxxx", b"xxxxx\n", b"y\n"]) == [(1, None), (2, b"y")]
+
+
+def test_over_long_last_line_without_newline_is_skipped():
+    assert _collect([b"a\n", b"x" * 30]) == [(1, b"a"), (2, None)]
+
+
+@pytest.mark.parametrize("size", [1, 2, 3, 7])
+def test_result_does_not_depend_on_chunk_size(size):
+    data = b"one\n" + b"z" * 25 + b"\ntwo\r\nthree"
+    chunks = [data[i:i + size] for i in range(0, len(data), size)]
+    assert _collect(chunks) == [(1, b"one"), (2, None), (3, b"two\r"), (4, b"three")]
+
+
+def _records(data, fmt="csv", limit=64):
+    async def stream():
+        yield data
+
+    async def run():
+        source = ingest._csv_records if fmt == "csv" else ingest._ndjson_records
+        return [item async for item in source(ingest._lines(stream()))]
+
+    original = ingest.MAX_LINE_BYTES
+    ingest.MAX_LINE_BYTES = limit
+    try:
+        return asyncio.run(run())
+    finally:
+        ingest.MAX_LINE_BYTES = original
+
+
+def test_quoted_fields_may_span_lines():
+    data = b'a,b\n1,"two\r\nlines"\n\n"say ""hi""",3\n4,5'
+    assert _records(data) == [
+        (1, ["a", "b"], None),
+        (2, ["1", "two\nlines"], None),
+        (5, ['say "hi"', "3"], None),
+        (6, ["4", "5"], None),
+    ]
+
+
+def test_blank_lines_inside_a_quoted_field_are_kept():
+    assert _records(b'"x\n\ny",1\n') == [(1, ["x\n\ny", "1"], None)]
+
+
+def test_stray_quote_does_not_swallow_following_records():
+    records = _records(b'5" pipe,1\n"ab"c,2\nok,3\n')
+    assert records[0] == (1, ['5" pipe', "1"], None)
+    assert records[1][0] == 2 and records[1][1] is None and "unreadable CSV" in records[1][2]
+    assert records[2] == (3, ["ok", "3"], None)
+
+
+def test_unterminated_quote_is_reported_at_its_first_line():
+    assert _records(b'ok,1\n"never,2\nclosed,3\n') == [(1, ["ok", "1"], None), (2, None, "unterminated quoted field")]
+
+
+def test_multi_line_record_over_the_limit_is_skipped_whole():
+    data = b'"' + b"x" * 20 + b"\n" + b"y" * 20 + b"\n" + b"z" * 30 + b'",1\nnext,2\n'
+    assert _records(data, limit=64) == [(1, None, "longer than 64 bytes"), (4, ["next", "2"], None)]
+
+
+def test_ndjson_records():
+    records = _records(b'{"a": 1}\n\n[1]\n{"b":\n', fmt="ndjson")
+    assert records[0] == (1, {"a": 1}, None)
+    assert records[1] == (3, None, "expected a JSON object")
+    assert records[2][0] == 4 and records[2][2].startswith("invalid JSON")
+
+
+HEADER = b"date,zone,clerk,vehicle,route,fld_wgt,fact_wgt,scorch_kg,quality_pct,time_out\n"
+
+
+def _upload(data, monkeypatch, fail_rows=()):
+    saved = []
+
+    def save_entries(entries):
+        if any(e["route"] in fail_rows for e in entries):
+            raise ValueError("value too long for type character varying(255)")
+        saved.extend(entries)
+        return [[] for _ in entries]
+
+    monkeypatch.setattr(ingest, "save_entries", save_entries)
+
+    async def stream():
+        yield data
+
+    return asyncio.run(ingest.ingest_upload(stream(), "csv")), saved
+
+
+def test_upload_saves_multi_line_records(monkeypatch):
+    data = HEADER + b'2025-01-05,Z1,"ALICE\nSMITH",KBX,R1,100,110,1,80,06:00\n2025-01-05,Z1,BOB,KBX,R2,100,90,0,75,\n'
+    report, saved = _upload(data, monkeypatch)
+    assert (report["rows"], report["inserted"], report["rejected"]) == (2, 2, 0)
+    assert saved[0]["clerk"] == "ALICE\nSMITH"
+    assert saved[1]["time_out"] is None
+
+
+def test_over_long_values_are_row_errors_not_batch_failures(monkeypatch):
+    long_route = b"R" * 256
+    data = (HEADER
+            + b"2025-01-05,Z1,ALICE,KBX,R1,100,110,1,80,06:00\n"
+            + b"2025-01-05,Z1,ALICE,KBX," + long_route + b",100,110,1,80," + b"9" * 51 + b"\n"
+            + b"2025-01-05,Z1,ALICE,KBX,R3,100000000,110,1,80,\n")
+    report, saved = _upload(data, monkeypatch, fail_rows=(long_route.decode(),))
+    assert report["inserted"] == 1 and [e["route"] for e in saved] == ["R1"]
+    errors = {e["line"]: e["errors"] for e in report["errors"]}
+    assert errors[3] == {"route": "longer than 255 characters", "time_out": "longer than 50 characters"}
+    assert errors[4] == {"fld_wgt": "must be between 0 and 99,999,999.99"}
@@ -0,0 +1,111 @@
+import asyncio
+import json
+
+import pytest
+
+from backend import live_feed
+from backend.rows import EntryRow
+
+
+def _entry(**overrides):
+    data = {"id": 7, "date": "2025-01-05", "zone": "Z1", "clerk": "ALICE", "vehicle": "KBX 123A", "route": "R1",
+            "fld_wgt": 100, "fact_wgt": 110, "scorch_kg": 2, "quality_pct": 80, "flags": []}
+    return EntryRow.from_mapping({**data, **overrides})
+
+
+class NotifyCursor:
+    def __init__(self):
+        self.payloads = []
+
+    def execute(self, sql, params):
+        assert sql == "SELECT pg_notify(%s, %s)"
+        assert params[0] == live_feed.CHANNEL
+        self.payloads.append(params[1])
+
+
+def test_deltas_of_an_edit_that_moves_zone():
+    old = _entry()
+    new = _entry(zone="Z2", fact_wgt=120)
+    assert live_feed.entry_deltas(old, new) == [
+        {"date": "2025-01-05", "zone": "Z1", "entries": -1, "quality_sum": -80, "fld_wgt": -100, "fact_wgt": -110, "scorch_kg": -2},
+        {"date": "2025-01-05", "zone": "Z2", "entries": 1, "quality_sum": 80, "fld_wgt": 100, "fact_wgt": 120, "scorch_kg": 2},
+    ]
+    # No net change, no delta
+    assert live_feed.entry_deltas(old, _entry(clerk="BOB")) == []
+
+
+def test_event_carries_the_row():
+    cursor = NotifyCursor()
+    live_feed.notify_entry_event(cursor, "insert", _entry())
+    event = json.loads(cursor.payloads[0])
+    assert event["op"] == "insert"
+    assert event["entry"]["vehicle"] == "KBX 123A"
+    assert "partial" not in event
+    assert event["deltas"][0]["fact_wgt"] == 110
+
+
+def test_oversized_event_is_sent_partial():
+    cursor = NotifyCursor()
+    flags = [{"scope": "route", "metric": "quality_pct", "note": "x" * 200}] * 50
+    live_feed.notify_entry_event(cursor, "update", _entry(flags=flags), _entry())
+    payload = cursor.payloads[0]
+    assert len(payload.encode("utf-8")) <= live_feed.MAX_PAYLOAD
+    event = json.loads(payload)
+    assert event["partial"] is True
+    assert event["entry"] == {"id": 7, "date": "2025-01-05"}
+    assert event["deltas"] == []
+
+
+@pytest.fixture
+def feed(monkeypatch):
+    monkeypatch.setattr(live_feed, "QUEUE_SIZE", 3)
+    monkeypatch.setattr(live_feed, "_subscribers", set())
+    monkeypatch.setattr(live_feed, "_stats", {"events": 0, "resyncs": 0, "dropped": 0})
+
+
+def test_slow_client_loses_its_backlog_for_one_resync(feed):
+    async def run():
+        sub = live_feed._Subscriber(asyncio.get_running_loop())
+        for i in range(3):
+            sub.offer(f"event {i}")
+        sub.offer("event 3")
+        return [sub.queue.get_nowait() for _ in range(sub.queue.qsize())], sub.dropped
+
+    messages, dropped = asyncio.run(run())
+    assert messages == [live_feed.RESYNC]
+    assert dropped == 3
+
+
+def test_stream_delivers_events_and_resyncs(feed):
+    async def run():
+        disconnected = []
+
+        async def is_disconnected():
+            return bool(disconnected)
+
+        frames = live_feed.stream(is_disconnected)
+        received = [await frames.__anext__()]
+        assert live_feed.feed_stats()["clients"] == 1
+
+        live_feed._on_entry_event('{"op": "insert"}')
+        received.append(await frames.__anext__())
+        # The listener reconnected: every client is told to refetch
+        live_feed._on_entry_event(None)
+        received.append(await frames.__anext__())
+
+        # Overflow while the client is not reading
+        for i in range(5):
+            live_feed._on_entry_event(f'{{"n": {i}}}')
+        await asyncio.sleep(0)
+        received.append(await frames.__anext__())
+
+        disconnected.append(True)
+        await frames.aclose()
+        return received
+
+    received = asyncio.run(run())
+    assert received == ["retry: 3000\n\n", 'event: entry\ndata: {"op": "insert"}\n\n', live_feed.RESYNC, live_feed.RESYNC]
+    stats = live_feed.feed_stats()
+    assert stats["clients"] == 0
+    assert stats["events"] == 6 and stats["resyncs"] == 1
+    assert stats["dropped"] == 3
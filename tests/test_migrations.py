@@ -0,0 +1,178 @@
+import re
+
+import pytest
+
+from backend import migrations
+
+
+class SchemaCursor:
+    """Fake cursor that tracks report_catalog's columns and rejects inserts into unknown ones"""
+
+    def __init__(self):
+        self.columns = None
+        self.rows = []
+
+    def execute(self, sql, params=None):
+        sql = " ".join(sql.split())
+        if sql.startswith("CREATE TABLE IF NOT EXISTS report_catalog"):
+            body = sql[sql.index("(") + 1:sql.rindex(")")]
+            self.columns = {part.strip().split(" ")[0] for part in body.split(",") if part.strip()}
+        elif sql.startswith("ALTER TABLE report_catalog ADD COLUMN"):
+            self.columns.add(sql.split()[-2])
+        elif sql.startswith("INSERT INTO report_catalog"):
+            names = re.match(r"INSERT INTO report_catalog \(([^)]*)\)", sql).group(1)
+            unknown = {n.strip() for n in names.split(",")} - self.columns
+            if unknown:
+                raise AssertionError(f"column {unknown} does not exist")
+            self.rows.append(params)
+
+
+def test_versions_are_strictly_increasing():
+    versions = [version for version, _, _ in migrations.MIGRATIONS]
+    assert versions == sorted(set(versions))
+    assert versions[0] == 1 and migrations.LATEST_VERSION == versions[-1]
+
+
+def test_report_catalog_migrations_apply_in_order_with_existing_files(tmp_path, monkeypatch):
+    (tmp_path / "Report_2025-01-01.pdf").write_bytes(b"%PDF")
+    (tmp_path / "Report_Weekly_2025-01-06.html").write_text("<html></html>")
+    (tmp_path / "notes.txt").write_text("not a report")
+    monkeypatch.setattr(migrations, "REPORT_DIR", str(tmp_path))
+
+    cursor = SchemaCursor()
+    by_version = {version: apply for version, _, apply in migrations.MIGRATIONS}
+    by_version[4](cursor)
+    by_version[5](cursor)
+
+    assert "source_hash" in cursor.columns
+    assert sorted(row[3] for row in cursor.rows) == ["Report_2025-01-01.pdf", "Report_Weekly_2025-01-06.html"]
+
+
+def test_report_catalog_backfill_skips_missing_directory(tmp_path, monkeypatch):
+    monkeypatch.setattr(migrations, "REPORT_DIR", str(tmp_path / "missing"))
+    cursor = SchemaCursor()
+    migrations.MIGRATIONS[3][2](cursor)
+    assert cursor.rows == []
+
+
+class RecordingCursor:
+    def __init__(self):
+        self.statements = []
+
+    def execute(self, sql, params=None):
+        self.statements.append((" ".join(sql.split()), params))
+
+
+def test_backfills_do_not_call_live_helpers(monkeypatch):
+    from backend import database
+
+    # A later change to the live helpers must not change what v2/v3 do
+    monkeypatch.setattr(database, "_rebuild_entry_stats", lambda cursor: pytest.fail("live helper called"))
+    monkeypatch.setattr(database, "_refresh_daily_rollups", lambda cursor, date=None: pytest.fail("live helper called"))
+    by_version = {version: apply for version, _, apply in migrations.MIGRATIONS}
+
+    cursor = RecordingCursor()
+    by_version[2](cursor)
+    inserts = [params for sql, params in cursor.statements if sql.startswith("INSERT INTO entry_stats")]
+    assert sorted(inserts) == sorted((scope, metric) for scope in ("route", "vehicle")
+                                     for metric in ("var_pct", "quality_pct", "scorch_kg"))
+
+    cursor = RecordingCursor()
+    by_version[3](cursor)
+    inserts = [params for sql, params in cursor.statements if sql.startswith("INSERT INTO daily_rollups")]
+    assert inserts == [("zone",), ("route",), ("clerk",)]
+
+
+class MigrationDB:
+    """Connection + cursor over a fake schema_version table; commits and rollbacks are tracked"""
+
+    def __init__(self, applied=(), fail_on=None):
+        self.committed = list(applied)
+        self.pending = []
+        self.locks = []
+        self.rollbacks = 0
+        self.fail_on = fail_on
+        self.result = None
+
+    def cursor(self):
+        return self
+
+    def execute(self, sql, params=None):
+        sql = " ".join(sql.split())
+        if "pg_advisory_lock" in sql or "pg_advisory_unlock" in sql:
+            self.locks.append(sql.split("(")[0].split()[-1])
+        elif sql.startswith("SELECT COALESCE(MAX(version), 0)"):
+            self.result = (max([v for v, _ in self.committed], default=0),)
+        elif sql.startswith("INSERT INTO schema_version"):
+            self.pending.append(params)
+
+    def fetchone(self):
+        return self.result
+
+    def commit(self):
+        self.committed += self.pending
+        self.pending = []
+
+    def rollback(self):
+        self.pending = []
+        self.rollbacks += 1
+
+    def close(self):
+        pass
+
+
+def _fake_migrations(monkeypatch, db, applied_log):
+    def step(version):
+        def apply(cursor):
+            if version == db.fail_on:
+                raise RuntimeError("boom")
+            applied_log.append(version)
+        return apply
+    fake = [(v, f"step {v}", step(v)) for v in (1, 2, 3)]
+    monkeypatch.setattr(migrations, "MIGRATIONS", fake)
+    monkeypatch.setattr(migrations, "LATEST_VERSION", 3)
+    monkeypatch.setattr(migrations, "get_connection", lambda: db)
+
+
+def test_run_migrations_applies_only_pending_versions_in_order(monkeypatch):
+    db, applied = MigrationDB(applied=[(1, "step 1")]), []
+    _fake_migrations(monkeypatch, db, applied)
+
+    migrations.run_migrations()
+    assert applied == [2, 3]
+    assert db.committed == [(1, "step 1"), (2, "step 2"), (3, "step 3")]
+    assert db.locks == ["pg_advisory_lock", "pg_advisory_unlock"]
+
+    applied.clear()
+    migrations.run_migrations()
+    assert applied == []
+
+
+def test_failed_migration_rolls_back_and_stops(monkeypatch):
+    db, applied = MigrationDB(fail_on=2), []
+    _fake_migrations(monkeypatch, db, applied)
+
+    with pytest.raises(RuntimeError):
+        migrations.run_migrations()
+    assert applied == [1]
+    assert [v for v, _ in db.committed] == [1]
+    assert db.rollbacks == 1
+    assert db.locks[-1] == "pg_advisory_unlock"
+
+
+def test_verify_schema(monkeypatch):
+    import psycopg2.errors
+
+    db = MigrationDB(applied=[(1, ""), (2, ""), (3, "")])
+    _fake_migrations(monkeypatch, db, [])
+    assert migrations.verify_schema() == 3
+
+    db.committed = db.committed[:2]
+    with pytest.raises(RuntimeError, match="version 2, expected 3"):
+        migrations.verify_schema()
+
+    def missing(sql, params=None):
+        raise psycopg2.errors.UndefinedTable("relation schema_version does not exist")
+    db.execute = missing
+    with pytest.raises(RuntimeError, match="version 0, expected 3"):
+        migrations.verify_schema()
@@ -0,0 +1,82 @@
+from datetime import date
+from decimal import Decimal
+
+import pytest
+from fastapi import HTTPException
+
+from backend import main, period_reports
+from backend.period_reports import build_period_summary, period_bounds
+
+
+def _rollup(day, dimension, name, entries, fld, fact, scorch, quality_sum):
+    # Shaped like get_period_rollups rows: DECIMAL columns come back as Decimal
+    return {"date": date.fromisoformat(day), "dimension": dimension, "name": name, "entries": entries,
+            "fld_wgt": Decimal(fld), "fact_wgt": Decimal(fact), "scorch_kg": Decimal(scorch),
+            "quality_sum": Decimal(quality_sum)}
+
+
+# Three entries over two days of the week of 2025-01-06:
+#   01-06 Z1/R1/ALICE fld 100 fact 110 scorch 1 quality 80
+#   01-06 Z2/R2/BOB   fld 200 fact 190 scorch 2 quality 70
+#   01-08 Z1/R1/BOB   fld 300 fact 300 scorch 0 quality 90
+ROLLUPS = [
+    _rollup("2025-01-06", "zone", "Z1", 1, "100", "110", "1", "80"),
+    _rollup("2025-01-06", "zone", "Z2", 1, "200", "190", "2", "70"),
+    _rollup("2025-01-06", "route", "R1", 1, "100", "110", "1", "80"),
+    _rollup("2025-01-06", "route", "R2", 1, "200", "190", "2", "70"),
+    _rollup("2025-01-06", "clerk", "ALICE", 1, "100", "110", "1", "80"),
+    _rollup("2025-01-06", "clerk", "BOB", 1, "200", "190", "2", "70"),
+    _rollup("2025-01-08", "zone", "Z1", 1, "300", "300", "0", "90"),
+    _rollup("2025-01-08", "route", "R1", 1, "300", "300", "0", "90"),
+    _rollup("2025-01-08", "clerk", "BOB", 1, "300", "300", "0", "90"),
+]
+
+
+def test_period_bounds():
+    assert period_bounds("weekly", "2025-01-08") == (date(2025, 1, 6), date(2025, 1, 12))
+    assert period_bounds("weekly", date(2025, 1, 6)) == (date(2025, 1, 6), date(2025, 1, 12))
+    assert period_bounds("monthly", "2024-02-10") == (date(2024, 2, 1), date(2024, 2, 29))
+    with pytest.raises(ValueError):
+        period_bounds("yearly", "2025-01-08")
+
+
+def test_summary_totals_come_from_the_rollups():
+    summary = build_period_summary("weekly", date(2025, 1, 6), date(2025, 1, 12), ROLLUPS)
+
+    assert summary["label"] == "Week of 2025-01-06"
+    kpis = summary["kpis"]
+    assert kpis["entries"] == 3
+    assert kpis["fld_wgt"] == 600
+    assert kpis["fact_wgt"] == 600
+    assert kpis["var_pct"] == 0
+    assert kpis["scorch_kg"] == 3
+    assert kpis["avg_quality"] == 80
+    assert kpis["active_days"] == 2
+
+    assert [(z["name"], z["entries"], z["fact_wgt"]) for z in summary["zones"]] == [("Z1", 2, 410), ("Z2", 1, 190)]
+    assert summary["zones"][0]["var_pct"] == pytest.approx(2.5)
+    assert summary["zones"][0]["avg_quality"] == 85
+    assert [c["name"] for c in summary["clerks"]] == ["BOB", "ALICE"]
+    assert summary["clerks"][0]["fact_wgt"] == 490
+
+    trend = summary["trend"]
+    assert len(trend["dates"]) == 7
+    assert trend["series"]["Z1"] == [110, 0, 300, 0, 0, 0, 0]
+    assert trend["series"]["Z2"] == [190, 0, 0, 0, 0, 0, 0]
+
+
+def test_period_endpoint_reads_the_week_of_the_anchor(monkeypatch):
+    asked = []
+    monkeypatch.setattr(period_reports, "get_period_rollups", lambda start, end: asked.append((start, end)) or ROLLUPS)
+    summary = main._load_period_or_400("weekly", "2025-01-08")
+    assert asked == [(date(2025, 1, 6), date(2025, 1, 12))]
+    assert summary["kpis"]["entries"] == 3
+
+    with pytest.raises(HTTPException) as bad:
+        main._load_period_or_400("yearly", "2025-01-08")
+    assert bad.value.status_code == 400
+
+    monkeypatch.setattr(period_reports, "get_period_rollups", lambda start, end: [])
+    with pytest.raises(HTTPException) as empty:
+        main._load_period_or_400("monthly", "2025-03-01")
+    assert empty.value.status_code == 404
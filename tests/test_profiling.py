@@ -0,0 +1,103 @@
+import asyncio
+import json
+import threading
+
+from backend import main, profiling
+
+
+def _scope(headers=(), query=b""):
+    return {"type": "http", "method": "GET", "path": "/api/entries/2025-01-05", "headers": list(headers),
+            "query_string": query}
+
+
+async def _receive():
+    return {"type": "http.request", "body": b""}
+
+
+def _run(middleware, scope):
+    sent = []
+
+    async def send(message):
+        sent.append(message)
+
+    asyncio.run(middleware(scope, _receive, send))
+    return sent
+
+
+def _app(seen):
+    async def app(scope, receive, send):
+        seen.append((send, profiling._current.get()))
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b"{}"})
+    return app
+
+
+def test_without_a_token_nothing_is_profiled(monkeypatch, tmp_path):
+    monkeypatch.setattr(profiling, "PROFILE_TOKEN", None)
+    monkeypatch.setattr(profiling, "PROFILE_DIR", str(tmp_path / "profiles"))
+    assert not profiling.authorized("anything")
+    assert profiling.ProfilingMiddleware not in [m.cls for m in main.app.user_middleware]
+
+    seen = []
+    sent = _run(profiling.ProfilingMiddleware(_app(seen)), _scope([(b"x-profile", b"")], b"profile="))
+    # The request goes straight through: the original send, no profile, no file
+    assert seen[0][1] is None
+    assert [m["type"] for m in sent] == ["http.response.start", "http.response.body"]
+    assert not (tmp_path / "profiles").exists()
+
+    endpoint = profiling._bind_thread(lambda x: x * 2)
+    assert endpoint(21) == 42
+
+
+def test_profiled_request_is_saved_off_the_event_loop(monkeypatch, tmp_path):
+    monkeypatch.setattr(profiling, "PROFILE_TOKEN", "secret")
+    monkeypatch.setattr(profiling, "PROFILE_DIR", str(tmp_path))
+    monkeypatch.setattr(profiling, "PROFILE_KEEP", 2)
+    saved_on = []
+    save = profiling._save
+
+    def recording_save(*args):
+        saved_on.append(threading.get_ident())
+        return save(*args)
+    monkeypatch.setattr(profiling, "_save", recording_save)
+
+    seen = []
+    middleware = profiling.ProfilingMiddleware(_app(seen))
+    for _ in range(3):
+        _run(middleware, _scope([(b"x-profile", b"secret")]))
+    _run(middleware, _scope(query=b"profile=wrong"))
+
+    assert all(profile is not None for _, profile in seen[:3]) and seen[3][1] is None
+    assert len(saved_on) == 3 and threading.get_ident() not in saved_on
+    files = sorted(p.name for p in tmp_path.iterdir())
+    assert len(files) == 2 and all(name.endswith(".speedscope.json") for name in files)
+    assert "_GET_api_entries_2025-01-05_" in files[0]
+
+    items = profiling.list_profiles()
+    assert [item["name"] for item in items] == sorted(files, reverse=True)
+    assert (items[0]["method"], items[0]["path"], items[0]["status"]) == ("GET", "/api/entries/2025-01-05", 200)
+    assert profiling.profile_path(files[0]) == str(tmp_path / files[0])
+    assert profiling.profile_path("../secret.speedscope.json") is None
+
+
+def test_speedscope_file_shape():
+    profile = profiling._Profile("GET /api/x")
+
+    def leaf():
+        return leaf.__code__
+
+    outer = test_speedscope_file_shape.__code__
+    stack = [profile._index(outer), profile._index(leaf())]
+    profile.samples.append(stack)
+    profile.weights.append(2.0)
+    assert profile._index(outer) == 0
+
+    data = json.loads(json.dumps(profile.speedscope(12.3456)))
+    assert data["$schema"] == "https://www.speedscope.app/file-format-schema.json"
+    assert [f["name"] for f in data["shared"]["frames"]] == ["test_speedscope_file_shape", "leaf"]
+    assert set(data["shared"]["frames"][0]) == {"name", "file", "line"}
+    (sampled,) = data["profiles"]
+    assert sampled["type"] == "sampled" and sampled["unit"] == "milliseconds"
+    assert (sampled["startValue"], sampled["endValue"]) == (0, 12.346)
+    assert sampled["samples"] == [[0, 1]] and sampled["weights"] == [2.0]
+    assert len(sampled["samples"]) == len(sampled["weights"])
@@ -0,0 +1,180 @@
+import threading
+from datetime import date, datetime
+
+import pytest
+
+from backend import database, query_cache
+from backend.query_cache import DateCache, cache_key
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(query_cache.time, "monotonic", clock)
+    return clock
+
+
+def test_cache_key_normalizes_every_date_form():
+    assert cache_key("2025-01-05") == "2025-01-05"
+    assert cache_key("2025-1-5") == "2025-01-05"
+    assert cache_key(" 2025-01-05 ") == "2025-01-05"
+    assert cache_key("2025-01-05T08:30:00") == "2025-01-05"
+    assert cache_key(date(2025, 1, 5)) == "2025-01-05"
+    assert cache_key(datetime(2025, 1, 5, 23, 59)) == "2025-01-05"
+    for bad in ("2025-13-01", "yesterday", "", "2025-01-05junk"):
+        with pytest.raises(ValueError):
+            cache_key(bad)
+
+
+def test_hits_until_the_ttl_expires(clock):
+    cache = DateCache(maxsize=4, ttl=10)
+    loads = []
+    load = lambda: loads.append(1) or len(loads)
+
+    assert cache.get_or_load("a", load) == 1
+    clock.now += 9.9
+    assert cache.get_or_load("a", load) == 1
+    clock.now += 0.2
+    assert cache.get_or_load("a", load) == 2
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["expired"]) == (1, 2, 1)
+
+
+def test_least_recently_used_key_is_evicted(clock):
+    cache = DateCache(maxsize=2, ttl=60)
+    cache.get_or_load("a", lambda: "A")
+    cache.get_or_load("b", lambda: "B")
+    cache.get_or_load("a", lambda: "stale")      # touch a: b is now the oldest
+    cache.get_or_load("c", lambda: "C")
+    assert cache.get_or_load("a", lambda: "reloaded") == "A"
+    assert cache.get_or_load("b", lambda: "reloaded") == "reloaded"
+    assert cache.stats()["evictions"] == 2
+
+
+def test_load_overlapping_an_invalidation_is_not_stored(clock):
+    cache = DateCache(maxsize=4, ttl=60)
+    started, release = threading.Event(), threading.Event()
+
+    def slow_load():
+        started.set()
+        release.wait(5)
+        return "read before the write committed"
+
+    reader = threading.Thread(target=cache.get_or_load, args=("2025-01-05", slow_load))
+    reader.start()
+    started.wait(5)
+    cache.invalidate("2025-01-05")      # a write to the date commits mid-load
+    release.set()
+    reader.join()
+
+    assert cache.get_or_load("2025-01-05", lambda: "fresh") == "fresh"
+    # The generation is dropped once no load is in flight
+    assert cache._generations == {} and cache._loading == {}
+
+
+def test_clear_and_invalidate_where(clock):
+    cache = DateCache(maxsize=8, ttl=60)
+    for key in ("2025-01-01", "2025-01-02", "2025-01-03"):
+        cache.get_or_load(key, lambda key=key: key)
+    cache.invalidate_where(lambda key: key >= "2025-01-02")
+    assert cache.get_or_load("2025-01-01", lambda: "reloaded") == "2025-01-01"
+    assert cache.get_or_load("2025-01-02", lambda: "reloaded") == "reloaded"
+    cache.clear()
+    assert cache.get_or_load("2025-01-01", lambda: "after clear") == "after clear"
+
+
+def test_disabled_cache_always_loads():
+    cache = DateCache(maxsize=4, ttl=0)
+    assert not cache.enabled
+    assert cache.get_or_load("a", lambda: 1) == 1
+    assert cache.get_or_load("a", lambda: 2) == 2
+
+
+@pytest.fixture
+def entries(monkeypatch):
+    cache = DateCache(maxsize=8, ttl=60)
+    monkeypatch.setattr(query_cache, "entries_cache", cache)
+    seen = []
+    monkeypatch.setattr(query_cache, "_callbacks", [seen.append])
+    return cache, seen
+
+
+def test_entries_changed_invalidates_the_normalized_key(entries):
+    cache, seen = entries
+    cache.get_or_load("2025-01-05", lambda: "old")
+    cache.get_or_load("2025-01-06", lambda: "kept")
+
+    query_cache.entries_changed("2025-1-5")
+    assert seen == ["2025-01-05"]
+    assert cache.get_or_load("2025-01-05", lambda: "new") == "new"
+    assert cache.get_or_load("2025-01-06", lambda: "new") == "kept"
+
+    # A payload we cannot parse could be any date: drop everything
+    query_cache.entries_changed("garbage")
+    assert seen[-1] is None
+    assert cache.get_or_load("2025-01-06", lambda: "new") == "new"
+
+
+class Stop(BaseException):
+    pass
+
+
+class Notify:
+    def __init__(self, channel, payload):
+        self.channel, self.payload = channel, payload
+
+
+class ListenConnection:
+    def __init__(self, notifies):
+        self.listening = []
+        self.notifies = []
+        self._batches = [notifies]
+
+    def set_isolation_level(self, level):
+        pass
+
+    def cursor(self):
+        return self
+
+    def execute(self, sql):
+        self.listening.append(sql)
+
+    def poll(self):
+        if not self._batches:
+            raise OSError("server closed the connection")
+        self.notifies.extend(self._batches.pop(0))
+
+    def close(self):
+        pass
+
+
+def test_listener_applies_notifications_and_disables_the_cache_when_disconnected(entries, monkeypatch):
+    cache, seen = entries
+    conn = ListenConnection([Notify(query_cache.CHANNEL, "2025-01-05"), Notify(query_cache.CHANNEL, "")])
+    monkeypatch.setattr(database, "get_connection", lambda: conn)
+    monkeypatch.setattr(query_cache.select, "select", lambda r, w, x, timeout: (r, [], []))
+    monkeypatch.setattr(query_cache, "_channel_handlers", {})
+    monkeypatch.setattr(query_cache, "_listener", {"thread": None, "connected": False, "notifications": 0, "reconnects": 0})
+
+    def stop(seconds):
+        raise Stop()
+    monkeypatch.setattr(query_cache.time, "sleep", stop)
+
+    with pytest.raises(Stop):
+        query_cache._listen_forever()
+
+    assert conn.listening == [f"LISTEN {query_cache.CHANNEL}"]
+    # Connect clears, then the date, then an empty payload (= everything), then the disconnect clears
+    assert seen == [None, "2025-01-05", None, None]
+    assert query_cache._listener["notifications"] == 2
+    assert query_cache._listener["reconnects"] == 1
+    assert not query_cache._listener["connected"]
+    assert not cache.enabled
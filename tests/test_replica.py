@@ -0,0 +1,122 @@
+import psycopg2
+import pytest
+
+from backend import database
+
+
+class Replica:
+    """A replica connection whose measured lag is `lag` seconds"""
+
+    def __init__(self, lag):
+        self.lag = lag
+        self.closed = False
+        self.readonly = None
+        self.lag_checks = 0
+
+    def cursor(self):
+        return self
+
+    def execute(self, sql):
+        assert "pg_last_xact_replay_timestamp" in sql
+        self.lag_checks += 1
+
+    def fetchone(self):
+        return (self.lag,)
+
+    def close(self):
+        self.closed = True
+
+    def rollback(self):
+        pass
+
+    def set_session(self, readonly):
+        self.readonly = readonly
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def routing(monkeypatch):
+    clock = Clock()
+    state = {"replica": Replica(0.5), "connects": 0, "down": False}
+
+    def connect(dsn):
+        assert dsn == "host=replica"
+        state["connects"] += 1
+        if state["down"]:
+            raise psycopg2.OperationalError("could not connect")
+        return state["replica"]
+
+    monkeypatch.setattr(database.time, "monotonic", clock)
+    monkeypatch.setattr(database, "REPLICA_DSN", "host=replica")
+    monkeypatch.setattr(database, "REPLICA_MAX_LAG", 5.0)
+    monkeypatch.setattr(database.psycopg2, "connect", connect)
+    monkeypatch.setattr(database, "get_connection", lambda: "primary")
+    monkeypatch.setattr(database, "_replica", {"lag": None, "checked_at": 0.0, "down_until": 0.0, "last_write": 0.0,
+                                               "replica_reads": 0, "primary_reads": 0, "lag_fallbacks": 0, "errors": 0})
+    state["clock"] = clock
+    return state
+
+
+def test_reads_go_to_the_primary_without_a_replica(routing, monkeypatch):
+    monkeypatch.setattr(database, "REPLICA_DSN", None)
+    assert database.get_read_connection() == "primary"
+    assert routing["connects"] == 0
+
+
+def test_replica_within_the_lag_budget_serves_reads_read_only(routing):
+    conn = database.get_read_connection()
+    assert conn is routing["replica"]
+    assert conn.readonly is True
+    # The lag measurement is reused for REPLICA_CHECK_INTERVAL
+    routing["clock"].now += 1
+    database.get_read_connection()
+    assert conn.lag_checks == 1
+    assert database.replica_stats()["replica_reads"] == 2
+
+
+def test_lagging_replica_falls_back_to_the_primary(routing):
+    routing["replica"] = Replica(12.0)
+    assert database.get_read_connection() == "primary"
+    assert routing["replica"].closed
+    stats = database.replica_stats()
+    assert (stats["lag_fallbacks"], stats["primary_reads"], stats["last_lag"]) == (1, 1, 12.0)
+
+    # While the high lag measurement is fresh the replica is not even connected to
+    routing["clock"].now += 1
+    assert database.get_read_connection() == "primary"
+    assert routing["connects"] == 1
+
+    # Once it is stale the replica is measured again and used when caught up
+    routing["replica"] = Replica(0.0)
+    routing["clock"].now += database.REPLICA_CHECK_INTERVAL + 1
+    assert database.get_read_connection() is routing["replica"]
+
+
+def test_unreachable_replica_is_retried_after_the_interval(routing):
+    routing["down"] = True
+    assert database.get_read_connection() == "primary"
+    assert database.replica_stats()["errors"] == 1
+
+    routing["clock"].now += database.REPLICA_RETRY_INTERVAL - 1
+    assert database.get_read_connection() == "primary"
+    assert routing["connects"] == 1
+
+    routing["down"] = False
+    routing["clock"].now += 2
+    assert database.get_read_connection() is routing["replica"]
+
+
+def test_a_worker_reads_its_own_writes_from_the_primary(routing):
+    database._wrote()
+    routing["clock"].now += database.REPLICA_MAX_LAG - 0.1
+    assert database.get_read_connection() == "primary"
+    assert routing["connects"] == 0
+    routing["clock"].now += 0.2
+    assert database.get_read_connection() is routing["replica"]
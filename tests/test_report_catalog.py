@@ -0,0 +1,134 @@
+import os
+from datetime import date
+
+import pytest
+from fastapi import HTTPException
+
+from backend import main, report_catalog
+from backend.report_catalog import parse_report_filename, resolve_report_path
+
+
+def test_parse_report_filename():
+    assert parse_report_filename("Report_20250101.pdf") == (date(2025, 1, 1), "daily", "pdf")
+    assert parse_report_filename("Report_2025-01-01.html") == (date(2025, 1, 1), "daily", "html")
+    assert parse_report_filename("Report_Weekly_20250106.xlsx") == (date(2025, 1, 6), "weekly", "xlsx")
+    assert parse_report_filename("Report_Monthly_2025-01-01.html") == (date(2025, 1, 1), "monthly", "html")
+    for name in ("Report_20250101.exe", "notes.txt", "Report_Yearly_2025-01-01.pdf", "../Report_20250101.pdf"):
+        assert parse_report_filename(name) is None
+
+
+class CatalogCursor:
+    """Evaluates list_reports' WHERE clause against in-memory rows"""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.result = None
+
+    def execute(self, sql, params):
+        sql = " ".join(sql.split())
+        conditions = sql.split("WHERE ", 1)[1].split(" ORDER BY")[0].split(" AND ") if "WHERE" in sql else []
+        tests = {
+            "report_date >= %s": lambda row, v: row["report_date"] >= v,
+            "report_date <= %s": lambda row, v: row["report_date"] <= v,
+            "format = %s": lambda row, v: row["format"] == v,
+            "period = %s": lambda row, v: row["period"] == v,
+        }
+        values = list(params)
+        checks = [(tests[c.strip()], values.pop(0)) for c in conditions]
+        matched = [row for row in self.rows if all(check(row, v) for check, v in checks)]
+        if sql.startswith("SELECT COUNT(*)"):
+            self.result = [{"total": len(matched)}]
+        else:
+            limit, offset = values
+            matched.sort(key=lambda row: (row["report_date"], row["id"]), reverse=True)
+            self.result = matched[offset:offset + limit]
+
+    def fetchone(self):
+        return self.result[0]
+
+    def fetchall(self):
+        return self.result
+
+    def close(self):
+        pass
+
+
+class CatalogConnection:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def cursor(self, cursor_factory=None):
+        return CatalogCursor(self.rows)
+
+    def close(self):
+        pass
+
+
+ROWS = [
+    {"id": 1, "report_date": "2025-01-01", "period": "daily", "format": "pdf"},
+    {"id": 2, "report_date": "2025-01-01", "period": "daily", "format": "html"},
+    {"id": 3, "report_date": "2025-01-02", "period": "daily", "format": "pdf"},
+    {"id": 4, "report_date": "2025-01-06", "period": "weekly", "format": "xlsx"},
+    {"id": 5, "report_date": "2025-02-01", "period": "monthly", "format": "html"},
+]
+
+
+@pytest.fixture
+def catalog(monkeypatch):
+    monkeypatch.setattr(report_catalog, "get_connection", lambda: CatalogConnection(ROWS))
+
+
+def _ids(result):
+    return [row["id"] for row in result["items"]]
+
+
+def test_list_reports_filters_and_pages(catalog):
+    assert _ids(report_catalog.list_reports()) == [5, 4, 3, 2, 1]
+    assert _ids(report_catalog.list_reports(start_date="2025-01-02", end_date="2025-01-31")) == [4, 3]
+    assert _ids(report_catalog.list_reports(fmt="pdf")) == [3, 1]
+    assert _ids(report_catalog.list_reports(period="daily", fmt="html")) == [2]
+
+    page = report_catalog.list_reports(period="daily", limit=2, offset=1)
+    assert _ids(page) == [2, 1]
+    assert (page["total"], page["limit"], page["offset"]) == (3, 2, 1)
+
+
+def test_list_endpoint_validates_its_arguments(catalog):
+    assert main.list_reports(format="pdf")["total"] == 2
+    for kwargs in ({"format": "exe"}, {"limit": 0}, {"limit": 501}, {"offset": -1}):
+        with pytest.raises(HTTPException) as error:
+            main.list_reports(**kwargs)
+        assert error.value.status_code == 400
+
+
+@pytest.fixture
+def output_dir(tmp_path, monkeypatch):
+    out = tmp_path / "PDF Records"
+    out.mkdir()
+    (out / "Report_20250101.pdf").write_bytes(b"%PDF")
+    (tmp_path / "secret.txt").write_text("not a report")
+    monkeypatch.setattr(report_catalog, "OUTPUT_DIR", str(out))
+    return out
+
+
+def test_resolve_report_path_stays_inside_the_output_dir(output_dir, tmp_path):
+    assert resolve_report_path({"filename": "Report_20250101.pdf"}) == os.path.realpath(output_dir / "Report_20250101.pdf")
+    assert resolve_report_path({"filename": "../secret.txt"}) is None
+    assert resolve_report_path({"filename": str(tmp_path / "secret.txt")}) is None
+
+    (output_dir / "Report_20250102.pdf").symlink_to(tmp_path / "secret.txt")
+    assert resolve_report_path({"filename": "Report_20250102.pdf"}) is None
+
+
+def test_files_are_only_served_by_catalog_id(output_dir, monkeypatch):
+    catalogued = {1: {"id": 1, "filename": "Report_20250101.pdf"}, 2: {"id": 2, "filename": "../secret.txt"},
+                  3: {"id": 3, "filename": "Report_20250103.pdf"}}
+    monkeypatch.setattr(main, "get_catalog_report", catalogued.get)
+
+    response = main.get_report(1)
+    assert response.path == os.path.realpath(output_dir / "Report_20250101.pdf")
+    # Not catalogued, pointing outside the output dir, or catalogued but gone from disk
+    for report_id in (99, 2, 3):
+        with pytest.raises(HTTPException) as error:
+            main.get_report(report_id)
+        assert error.value.status_code == 404
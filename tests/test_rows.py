@@ -0,0 +1,56 @@
+import json
+import pickle
+from datetime import date, datetime
+from decimal import Decimal
+
+from backend import rows
+from backend.rows import ENTRY_FIELDS, EntryRow, fetch_entry_rows, rows_to_json
+
+
+def test_casters_convert_wire_values():
+    # psycopg2 hands typecasters the text form of the column, or None for NULL
+    assert rows._FLOAT.values == (1700,)
+    assert rows._FLOAT("12450.50", None) == 12450.5
+    assert isinstance(rows._FLOAT("80", None), float)
+    assert rows._FLOAT(None, None) is None
+
+    assert rows._ISO_DATE.values == (1082,)
+    assert rows._ISO_DATE("2025-01-05", None) == "2025-01-05"
+    assert rows._ISO_DATE(None, None) is None
+
+    assert rows._ISO_TIMESTAMP.values == (1114, 1184)
+    assert rows._ISO_TIMESTAMP("2025-01-05 08:30:00", None) == "2025-01-05T08:30:00"
+    assert rows._ISO_TIMESTAMP("2025-01-05 08:30:00.123456+03", None) == "2025-01-05T08:30:00.123456+03"
+    assert rows._ISO_TIMESTAMP(None, None) is None
+
+
+def test_from_mapping_matches_the_cast_row():
+    row = EntryRow.from_mapping({
+        "id": 7, "date": date(2025, 1, 5), "zone": "Z1", "fld_wgt": Decimal("100.50"), "fact_wgt": 110,
+        "scorch_kg": None, "quality_pct": "80", "created_at": datetime(2025, 1, 5, 8, 30),
+    })
+    assert row.date == "2025-01-05"
+    assert (row.fld_wgt, row.fact_wgt, row.scorch_kg, row.quality_pct) == (100.5, 110.0, None, 80.0)
+    assert all(isinstance(v, float) for v in (row.fld_wgt, row.fact_wgt, row.quality_pct))
+    assert row.created_at == "2025-01-05T08:30:00"
+    assert row.clerk is None and row.flags is None
+
+
+def test_fetched_rows_serialise_without_conversion():
+    class Cursor:
+        def fetchall(self):
+            return [(1, "2025-01-05", "Z1", "ALICE", "KBX 123A", "R1", "06:00", "08:30", None,
+                     100.0, 110.0, 2.0, 80.0, [], "2025-01-05T08:30:00", None)]
+
+    fetched = fetch_entry_rows(Cursor())
+    assert fetched[0]._fields == ENTRY_FIELDS
+    assert pickle.loads(pickle.dumps(fetched)) == fetched
+    decoded = json.loads(rows_to_json(fetched))
+    assert decoded[0]["vehicle"] == "KBX 123A"
+    assert decoded[0]["fact_wgt"] == 110.0
+    assert decoded[0]["created_at"] == "2025-01-05T08:30:00"
+
+    # Values that bypassed the casters are still encoded
+    raw = EntryRow._make([None] * len(ENTRY_FIELDS))._replace(date=date(2025, 1, 5), fld_wgt=Decimal("1.5"))
+    assert json.loads(rows_to_json([raw]))[0]["date"] == "2025-01-05"
+    assert json.loads(rows_to_json([raw]))[0]["fld_wgt"] == 1.5
@@ -0,0 +1,148 @@
+from contextlib import contextmanager
+from datetime import datetime
+
+import pytest
+
+from backend import artifacts, scheduler
+from backend.excel_handler import SUMMARY_DAYS
+from backend.scheduler import CronSchedule, parse_schedule
+
+
+def test_fields_expand_lists_ranges_and_steps():
+    cron = CronSchedule("0,30  18 1-10/3 */4 1-5")
+    assert cron.expr == "0,30 18 1-10/3 */4 1-5"
+    assert cron.values["minute"] == {0, 30}
+    assert cron.values["hour"] == {18}
+    assert cron.values["day"] == {1, 4, 7, 10}
+    assert cron.values["month"] == {1, 5, 9}
+    assert cron.values["weekday"] == {1, 2, 3, 4, 5}
+    # A bare start with a step runs to the end of the field
+    assert CronSchedule("50/5 * * * *").values["minute"] == {50, 55}
+
+
+def test_sunday_is_0_or_7():
+    assert CronSchedule("0 0 * * 7").values["weekday"] == {0}
+    assert CronSchedule("0 0 * * 5-7").values["weekday"] == {0, 5, 6}
+
+
+@pytest.mark.parametrize("expr", [
+    "* * * *",            # too few fields
+    "* * * * * *",        # too many
+    "60 * * * *",         # minute out of range
+    "* 24 * * *",
+    "* * 0 * *",
+    "* * * 13 *",
+    "* * * * 8",
+    "5-1 * * * *",        # reversed range
+    "*/0 * * * *",        # zero step
+    "a * * * *",
+    "1,,2 * * * *",
+])
+def test_invalid_expressions_are_rejected(expr):
+    with pytest.raises(ValueError):
+        CronSchedule(expr)
+
+
+def test_next_after_is_strictly_later():
+    cron = CronSchedule("30 18 * * 1-6")
+    # Saturday 2025-01-04 18:30 exactly -> Monday, Sunday is excluded
+    assert cron.next_after(datetime(2025, 1, 4, 18, 30)) == datetime(2025, 1, 6, 18, 30)
+    assert cron.next_after(datetime(2025, 1, 6, 18, 29, 59)) == datetime(2025, 1, 6, 18, 30)
+    assert cron.next_after(datetime(2025, 1, 6, 23, 59)) == datetime(2025, 1, 7, 18, 30)
+
+
+def test_next_after_crosses_month_and_year():
+    assert CronSchedule("0 6 1 * *").next_after(datetime(2025, 1, 31, 12, 0)) == datetime(2025, 2, 1, 6, 0)
+    assert CronSchedule("15 0 * 1 *").next_after(datetime(2025, 2, 1)) == datetime(2026, 1, 1, 0, 15)
+
+
+def test_restricted_day_and_weekday_match_either():
+    cron = CronSchedule("0 12 13 * 5")
+    # Friday 2025-01-03 matches the weekday, Monday 2025-01-13 the day of month
+    assert cron.next_after(datetime(2025, 1, 1)) == datetime(2025, 1, 3, 12, 0)
+    assert cron.next_after(datetime(2025, 1, 10, 12, 0)) == datetime(2025, 1, 13, 12, 0)
+    # Only one restricted: both must match
+    assert CronSchedule("0 12 * * 5").next_after(datetime(2025, 1, 11)) == datetime(2025, 1, 17, 12, 0)
+
+
+def test_impossible_date_never_fires():
+    with pytest.raises(ValueError):
+        CronSchedule("0 0 30 2 *").next_after(datetime(2025, 1, 1))
+
+
+def test_parse_schedule_splits_on_semicolons():
+    schedules = parse_schedule(" 30 18 * * 1-6 ;; 0 22 * * * ;")
+    assert [s.expr for s in schedules] == ["30 18 * * 1-6", "0 22 * * *"]
+    assert parse_schedule("") == []
+
+
+class MarkerCursor:
+    """Answers the marker and last-rendered queries; records history rows"""
+
+    def __init__(self, count, marker, last_marker):
+        self.count, self.marker, self.last_marker = count, marker, last_marker
+        self.queries = []
+        self.recorded = []
+        self._result = None
+
+    def execute(self, sql, params=None):
+        self.queries.append((sql, params))
+        if "summary_dates" in sql:
+            self._result = (self.count, self.marker)
+        elif "SELECT source_marker" in sql:
+            self._result = (self.last_marker,) if self.last_marker else None
+        elif "INSERT INTO report_schedule_runs" in sql:
+            self.recorded.append(params)
+
+    def fetchone(self):
+        return self._result
+
+
+def test_marker_covers_the_summary_window():
+    cursor = MarkerCursor(3, "abc", None)
+    assert scheduler._day_marker(cursor, "2025-01-10") == (3, "abc")
+    sql, params = cursor.queries[0]
+    assert "date <= %s" in sql and "LIMIT %s" in sql
+    assert params == ("2025-01-10", SUMMARY_DAYS, "2025-01-10")
+
+
+def test_unchanged_window_is_skipped(monkeypatch):
+    rendered = []
+    monkeypatch.setattr(scheduler, "_render_day", lambda day: rendered.append(day) or ([], "Report_20250110.xlsm"))
+
+    result = scheduler.run_day(MarkerCursor(3, "abc", "abc"), "2025-01-10", "t", datetime(2025, 1, 10, 18, 30), email=False)
+    assert result["status"] == "skipped"
+    assert rendered == []
+
+    # An edit to an earlier day in the window changes the marker and renders again
+    cursor = MarkerCursor(3, "def", "abc")
+    result = scheduler.run_day(cursor, "2025-01-10", "t", datetime(2025, 1, 10, 18, 30), email=False)
+    assert result["status"] == "rendered"
+    assert rendered == ["2025-01-10"]
+    assert cursor.recorded[0][5] == "def"
+
+    assert scheduler.run_day(MarkerCursor(0, "x", None), "2025-01-11", "t", datetime(2025, 1, 11), email=False)["status"] == "empty"
+
+
+def test_render_once_reuses_an_earlier_render(monkeypatch):
+    @contextmanager
+    def uncontended(key):
+        yield False
+
+    catalogue = {}
+    monkeypatch.setattr(artifacts, "render_lock", uncontended)
+    monkeypatch.setattr(artifacts, "find_reusable_report", lambda names, source_hash: catalogue.get(source_hash))
+    renders = []
+
+    def render():
+        renders.append(1)
+        catalogue["h1"] = "/out/Report_20250110.pdf"
+        return "/out/Report_20250110.pdf"
+
+    # The scheduled pre-render, then a later request on another worker with the same data
+    assert artifacts.render_once("daily:2025-01-10", ["Report_20250110.pdf"], "h1", render) == "/out/Report_20250110.pdf"
+    assert artifacts.render_once("daily:2025-01-10", ["Report_20250110.pdf"], "h1", render) == "/out/Report_20250110.pdf"
+    assert len(renders) == 1
+    # Changed data renders again
+    artifacts.render_once("daily:2025-01-10", ["Report_20250110.pdf"], "h2", render)
+    assert len(renders) == 2
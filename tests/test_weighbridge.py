@@ -0,0 +1,180 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from backend import weighbridge
+
+
+class FakeWriter:
+    def __init__(self, peer):
+        self.peer = peer
+        self.closed = False
+
+    def get_extra_info(self, name):
+        return self.peer if name == "peername" else None
+
+    def close(self):
+        self.closed = True
+
+
+class FakeReader:
+    def __init__(self, *chunks):
+        self.chunks = list(chunks)
+
+    async def read(self, size):
+        return self.chunks.pop(0) if self.chunks else b""
+
+
+def test_peer_allow_list():
+    networks = weighbridge.parse_peers("10.0.0.5, 192.168.1.0/24")
+    assert weighbridge.peer_allowed("10.0.0.5", networks)
+    assert weighbridge.peer_allowed("192.168.1.77", networks)
+    assert weighbridge.peer_allowed("::ffff:10.0.0.5", networks)
+    assert not weighbridge.peer_allowed("10.0.0.6", networks)
+    assert not weighbridge.peer_allowed("127.0.0.1", networks)
+    assert not weighbridge.peer_allowed("not-an-ip", networks)
+    # No list: loopback only
+    assert weighbridge.peer_allowed("127.0.0.1", [])
+    assert weighbridge.peer_allowed("::1", [])
+    assert not weighbridge.peer_allowed("10.0.0.5", [])
+    with pytest.raises(ValueError):
+        weighbridge.parse_peers("10.0.0.300")
+
+
+def test_defaults_bind_loopback():
+    service = weighbridge.WeighbridgeService(allowed_peers="")
+    assert service.host == "127.0.0.1"
+    assert service.allowed == []
+
+
+def test_unlisted_peer_is_closed_before_reading():
+    service = weighbridge.WeighbridgeService(allowed_peers="10.0.0.5")
+    writer = FakeWriter(("10.0.0.9", 40000))
+    asyncio.run(service._handle(FakeReader(b"WB1,ST,GS,12450.5\n"), writer))
+    assert writer.closed
+    assert service.stats["rejected_peers"] == 1
+    assert service.stats["connections"] == 0
+    assert len(service.ring) == 0
+
+    writer = FakeWriter(("10.0.0.5", 40001))
+    asyncio.run(service._handle(FakeReader(b"WB1,ST,GS,12450.5\n"), writer))
+    assert service.stats["connections"] == 1
+    assert service.stats["readings"] == 1
+
+
+def test_processor_survives_errors(monkeypatch):
+    monkeypatch.setattr(weighbridge, "FLUSH_SECONDS", 0.01)
+    service = weighbridge.WeighbridgeService(allowed_peers="")
+    seen = []
+
+    def process(reading):
+        if reading.weight < 0:
+            raise ValueError("bad reading")
+        seen.append(reading.weight)
+
+    service._process = process
+    original_pop = service.ring.pop_many
+    failures = [RuntimeError("ring broke")]
+
+    def pop_many(limit, timeout):
+        if failures:
+            raise failures.pop()
+        return original_pop(limit, timeout)
+
+    service.ring.pop_many = pop_many
+    now = time.time()
+    service.ring.push_many([
+        weighbridge.Reading("WB1", True, "GS", -1.0, None, now),
+        weighbridge.Reading("WB1", True, "GS", 100.0, None, now),
+    ])
+    thread = threading.Thread(target=service._process_forever, daemon=True)
+    service._threads["processor"] = thread
+    thread.start()
+
+    deadline = time.monotonic() + 5
+    while not seen and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+    status = service.status()
+    assert seen == [100.0]
+    assert status["processor_alive"]
+    assert not status["listener_alive"]
+    assert status["processor_errors"] == 2
+    assert "bad reading" in status["last_error"]["error"]
+
+
+def test_parse_reading_accepts_a_kg_suffix():
+    reading = weighbridge.parse_reading("wb1,st,gs,12450.5kg,kbx 123a", at=1.0)
+    assert reading == weighbridge.Reading("WB1", True, "GS", 12450.5, "KBX 123A", 1.0)
+    assert weighbridge.parse_reading("WB1,ST,TR,8000").weight == 8000.0
+    for line in ("WB1,ST,GS,kg", "WB1,ST,GS,12kgkg", "WB1,XX,GS,100", "WB1,ST,GS"):
+        assert weighbridge.parse_reading(line) is None
+
+
+def _draft(n):
+    return {"scale": "WB1", "vehicle": None, "gross_kg": 20000.0 + n, "tare_kg": 8000.0, "net_kg": 12000.0 + n,
+            "gross_at": None, "tare_at": None}
+
+
+def test_slow_database_does_not_stall_the_processor(monkeypatch):
+    monkeypatch.setattr(weighbridge, "FLUSH_SECONDS", 0.01)
+    service = weighbridge.WeighbridgeService(allowed_peers="")
+    writing, release = threading.Event(), threading.Event()
+    saved = []
+
+    def save_drafts(drafts):
+        writing.set()
+        release.wait(5)
+        saved.extend(drafts)
+    monkeypatch.setattr(weighbridge, "save_drafts", save_drafts)
+
+    service._process = lambda reading: service._queue_draft(_draft(int(reading.weight)))
+    for name, target in (("processor", service._process_forever), ("writer", service._write_forever)):
+        service._threads[name] = threading.Thread(target=target, daemon=True)
+        service._threads[name].start()
+
+    now = time.time()
+    service.ring.push_many([weighbridge.Reading("WB1", True, "GS", 1.0, None, now)])
+    assert writing.wait(5)
+    # The writer is stuck in save_drafts; readings keep being processed into the queue
+    service.ring.push_many([weighbridge.Reading("WB1", True, "GS", float(n), None, now) for n in range(2, 5)])
+    deadline = time.monotonic() + 5
+    while service.status()["unwritten"] < 3 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert service.status()["unwritten"] == 3
+    assert len(service.ring) == 0
+
+    release.set()
+    while len(saved) < 4 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    status = service.status()
+    assert [d["net_kg"] for d in saved] == [12001.0, 12002.0, 12003.0, 12004.0]
+    assert status["drafts_written"] == 4 and status["unwritten"] == 0
+    assert status["processor_alive"] and status["writer_alive"]
+
+
+def test_failed_batch_is_kept_in_order_and_bounded(monkeypatch):
+    monkeypatch.setattr(weighbridge, "FLUSH_SECONDS", 0.01)
+    monkeypatch.setattr(weighbridge, "MAX_UNWRITTEN", 5)
+    service = weighbridge.WeighbridgeService(allowed_peers="")
+    attempts = []
+
+    def save_drafts(drafts):
+        attempts.append([d["net_kg"] - 12000 for d in drafts])
+        if len(attempts) == 1:
+            raise OSError("connection timed out")
+    monkeypatch.setattr(weighbridge, "save_drafts", save_drafts)
+
+    for n in range(4):
+        service._queue_draft(_draft(n))
+    assert service._flush() is False
+    assert service.stats["write_errors"] == 1
+    # Two newer drafts arrive during the outage: only five fit, the oldest goes
+    service._queue_draft(_draft(4))
+    service._queue_draft(_draft(5))
+    assert service.stats["drafts_dropped"] == 1
+    assert service._flush() is True
+    assert attempts == [[0, 1, 2, 3], [1, 2, 3, 4, 5]]
+    assert service.stats["drafts_written"] == 5